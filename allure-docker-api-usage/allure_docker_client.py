@@ -0,0 +1,326 @@
+"""Client for the Allure Docker Service API.
+
+It can be imported from your own scripts:
+
+    from allure_docker_client import AllureDockerClient
+
+    client = AllureDockerClient('http://localhost:5050')
+    client.send_results('my-project-id', '/path/to/allure-results')
+    client.generate_report('my-project-id', execution_name='my execution')
+
+or executed as a command line tool:
+
+    python allure_docker_client.py --server http://localhost:5050 --project-id my-project-id --results-directory /path/to/allure-results --generate-report
+
+Sharded executions (i.e. parallel CI jobs) open a run with the number of shards, every shard
+sends its results to the run and marks itself as complete, a single report is generated by the
+server once all the shards are complete:
+
+    run_id = client.open_run('my-project-id', 3)['data']['run']['id']
+    client.send_results('my-project-id', '/path/to/allure-results', run_id=run_id, shard='shard-1')
+    client.complete_shard('my-project-id', run_id, 'shard-1')
+
+Before uploading, the client sends a manifest with the sha256 of every file and only the
+files missing on the server are uploaded. Results are split in batches bounded by size and
+number of files, the batches are sent concurrently reusing pooled connections and every batch
+is retried with exponential backoff when the server is busy or the connection fails.
+"""
+import argparse, base64, gzip, hashlib, json, os, sys, time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3 import encode_multipart_formdata
+
+DEFAULT_BATCH_SIZE_BYTES = 8 * 1024 * 1024
+DEFAULT_BATCH_FILES = 500
+DEFAULT_CONCURRENCY = 4
+MANIFEST_FILES = 5000
+DEFAULT_RETRIES = 3
+DEFAULT_BACKOFF_SECONDS = 1
+DEFAULT_TIMEOUT_SECONDS = 300
+RETRY_STATUS_CODES = [429, 500, 502, 503, 504]
+MODES = ['json', 'multipart']
+COMPRESSIONS = ['gzip', 'none']
+API_PREFIX = '/allure-docker-service'
+
+
+class AllureDockerClientError(Exception):
+    def __init__(self, message, status_code=None, response_body=None):
+        super(AllureDockerClientError, self).__init__(message)
+        self.status_code = status_code
+        self.response_body = response_body
+
+
+class AllureDockerClient(object):
+    def __init__(self, server_url, verify=True, concurrency=DEFAULT_CONCURRENCY, retries=DEFAULT_RETRIES,
+                 backoff_seconds=DEFAULT_BACKOFF_SECONDS, timeout=DEFAULT_TIMEOUT_SECONDS, headers=None):
+        self.server_url = server_url.rstrip('/')
+        self.concurrency = max(1, concurrency)
+        self.retries = max(0, retries)
+        self.backoff_seconds = backoff_seconds
+        self.timeout = timeout
+
+        self.session = requests.Session()
+        self.session.verify = verify
+        if headers:
+            self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.concurrency)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def collect_results(self, results_directory):
+        results = []
+        for file_name in sorted(os.listdir(results_directory)):
+            file_path = os.path.join(results_directory, file_name)
+            if not os.path.isfile(file_path):
+                continue
+            size = os.path.getsize(file_path)
+            results.append({'file_name': file_name, 'path': file_path, 'size': size})
+        return results
+
+    def get_results_params(self, project_id, run_id=None, shard=None):
+        params = {'project_id': project_id}
+        if run_id is not None:
+            params['run_id'] = run_id
+            params['shard'] = shard
+        return params
+
+    def get_missing_results(self, project_id, results, run_id=None, shard=None):
+        for result in results:
+            digest = hashlib.sha256()
+            with open(result['path'], 'rb') as f:
+                for chunk in iter(lambda: f.read(64 * 1024), b''):
+                    digest.update(chunk)
+            result['sha256'] = digest.hexdigest()
+
+        missing_results = []
+        for index in range(0, len(results), MANIFEST_FILES):
+            chunk = results[index:index + MANIFEST_FILES]
+            manifest = [{'file_name': r['file_name'], 'sha256': r['sha256'], 'size': r['size']} for r in chunk]
+            try:
+                response = self.request('POST', '/send-results/manifest', params=self.get_results_params(project_id, run_id, shard),
+                                        json={'files': manifest})
+            except AllureDockerClientError as ex:
+                if ex.status_code in [404, 405]:
+                    # Server without manifest support, everything is uploaded
+                    return results
+                raise
+            missing_file_names = set([file['file_name'] for file in response['data']['missing_files']])
+            missing_results.extend([r for r in chunk if r['file_name'] in missing_file_names])
+        return missing_results
+
+    def make_batches(self, results, batch_size_bytes=DEFAULT_BATCH_SIZE_BYTES, batch_files=DEFAULT_BATCH_FILES):
+        batches = []
+        batch = []
+        batch_bytes = 0
+        for result in results:
+            if batch and (batch_bytes + result['size'] > batch_size_bytes or len(batch) >= batch_files):
+                batches.append(batch)
+                batch = []
+                batch_bytes = 0
+            batch.append(result)
+            batch_bytes = batch_bytes + result['size']
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def send_results(self, project_id, results_directory, mode='json', compression='gzip',
+                     batch_size_bytes=DEFAULT_BATCH_SIZE_BYTES, batch_files=DEFAULT_BATCH_FILES, dedup=True, run_id=None, shard=None):
+        if mode not in MODES:
+            raise AllureDockerClientError("'mode' should be one of {}".format(MODES))
+        if compression not in COMPRESSIONS:
+            raise AllureDockerClientError("'compression' should be one of {}".format(COMPRESSIONS))
+
+        results = self.collect_results(results_directory)
+        # The server doesn't accept empty files, they are reported as skipped
+        empty_results = [result for result in results if result['size'] == 0]
+        results = [result for result in results if result['size'] > 0]
+        if not results:
+            raise AllureDockerClientError("No results found in '{}'".format(results_directory))
+
+        results_count = len(results)
+        if dedup is True:
+            results = self.get_missing_results(project_id, results, run_id, shard)
+
+        batches = self.make_batches(results, batch_size_bytes, batch_files)
+        summary = {
+            'batches_count': len(batches),
+            'skipped_files_count': results_count - len(results),
+            'empty_files': [result['path'] for result in empty_results],
+            'sent_files_count': 0,
+            'failed_batches': []
+        }
+
+        with ThreadPoolExecutor(max_workers=self.concurrency) as executor:
+            futures = [executor.submit(self.send_batch, project_id, batch, mode, compression, run_id, shard) for batch in batches]
+            for batch, future in zip(batches, futures):
+                try:
+                    future.result()
+                except Exception as ex:
+                    summary['failed_batches'].append({
+                        'file_names': [result['file_name'] for result in batch],
+                        'message': str(ex)
+                    })
+                else:
+                    summary['sent_files_count'] = summary['sent_files_count'] + len(batch)
+
+        if summary['failed_batches']:
+            raise AllureDockerClientError('{} of {} batches failed: {}'.format(
+                len(summary['failed_batches']), len(batches), summary['failed_batches']), response_body=summary)
+        return summary
+
+    def send_batch(self, project_id, batch, mode='json', compression='gzip', run_id=None, shard=None):
+        if mode == 'json':
+            results = []
+            for result in batch:
+                with open(result['path'], 'rb') as f:
+                    results.append({
+                        'file_name': result['file_name'],
+                        'content_base64': base64.b64encode(f.read()).decode('utf-8')
+                    })
+            body = json.dumps({'results': results}).encode('utf-8')
+            content_type = 'application/json'
+        else:
+            files = []
+            for result in batch:
+                with open(result['path'], 'rb') as f:
+                    files.append(('files[]', (result['file_name'], f.read())))
+            body, content_type = encode_multipart_formdata(files)
+
+        headers = {'Content-Type': content_type}
+        if compression == 'gzip':
+            body = gzip.compress(body)
+            headers['Content-Encoding'] = 'gzip'
+
+        return self.request('POST', '/send-results', params=self.get_results_params(project_id, run_id, shard), data=body, headers=headers)
+
+    def generate_report(self, project_id, execution_name=None, execution_from=None, execution_type=None):
+        params = {'project_id': project_id}
+        if execution_name:
+            params['execution_name'] = execution_name
+        if execution_from:
+            params['execution_from'] = execution_from
+        if execution_type:
+            params['execution_type'] = execution_type
+        return self.request('GET', '/generate-report', params=params)
+
+    def clean_results(self, project_id):
+        return self.request('GET', '/clean-results', params={'project_id': project_id})
+
+    def open_run(self, project_id, expected_shards, timeout_seconds=None, execution_name=None, execution_from=None,
+                 execution_type=None, clean_results=False):
+        body = {
+            'expected_shards': expected_shards,
+            'execution_name': execution_name,
+            'execution_from': execution_from,
+            'execution_type': execution_type,
+            'clean_results': clean_results
+        }
+        if timeout_seconds is not None:
+            body['timeout_seconds'] = timeout_seconds
+        return self.request('POST', '/projects/{}/runs'.format(project_id), json=body)
+
+    def complete_shard(self, project_id, run_id, shard):
+        return self.request('POST', '/projects/{}/runs/{}/shards/{}/complete'.format(project_id, run_id, shard))
+
+    def get_run(self, project_id, run_id):
+        return self.request('GET', '/projects/{}/runs/{}'.format(project_id, run_id))
+
+    def request(self, method, path, **kwargs):
+        url = '{}{}{}'.format(self.server_url, API_PREFIX, path)
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+            except requests.exceptions.RequestException as ex:
+                if attempt >= self.retries:
+                    raise AllureDockerClientError('{} {} failed: {}'.format(method, url, str(ex)))
+                retry_after = None
+            else:
+                if response.status_code < 400:
+                    return response.json()
+                if response.status_code not in RETRY_STATUS_CODES or attempt >= self.retries:
+                    raise AllureDockerClientError('{} {} failed with status code {}: {}'.format(
+                        method, url, response.status_code, response.text), response.status_code, response.text)
+                retry_after = response.headers.get('Retry-After')
+
+            delay = self.backoff_seconds * (2 ** attempt)
+            if retry_after is not None and retry_after.isdigit():
+                delay = max(delay, int(retry_after))
+            time.sleep(delay)
+            attempt = attempt + 1
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Send Allure results to Allure Docker Service')
+    parser.add_argument('--server', default='http://localhost:5050', help='Allure Docker Service url')
+    parser.add_argument('--project-id', default='default', help='Project id')
+    parser.add_argument('--results-directory', help='Directory with the Allure results')
+    parser.add_argument('--mode', choices=MODES, default='json', help='Request content type')
+    parser.add_argument('--compression', choices=COMPRESSIONS, default='gzip', help='Request body compression')
+    parser.add_argument('--batch-size-bytes', type=int, default=DEFAULT_BATCH_SIZE_BYTES, help='Maximum size of files per request')
+    parser.add_argument('--batch-files', type=int, default=DEFAULT_BATCH_FILES, help='Maximum number of files per request')
+    parser.add_argument('--concurrency', type=int, default=DEFAULT_CONCURRENCY, help='Requests sent at the same time')
+    parser.add_argument('--retries', type=int, default=DEFAULT_RETRIES, help='Retries per request')
+    parser.add_argument('--backoff-seconds', type=float, default=DEFAULT_BACKOFF_SECONDS, help='Initial delay between retries')
+    parser.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT_SECONDS, help='Timeout per request in seconds')
+    parser.add_argument('--no-dedup', action='store_true', help='Upload every file, even if the server already has it')
+    parser.add_argument('--no-verify', action='store_true', help='Disable SSL verification')
+    parser.add_argument('--generate-report', action='store_true', help='Generate the report once all the results are sent')
+    parser.add_argument('--execution-name', help='Execution name used when generating the report')
+    parser.add_argument('--execution-from', help='Execution url used when generating the report')
+    parser.add_argument('--execution-type', help='Execution type used when generating the report')
+    parser.add_argument('--open-run', type=int, metavar='EXPECTED_SHARDS', help='Open a sharded run and print its id')
+    parser.add_argument('--run-timeout', type=int, help='Seconds to wait for all the shards of the opened run')
+    parser.add_argument('--run-id', help='Send the results to a shard of this run and complete the shard')
+    parser.add_argument('--shard', help='Shard name, required with --run-id')
+    args = parser.parse_args(argv)
+
+    if args.open_run is None and args.results_directory is None:
+        parser.error('--results-directory is required')
+    if args.run_id is not None and args.shard is None:
+        parser.error('--shard is required with --run-id')
+
+    with AllureDockerClient(args.server, verify=not args.no_verify, concurrency=args.concurrency, retries=args.retries,
+                            backoff_seconds=args.backoff_seconds, timeout=args.timeout) as client:
+        try:
+            if args.open_run is not None:
+                response = client.open_run(args.project_id, args.open_run, args.run_timeout, args.execution_name,
+                                           args.execution_from, args.execution_type)
+                print(response['data']['run']['id'])
+                return 0
+
+            summary = client.send_results(args.project_id, args.results_directory, mode=args.mode,
+                                          compression=args.compression, batch_size_bytes=args.batch_size_bytes,
+                                          batch_files=args.batch_files, dedup=not args.no_dedup,
+                                          run_id=args.run_id, shard=args.shard)
+            for empty_file in summary['empty_files']:
+                print('Empty File skipped: {}'.format(empty_file))
+            print('RESULTS SENT: {} files in {} batches ({} files already on the server)'.format(
+                summary['sent_files_count'], summary['batches_count'], summary['skipped_files_count']))
+
+            if args.run_id is not None:
+                run = client.complete_shard(args.project_id, args.run_id, args.shard)['data']['run']
+                print('SHARD COMPLETE: run {} is {}'.format(args.run_id, run['status']))
+            elif args.generate_report:
+                response = client.generate_report(args.project_id, args.execution_name, args.execution_from, args.execution_type)
+                print('ALLURE REPORT URL:')
+                print(response['data']['report_url'])
+        except AllureDockerClientError as ex:
+            print(str(ex), file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
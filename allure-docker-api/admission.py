@@ -0,0 +1,231 @@
+"""Admission control for report generations and results ingestion.
+
+Generations (generate-report, clean-results, clean-history) run one at a time per project and up
+to a global limit. Requests exceeding the limit wait in a bounded queue, when the queue is full
+or the wait times out they are rejected with an AdmissionError that carries the status code
+(429 when the project is busy, 503 when the server is busy) and the seconds to wait before
+retrying, estimated from the queue depth and the duration of the latest generations.
+
+Results ingestion is limited by concurrent requests and by requests per second (token buckets),
+per project and globally.
+
+A project can be locked without a generation slot (i.e. to copy it), generations of the project
+and results ingestion for the project are rejected meanwhile.
+"""
+from collections import deque
+from contextlib import contextmanager
+from threading import Condition
+import math, time
+
+DEFAULT_GENERATION_SECONDS = 10
+
+
+class AdmissionError(Exception):
+    def __init__(self, message, status_code, retry_after=None):
+        super(AdmissionError, self).__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class GenerationAdmission(object):
+    def __init__(self, max_concurrency=2, queue_size=2, queue_timeout_seconds=60, durations_size=20):
+        self.max_concurrency = max_concurrency
+        self.queue_size = queue_size
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.condition = Condition()
+        self.running_projects = set()
+        self.locked_projects = set()
+        self.waiting = []
+        self.durations = deque(maxlen=durations_size)
+
+    def get_average_duration(self):
+        if not self.durations:
+            return DEFAULT_GENERATION_SECONDS
+        return sum(self.durations) / len(self.durations)
+
+    def get_retry_after(self, project_id=None):
+        with self.condition:
+            average_duration = self.get_average_duration()
+            if project_id is not None:
+                pending = 1 + len([waiter for waiter in self.waiting if waiter['project_id'] == project_id])
+            else:
+                pending = math.ceil((len(self.running_projects) + len(self.waiting)) / self.max_concurrency)
+        return max(1, int(math.ceil(average_duration * pending)))
+
+    def is_running(self, project_id):
+        with self.condition:
+            return project_id in self.running_projects or project_id in self.locked_projects
+
+    def is_busy(self, project_id):
+        # Called with the condition acquired
+        return project_id in self.running_projects or project_id in self.locked_projects
+
+    def is_next(self, waiter):
+        # First waiter (FIFO) whose project is not running, with free capacity
+        if len(self.running_projects) >= self.max_concurrency:
+            return False
+        for candidate in self.waiting:
+            if self.is_busy(candidate['project_id']) is False:
+                return candidate is waiter
+        return False
+
+    def acquire(self, project_id, wait=True, bounded=True):
+        # bounded=False waits without the queue size and timeout limits, for callers that bound
+        # their own concurrency (i.e. bulk operations)
+        with self.condition:
+            waiter = {'project_id': project_id}
+            self.waiting.append(waiter)
+            if self.is_next(waiter):
+                self.waiting.remove(waiter)
+                self.running_projects.add(project_id)
+                return
+            self.waiting.remove(waiter)
+
+            if wait is False or (bounded is True and len(self.waiting) >= self.queue_size):
+                raise self.get_busy_error(project_id)
+
+            self.waiting.append(waiter)
+            deadline = time.time() + self.queue_timeout_seconds if bounded is True else None
+            while self.is_next(waiter) is False:
+                if deadline is None:
+                    self.condition.wait()
+                    continue
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self.waiting.remove(waiter)
+                    self.condition.notify_all()
+                    raise self.get_busy_error(project_id)
+                self.condition.wait(remaining)
+            self.waiting.remove(waiter)
+            self.running_projects.add(project_id)
+
+    def get_busy_error(self, project_id):
+        # Called with the condition acquired
+        if self.is_busy(project_id):
+            return AdmissionError("Processing files for project_id '{}'. Try later!".format(project_id), 429)
+        return AdmissionError('Too many report generations in progress. Try later!', 503)
+
+    def release(self, project_id, duration=None):
+        with self.condition:
+            self.running_projects.discard(project_id)
+            if duration is not None:
+                self.durations.append(duration)
+            self.condition.notify_all()
+
+    @contextmanager
+    def project(self, project_id):
+        # Exclusive access to the project without a generation slot, rejected when the project is busy
+        with self.condition:
+            if self.is_busy(project_id):
+                error = self.get_busy_error(project_id)
+            else:
+                error = None
+                self.locked_projects.add(project_id)
+        if error is not None:
+            error.retry_after = self.get_retry_after(project_id)
+            raise error
+        try:
+            yield
+        finally:
+            with self.condition:
+                self.locked_projects.discard(project_id)
+                self.condition.notify_all()
+
+    @contextmanager
+    def generation(self, project_id, wait=True, bounded=True):
+        try:
+            self.acquire(project_id, wait, bounded)
+        except AdmissionError as ex:
+            ex.retry_after = self.get_retry_after(project_id if ex.status_code == 429 else None)
+            raise
+        start = time.time()
+        try:
+            yield
+        finally:
+            self.release(project_id, time.time() - start)
+
+
+class TokenBucket(object):
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.time()
+
+    def take(self):
+        # Returns 0 when a token is taken, or the seconds to wait for the next token
+        now = time.time()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens = self.tokens - 1
+            return 0
+        return (1 - self.tokens) / self.rate
+
+
+class IngestAdmission(object):
+    def __init__(self, max_concurrency=0, max_project_concurrency=0, rate=0, project_rate=0):
+        # 0 disables a limit
+        self.max_concurrency = max_concurrency
+        self.max_project_concurrency = max_project_concurrency
+        self.rate = rate
+        self.project_rate = project_rate
+        self.lock = Condition()
+        self.running = {}
+        self.blocked_projects = set()
+        self.bucket = TokenBucket(rate, max(1, rate)) if rate > 0 else None
+        self.project_buckets = {}
+
+    def acquire(self, project_id):
+        with self.lock:
+            if project_id in self.blocked_projects:
+                raise AdmissionError("project_id '{}' is being copied. Try later!".format(project_id), 429, 1)
+            running_count = sum(self.running.values())
+            if self.max_concurrency > 0 and running_count >= self.max_concurrency:
+                raise AdmissionError('Too many results being sent. Try later!', 503, 1)
+            if self.max_project_concurrency > 0 and self.running.get(project_id, 0) >= self.max_project_concurrency:
+                raise AdmissionError("Too many results being sent for project_id '{}'. Try later!".format(project_id), 429, 1)
+
+            if self.project_rate > 0:
+                bucket = self.project_buckets.setdefault(project_id, TokenBucket(self.project_rate, max(1, self.project_rate)))
+                wait_seconds = bucket.take()
+                if wait_seconds > 0:
+                    raise AdmissionError("Too many requests sending results for project_id '{}'. Try later!".format(project_id),
+                                         429, max(1, int(math.ceil(wait_seconds))))
+            if self.bucket is not None:
+                wait_seconds = self.bucket.take()
+                if wait_seconds > 0:
+                    raise AdmissionError('Too many requests sending results. Try later!', 503, max(1, int(math.ceil(wait_seconds))))
+
+            self.running[project_id] = self.running.get(project_id, 0) + 1
+
+    def release(self, project_id):
+        with self.lock:
+            self.running[project_id] = self.running.get(project_id, 1) - 1
+            if self.running[project_id] <= 0:
+                del self.running[project_id]
+            self.lock.notify_all()
+
+    @contextmanager
+    def blocked(self, project_id, timeout_seconds=60):
+        # Rejects new requests for the project and waits for the requests in progress
+        with self.lock:
+            if project_id in self.blocked_projects:
+                raise AdmissionError("project_id '{}' is being copied. Try later!".format(project_id), 429, 1)
+            self.blocked_projects.add(project_id)
+            deadline = time.time() + timeout_seconds
+            while self.running.get(project_id, 0) > 0:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    self.blocked_projects.discard(project_id)
+                    raise AdmissionError("Too many results being sent for project_id '{}'. Try later!".format(project_id), 429, 1)
+                self.lock.wait(remaining)
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.blocked_projects.discard(project_id)
+
+    def forget(self, project_id):
+        with self.lock:
+            self.project_buckets.pop(project_id, None)
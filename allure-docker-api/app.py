@@ -1,8 +1,23 @@
-from flask import Flask, jsonify, render_template, send_file, request, send_from_directory, redirect, url_for
+from flask import Flask, Response, jsonify, render_template, send_file, request, send_from_directory, redirect, url_for, has_request_context
 from flask_swagger_ui import get_swaggerui_blueprint
-from subprocess import call
 from werkzeug.utils import secure_filename
-import waitress, os, uuid, glob, json, base64, zipfile, io, re, shutil, tempfile, subprocess
+from werkzeug.wsgi import get_input_stream, ClosingIterator
+from werkzeug.exceptions import NotFound
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque, OrderedDict
+from storage import create_storage
+from events import EventBus, format_sse_event
+from admission import AdmissionError, GenerationAdmission, IngestAdmission
+from runs import RunRegistry, RunError
+from results_index import ResultsIndex, FILE_TYPES
+from replica import ReplicaListener, REPLICA_HEADER
+from dashboard import Dashboard, parse_summary
+from diff import LRUCache, TESTS_SUMMARY_FILE, build_tests_summary, diff_tests_summaries
+import runs, results_index
+from profiling import ProfileStore, ProfilingMiddleware, PROFILE_FORMATS, parse_allowlist, is_allowed
+from pipeline import GenerationJob, GenerationPipeline, KeepHistoryStage, ExecutorStage, GenerateStage, StoreStage, RetentionStage, PublishStage, HookRegistry
+from threading import Lock, Thread
+import pipeline, waitress, copy, os, uuid, glob, json, base64, zipfile, io, re, shutil, tempfile, time, fnmatch, zlib, hashlib, hmac, errno, bisect, tarfile, requests, mimetypes
 
 app = Flask(__name__)
 app.config['SEND_FILE_MAX_AGE_DEFAULT'] = 0
@@ -12,22 +27,107 @@ HOST = '0.0.0.0'
 PORT = os.environ['PORT']
 THREADS = 7
 URL_SCHEME = 'http'
-GENERATE_REPORT_PROCESS = '{}/generateAllureReport.sh'.format(os.environ['ROOT'])
-KEEP_HISTORY_PROCESS = '{}/keepAllureHistory.sh'.format(os.environ['ROOT'])
-CLEAN_HISTORY_PROCESS = '{}/cleanAllureHistory.sh'.format(os.environ['ROOT'])
-CLEAN_RESULTS_PROCESS = '{}/cleanAllureResults.sh'.format(os.environ['ROOT'])
-RENDER_EMAIL_REPORT_PROCESS = '{}/renderEmailableReport.sh'.format(os.environ['ROOT'])
 ALLURE_VERSION = os.environ['ALLURE_VERSION']
 STATIC_CONTENT = os.environ['STATIC_CONTENT']
 PROJECTS_DIRECTORY = os.environ['STATIC_CONTENT_PROJECTS']
 EMAILABLE_REPORT_FILE_NAME = os.environ['EMAILABLE_REPORT_FILE_NAME']
-ORIGIN='api'
+EXECUTOR_FILENAME = os.environ.get('EXECUTOR_FILENAME', 'executor.json')
 
 REPORT_INDEX_FILE = 'index.html'
 DEFAULT_TEMPLATE = 'default.html'
 CSS = "https://stackpath.bootstrapcdn.com/bootswatch/4.3.1/cosmo/bootstrap.css"
 TITLE = "Emailable Report"
 API_RESPONSE_LESS_VERBOSE = 0
+API_RESPONSE_FILES_LIMIT = 100
+RESULTS_PAGE_SIZE = 100
+RESULTS_MAX_PAGE_SIZE = 1000
+KEEP_HISTORY = False
+KEEP_HISTORY_LATEST = 20
+CHECK_RESULTS_EVERY_SECONDS = 1
+BULK_OPERATION_WORKERS = 4
+BULK_OPERATION_QUEUE_SIZE = 10
+BULK_OPERATION_HISTORY = 50
+BULK_OPERATION_POLL_SECONDS = 1
+POST_GENERATION_HOOK_WORKERS = 2
+GENERATION_JOBS_HISTORY = 20
+EVENTS_BUFFER_SIZE = 100
+# Every event stream holds an API thread, at most half of them are used by streams
+EVENTS_MAX_STREAMS = max(1, THREADS // 2)
+EVENTS_MAX_CLIENTS = max(1, THREADS // 4)
+EVENTS_MAX_REPLICAS = max(1, THREADS // 7)
+EVENTS_HEARTBEAT_SECONDS = 15
+GENERATION_MAX_CONCURRENCY = 2
+GENERATION_QUEUE_SIZE = 2
+GENERATION_QUEUE_TIMEOUT_SECONDS = 60
+INGEST_MAX_CONCURRENCY = 4
+INGEST_MAX_PROJECT_CONCURRENCY = 2
+INGEST_RATE = 0
+INGEST_PROJECT_RATE = 0
+MAX_REQUEST_BODY_BYTES = 1073741824
+MAX_DECOMPRESSION_RATIO = 100
+DECOMPRESSED_BODY_MEMORY_BYTES = 8388608
+INGEST_ENDPOINTS = ['send_results', 'send_results_manifest']
+INGEST_WRITER_WORKERS = 4
+INGEST_DURABILITY = 'none'
+INGEST_DURABILITY_MODES = ['none', 'batch', 'file']
+PROFILING_ALLOWLIST = parse_allowlist('127.0.0.1,::1')
+PROFILING_SLOW_REQUEST_SECONDS = 0
+PROFILING_SAMPLE_INTERVAL_MS = 20
+PROFILING_MAX_PROFILES = 50
+PROFILING_EXCLUDED_PATHS = ['/events']
+PROFILES_DIRECTORY = '{}/.profiles'.format(PROJECTS_DIRECTORY)
+RUN_TIMEOUT_SECONDS = 3600
+RUN_MAX_SHARDS = 1000
+RUN_WORKERS = 2
+RUN_RETENTION_SECONDS = 86400
+DIFF_CACHE_SIZE = 100
+DIFF_SLOWER_FACTOR = 2.0
+BULK_OPERATIONS = ['generate-report', 'clean-results', 'clean-history']
+OBJECTS_DIRECTORY_NAME = 'objects'
+SHA256_PATTERN = re.compile('^[a-f0-9]{64}$')
+PROJECT_ID_PATTERN = re.compile('^[a-z\d]([a-z\d -]*[a-z\d])?$')
+SNAPSHOT_COMPRESSIONS = {
+    'none': ('w|', 'tar', 'application/x-tar'),
+    'gzip': ('w|gz', 'tar.gz', 'application/gzip')
+}
+SERVER_MODE = 'writer'
+SERVER_MODES = ['writer', 'replica']
+REPLICA_WRITER_URL = None
+REPLICA_RECONNECT_SECONDS = 5
+REPLICA_SECRET = None
+WRITE_ENDPOINTS = [
+    'send_results', 'send_results_manifest', 'generate_report', 'clean_history', 'clean_results', 'bulk_operation',
+    'create_project', 'delete_project', 'create_run', 'complete_run_shard', 'add_cluster_node', 'rebalance_cluster',
+    'receive_cluster_project', 'import_project_snapshot'
+]
+REPLICA_INVALIDATING_EVENTS = [
+    'project-created', 'project-deleted', 'results-cleaned', 'history-cleaned', 'generation-finished'
+]
+CLUSTER_NODES = []
+CLUSTER_NODE_URL = None
+CLUSTER_ROUTING = 'proxy'
+CLUSTER_ROUTING_MODES = ['proxy', 'redirect']
+CLUSTER_VIRTUAL_NODES = 100
+CLUSTER_TIMEOUT_SECONDS = 300
+CLUSTER_FORWARDED_HEADER = 'X-Allure-Cluster-Forwarded'
+CLUSTER_SECRET_HEADER = 'X-Allure-Cluster-Secret'
+CLUSTER_SECRET = None
+CLUSTER_ADMIN_ALLOWLIST = parse_allowlist('127.0.0.1,::1')
+CLUSTER_ALLOWED_NODES = None
+CLUSTER_NODES_FILE = '{}/.cluster-nodes.json'.format(PROJECTS_DIRECTORY)
+CLUSTER_ROUTED_ENDPOINTS = [
+    'latest_report', 'send_results', 'send_results_manifest', 'generate_report', 'clean_history', 'clean_results',
+    'emailable_report_render', 'emailable_report_export', 'report_export', 'create_project', 'delete_project',
+    'get_project', 'get_reports', 'get_generation_jobs', 'get_generation_job', 'get_project_events',
+    'create_run', 'get_runs', 'get_run', 'complete_run_shard', 'get_project_results', 'export_project_snapshot',
+    'import_project_snapshot', 'get_project_diff'
+]
+HOP_BY_HOP_HEADERS = ['connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization', 'te', 'trailer', 'trailers', 'transfer-encoding', 'upgrade']
+CONTENT_ENCODINGS = {
+    'gzip': 16 + zlib.MAX_WBITS,
+    'x-gzip': 16 + zlib.MAX_WBITS,
+    'deflate': zlib.MAX_WBITS
+}
 
 if "EMAILABLE_REPORT_CSS_CDN" in os.environ:
     app.logger.info('Overriding CSS')
@@ -43,6 +143,245 @@ if "API_RESPONSE_LESS_VERBOSE" in os.environ:
     except Exception as ex:
         app.logger.error('Wrong env var value. Setting API_RESPONSE_LESS_VERBOSE=0 by default')
 
+if "API_RESPONSE_FILES_LIMIT" in os.environ:
+    try:
+        API_RESPONSE_FILES_LIMIT = max(0, int(os.environ['API_RESPONSE_FILES_LIMIT']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting API_RESPONSE_FILES_LIMIT=100 by default')
+
+if "KEEP_HISTORY" in os.environ:
+    KEEP_HISTORY = os.environ['KEEP_HISTORY'] in ['TRUE', 'true', '1']
+
+if "KEEP_HISTORY_LATEST" in os.environ:
+    try:
+        KEEP_HISTORY_LATEST = int(os.environ['KEEP_HISTORY_LATEST'])
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting KEEP_HISTORY_LATEST=20 by default')
+
+if "CHECK_RESULTS_EVERY_SECONDS" in os.environ:
+    if os.environ['CHECK_RESULTS_EVERY_SECONDS'] in ['NONE', 'none']:
+        CHECK_RESULTS_EVERY_SECONDS = None
+    else:
+        try:
+            CHECK_RESULTS_EVERY_SECONDS = int(os.environ['CHECK_RESULTS_EVERY_SECONDS'])
+        except Exception as ex:
+            app.logger.error('Wrong env var value. Setting CHECK_RESULTS_EVERY_SECONDS=1 by default')
+
+if "INGEST_WRITER_WORKERS" in os.environ:
+    try:
+        INGEST_WRITER_WORKERS = max(1, int(os.environ['INGEST_WRITER_WORKERS']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting INGEST_WRITER_WORKERS=4 by default')
+
+if "INGEST_DURABILITY" in os.environ:
+    if os.environ['INGEST_DURABILITY'] in INGEST_DURABILITY_MODES:
+        INGEST_DURABILITY = os.environ['INGEST_DURABILITY']
+    else:
+        app.logger.error('Wrong env var value. Setting INGEST_DURABILITY=none by default')
+
+if "BULK_OPERATION_WORKERS" in os.environ:
+    try:
+        bulk_operation_workers = int(os.environ['BULK_OPERATION_WORKERS'])
+        if bulk_operation_workers < 1:
+            raise Exception('BULK_OPERATION_WORKERS should be greater than 0')
+        BULK_OPERATION_WORKERS = bulk_operation_workers
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting BULK_OPERATION_WORKERS=4 by default')
+
+if "BULK_OPERATION_QUEUE_SIZE" in os.environ:
+    try:
+        BULK_OPERATION_QUEUE_SIZE = max(1, int(os.environ['BULK_OPERATION_QUEUE_SIZE']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting BULK_OPERATION_QUEUE_SIZE=10 by default')
+
+if "POST_GENERATION_HOOK_WORKERS" in os.environ:
+    try:
+        post_generation_hook_workers = int(os.environ['POST_GENERATION_HOOK_WORKERS'])
+        if post_generation_hook_workers < 1:
+            raise Exception('POST_GENERATION_HOOK_WORKERS should be greater than 0')
+        POST_GENERATION_HOOK_WORKERS = post_generation_hook_workers
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting POST_GENERATION_HOOK_WORKERS=2 by default')
+
+if "EVENTS_BUFFER_SIZE" in os.environ:
+    try:
+        EVENTS_BUFFER_SIZE = max(1, int(os.environ['EVENTS_BUFFER_SIZE']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting EVENTS_BUFFER_SIZE=100 by default')
+
+if "EVENTS_MAX_CLIENTS" in os.environ:
+    try:
+        EVENTS_MAX_CLIENTS = max(0, int(os.environ['EVENTS_MAX_CLIENTS']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting EVENTS_MAX_CLIENTS={} by default'.format(EVENTS_MAX_CLIENTS))
+
+if "EVENTS_MAX_REPLICAS" in os.environ:
+    try:
+        EVENTS_MAX_REPLICAS = max(0, int(os.environ['EVENTS_MAX_REPLICAS']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting EVENTS_MAX_REPLICAS={} by default'.format(EVENTS_MAX_REPLICAS))
+
+if EVENTS_MAX_CLIENTS + EVENTS_MAX_REPLICAS > EVENTS_MAX_STREAMS:
+    EVENTS_MAX_REPLICAS = min(EVENTS_MAX_REPLICAS, EVENTS_MAX_STREAMS)
+    EVENTS_MAX_CLIENTS = EVENTS_MAX_STREAMS - EVENTS_MAX_REPLICAS
+    app.logger.error('Too many event streams for {} threads. Setting EVENTS_MAX_CLIENTS={} and EVENTS_MAX_REPLICAS={}'.format(
+        THREADS, EVENTS_MAX_CLIENTS, EVENTS_MAX_REPLICAS))
+
+if "GENERATION_MAX_CONCURRENCY" in os.environ:
+    try:
+        GENERATION_MAX_CONCURRENCY = max(1, int(os.environ['GENERATION_MAX_CONCURRENCY']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting GENERATION_MAX_CONCURRENCY=2 by default')
+
+if "GENERATION_QUEUE_SIZE" in os.environ:
+    try:
+        GENERATION_QUEUE_SIZE = max(0, int(os.environ['GENERATION_QUEUE_SIZE']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting GENERATION_QUEUE_SIZE=2 by default')
+
+if "GENERATION_QUEUE_TIMEOUT_SECONDS" in os.environ:
+    try:
+        GENERATION_QUEUE_TIMEOUT_SECONDS = max(0, int(os.environ['GENERATION_QUEUE_TIMEOUT_SECONDS']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting GENERATION_QUEUE_TIMEOUT_SECONDS=60 by default')
+
+if "INGEST_MAX_CONCURRENCY" in os.environ:
+    try:
+        INGEST_MAX_CONCURRENCY = max(0, int(os.environ['INGEST_MAX_CONCURRENCY']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting INGEST_MAX_CONCURRENCY=4 by default')
+
+if "INGEST_MAX_PROJECT_CONCURRENCY" in os.environ:
+    try:
+        INGEST_MAX_PROJECT_CONCURRENCY = max(0, int(os.environ['INGEST_MAX_PROJECT_CONCURRENCY']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting INGEST_MAX_PROJECT_CONCURRENCY=2 by default')
+
+if "INGEST_RATE" in os.environ:
+    try:
+        INGEST_RATE = max(0, float(os.environ['INGEST_RATE']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting INGEST_RATE=0 by default')
+
+if "INGEST_PROJECT_RATE" in os.environ:
+    try:
+        INGEST_PROJECT_RATE = max(0, float(os.environ['INGEST_PROJECT_RATE']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting INGEST_PROJECT_RATE=0 by default')
+
+if "MAX_REQUEST_BODY_BYTES" in os.environ:
+    try:
+        MAX_REQUEST_BODY_BYTES = max(1, int(os.environ['MAX_REQUEST_BODY_BYTES']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting MAX_REQUEST_BODY_BYTES=1073741824 by default')
+
+if "MAX_DECOMPRESSION_RATIO" in os.environ:
+    try:
+        MAX_DECOMPRESSION_RATIO = max(1, int(os.environ['MAX_DECOMPRESSION_RATIO']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting MAX_DECOMPRESSION_RATIO=100 by default')
+
+if "PROFILING_ALLOWLIST" in os.environ:
+    try:
+        PROFILING_ALLOWLIST = parse_allowlist(os.environ['PROFILING_ALLOWLIST'])
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting PROFILING_ALLOWLIST=127.0.0.1,::1 by default')
+
+if "PROFILING_SLOW_REQUEST_SECONDS" in os.environ:
+    try:
+        PROFILING_SLOW_REQUEST_SECONDS = max(0, float(os.environ['PROFILING_SLOW_REQUEST_SECONDS']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting PROFILING_SLOW_REQUEST_SECONDS=0 by default')
+
+if "PROFILING_SAMPLE_INTERVAL_MS" in os.environ:
+    try:
+        PROFILING_SAMPLE_INTERVAL_MS = max(1, int(os.environ['PROFILING_SAMPLE_INTERVAL_MS']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting PROFILING_SAMPLE_INTERVAL_MS=20 by default')
+
+if "PROFILING_MAX_PROFILES" in os.environ:
+    try:
+        PROFILING_MAX_PROFILES = max(1, int(os.environ['PROFILING_MAX_PROFILES']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting PROFILING_MAX_PROFILES=50 by default')
+
+if "RUN_TIMEOUT_SECONDS" in os.environ:
+    try:
+        RUN_TIMEOUT_SECONDS = max(1, int(os.environ['RUN_TIMEOUT_SECONDS']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting RUN_TIMEOUT_SECONDS=3600 by default')
+
+if "RUN_RETENTION_SECONDS" in os.environ:
+    try:
+        RUN_RETENTION_SECONDS = max(0, int(os.environ['RUN_RETENTION_SECONDS']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting RUN_RETENTION_SECONDS=86400 by default')
+
+if "CLUSTER_NODES" in os.environ:
+    try:
+        cluster_nodes = [node.strip().rstrip('/') for node in os.environ['CLUSTER_NODES'].split(',') if node.strip()]
+        if "CLUSTER_NODE_URL" not in os.environ:
+            raise Exception('CLUSTER_NODE_URL is required')
+        cluster_node_url = os.environ['CLUSTER_NODE_URL'].strip().rstrip('/')
+        if cluster_node_url not in cluster_nodes:
+            raise Exception('CLUSTER_NODE_URL should be included in CLUSTER_NODES')
+        CLUSTER_NODES = cluster_nodes
+        CLUSTER_NODE_URL = cluster_node_url
+    except Exception as ex:
+        app.logger.error('Wrong env var value ({}). Cluster mode disabled'.format(str(ex)))
+
+if "CLUSTER_SECRET" in os.environ and os.environ['CLUSTER_SECRET'].strip():
+    CLUSTER_SECRET = os.environ['CLUSTER_SECRET'].strip()
+
+if "CLUSTER_ADMIN_ALLOWLIST" in os.environ:
+    try:
+        CLUSTER_ADMIN_ALLOWLIST = parse_allowlist(os.environ['CLUSTER_ADMIN_ALLOWLIST'])
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting CLUSTER_ADMIN_ALLOWLIST=127.0.0.1,::1 by default')
+
+if "CLUSTER_ALLOWED_NODES" in os.environ:
+    CLUSTER_ALLOWED_NODES = [node.strip().rstrip('/') for node in os.environ['CLUSTER_ALLOWED_NODES'].split(',') if node.strip()]
+
+if CLUSTER_ALLOWED_NODES is None:
+    # Only the configured nodes by default
+    CLUSTER_ALLOWED_NODES = list(CLUSTER_NODES)
+
+if "SERVER_MODE" in os.environ:
+    if os.environ['SERVER_MODE'] in SERVER_MODES:
+        SERVER_MODE = os.environ['SERVER_MODE']
+    else:
+        app.logger.error('Wrong env var value. Setting SERVER_MODE=writer by default')
+
+if "REPLICA_WRITER_URL" in os.environ:
+    REPLICA_WRITER_URL = os.environ['REPLICA_WRITER_URL'].rstrip('/')
+
+if "REPLICA_SECRET" in os.environ and os.environ['REPLICA_SECRET'].strip():
+    REPLICA_SECRET = os.environ['REPLICA_SECRET'].strip()
+
+if "REPLICA_RECONNECT_SECONDS" in os.environ:
+    try:
+        REPLICA_RECONNECT_SECONDS = max(1, int(os.environ['REPLICA_RECONNECT_SECONDS']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting REPLICA_RECONNECT_SECONDS=5 by default')
+
+if "DIFF_CACHE_SIZE" in os.environ:
+    try:
+        DIFF_CACHE_SIZE = max(1, int(os.environ['DIFF_CACHE_SIZE']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting DIFF_CACHE_SIZE=100 by default')
+
+if "CLUSTER_ROUTING" in os.environ:
+    if os.environ['CLUSTER_ROUTING'] in CLUSTER_ROUTING_MODES:
+        CLUSTER_ROUTING = os.environ['CLUSTER_ROUTING']
+    else:
+        app.logger.error('Wrong env var value. Setting CLUSTER_ROUTING=proxy by default')
+
+if "CLUSTER_VIRTUAL_NODES" in os.environ:
+    try:
+        CLUSTER_VIRTUAL_NODES = max(1, int(os.environ['CLUSTER_VIRTUAL_NODES']))
+    except Exception as ex:
+        app.logger.error('Wrong env var value. Setting CLUSTER_VIRTUAL_NODES=100 by default')
+
 if "DEV_MODE" in os.environ:
     try:
         DEV_MODE = int(os.environ['DEV_MODE'])
@@ -57,6 +396,19 @@ if "TLS" in os.environ:
     except Exception as ex:
         app.logger.error('Wrong env var value. Setting TLS=0 by default')
 
+try:
+    STORAGE = create_storage(PROJECTS_DIRECTORY)
+except Exception as ex:
+    # A configured storage is never replaced by the local storage, reports would be lost
+    app.logger.error('Wrong storage configuration ({})'.format(str(ex)))
+    raise
+
+if STORAGE.name != 'local':
+    app.logger.info('Using {} storage'.format(STORAGE.name))
+    for storage_project_id in STORAGE.list_projects():
+        os.makedirs('{}/{}/reports/latest'.format(PROJECTS_DIRECTORY, storage_project_id), exist_ok=True)
+        os.makedirs('{}/{}/results'.format(PROJECTS_DIRECTORY, storage_project_id), exist_ok=True)
+
 ### swagger specific ###
 SWAGGER_URL = '/allure-docker-service/swagger'
 API_URL = '/allure-docker-service/swagger.json'
@@ -70,6 +422,180 @@ SWAGGERUI_BLUEPRINT = get_swaggerui_blueprint(
 app.register_blueprint(SWAGGERUI_BLUEPRINT, url_prefix=SWAGGER_URL)
 ### end swagger specific ###
 
+### cluster specific ###
+class HashRing(object):
+    def __init__(self, nodes, virtual_nodes):
+        self.virtual_nodes = virtual_nodes
+        self.nodes = []
+        # (keys, key_nodes) replaced at once, readers never see keys and nodes of different rings
+        self.ring = ([], [])
+        self.lock = Lock()
+        for node in nodes:
+            self.add_node(node)
+
+    def hash(self, key):
+        return int(hashlib.md5(key.encode('utf-8')).hexdigest()[:16], 16)
+
+    def add_node(self, node):
+        with self.lock:
+            if node in self.nodes:
+                return False
+            ring = list(zip(*self.ring))
+            for index in range(self.virtual_nodes):
+                ring.append((self.hash('{}#{}'.format(node, index)), node))
+            ring.sort()
+            self.nodes = self.nodes + [node]
+            self.ring = ([key for key, _ in ring], [key_node for _, key_node in ring])
+            return True
+
+    def get_node(self, key):
+        keys, key_nodes = self.ring
+        if not keys:
+            return None
+        index = bisect.bisect(keys, self.hash(key)) % len(keys)
+        return key_nodes[index]
+
+def is_allowed_cluster_node(node):
+    return any(fnmatch.fnmatch(node, pattern) for pattern in CLUSTER_ALLOWED_NODES)
+
+def is_cluster_admin_request():
+    # Requests of the administrators (CLUSTER_ADMIN_ALLOWLIST) or of the other nodes (CLUSTER_SECRET)
+    secret = request.headers.get(CLUSTER_SECRET_HEADER)
+    if CLUSTER_SECRET is not None and secret is not None and hmac.compare_digest(secret, CLUSTER_SECRET):
+        return True
+    return is_allowed(CLUSTER_ADMIN_ALLOWLIST, request.remote_addr)
+
+CLUSTER_RING = None
+CLUSTER_SESSION = None
+CLUSTER_STATUS = {'last_rebalance': None}
+if CLUSTER_NODE_URL is not None:
+    if os.path.isfile(CLUSTER_NODES_FILE):
+        try:
+            with open(CLUSTER_NODES_FILE) as f:
+                for node in json.load(f):
+                    if node not in CLUSTER_NODES and is_allowed_cluster_node(node):
+                        CLUSTER_NODES.append(node)
+        except Exception as ex:
+            app.logger.error('Unable to read {}: {}'.format(CLUSTER_NODES_FILE, str(ex)))
+    CLUSTER_RING = HashRing(CLUSTER_NODES, CLUSTER_VIRTUAL_NODES)
+    CLUSTER_SESSION = requests.Session()
+    app.logger.info('Cluster mode enabled for node {} with nodes {}'.format(CLUSTER_NODE_URL, CLUSTER_NODES))
+### end cluster specific ###
+
+BULK_OPERATION_EXECUTOR = ThreadPoolExecutor(max_workers=BULK_OPERATION_WORKERS)
+INGEST_WRITER_EXECUTOR = ThreadPoolExecutor(max_workers=INGEST_WRITER_WORKERS)
+GENERATION_ADMISSION = GenerationAdmission(GENERATION_MAX_CONCURRENCY, GENERATION_QUEUE_SIZE, GENERATION_QUEUE_TIMEOUT_SECONDS)
+INGEST_ADMISSION = IngestAdmission(INGEST_MAX_CONCURRENCY, INGEST_MAX_PROJECT_CONCURRENCY, INGEST_RATE, INGEST_PROJECT_RATE)
+GENERATION_JOBS = {}
+GENERATION_JOBS_LOCK = Lock()
+BULK_JOBS = OrderedDict()
+BULK_JOBS_LOCK = Lock()
+EVENT_BUS = EventBus(EVENTS_BUFFER_SIZE)
+RUNS = RunRegistry(PROJECTS_DIRECTORY)
+RUNS_EXECUTOR = ThreadPoolExecutor(max_workers=RUN_WORKERS)
+RESULTS_SIGNATURES = {}
+RESULTS_INDEX = ResultsIndex()
+RESULTS_HASHES = {}
+RESULTS_HASHES_LOCK = Lock()
+WRITER_GENERATING_PROJECTS = set()
+TESTS_SUMMARIES = LRUCache(DIFF_CACHE_SIZE)
+DIFFS = LRUCache(DIFF_CACHE_SIZE)
+REPLICA_LISTENER = None
+
+@app.before_request
+def check_request_body_size():
+    if request.content_length is not None and request.content_length > MAX_REQUEST_BODY_BYTES:
+        body = {
+            'meta_data': {
+                'message' : 'Request body exceeds the maximum size of {} bytes'.format(MAX_REQUEST_BODY_BYTES)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 413
+        return resp
+    return None
+
+@app.before_request
+def reject_replica_write_request():
+    if SERVER_MODE != 'replica' or request.endpoint not in WRITE_ENDPOINTS:
+        return None
+
+    message = 'This node is a read-only replica. Send the request to the writer node'
+    if REPLICA_WRITER_URL is not None:
+        message = '{} {}'.format(message, REPLICA_WRITER_URL)
+    body = {
+        'meta_data': {
+            'message' : message
+        }
+    }
+    resp = jsonify(body)
+    resp.status_code = 403
+    return resp
+
+@app.before_request
+def route_cluster_request():
+    if CLUSTER_RING is None or CLUSTER_FORWARDED_HEADER in request.headers:
+        return None
+
+    if request.endpoint not in CLUSTER_ROUTED_ENDPOINTS:
+        return None
+
+    if request.endpoint == 'create_project':
+        json = request.get_json(silent=True)
+        if isinstance(json, dict) is False or isinstance(json.get('id'), str) is False:
+            return None
+        project_id = json['id']
+    elif request.view_args is not None and 'project_id' in request.view_args:
+        project_id = request.view_args['project_id']
+    else:
+        project_id = resolve_project(request.args.get('project_id'))
+
+    node = get_project_node(project_id)
+    if node == CLUSTER_NODE_URL:
+        return None
+
+    try:
+        if CLUSTER_ROUTING == 'redirect':
+            return redirect('{}{}'.format(node, request.full_path.rstrip('?')), code=307)
+        return forward_cluster_request(node)
+    except Exception as ex:
+        body = {
+            'meta_data': {
+                'message' : "Unable to reach node '{}' for project_id '{}': {}".format(node, project_id, str(ex))
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 502
+        return resp
+
+@app.before_request
+def admit_ingest_request():
+    if request.endpoint not in INGEST_ENDPOINTS:
+        return None
+
+    project_id = resolve_project(request.args.get('project_id'))
+    if is_existent_project(project_id) is False:
+        return None
+
+    try:
+        INGEST_ADMISSION.acquire(project_id)
+    except AdmissionError as ex:
+        return get_admission_error_response(ex)
+    request.environ['allure.ingest_project_id'] = project_id
+    return None
+
+@app.teardown_request
+def release_ingest_request(exception=None):
+    project_id = request.environ.pop('allure.ingest_project_id', None)
+    if project_id is not None:
+        INGEST_ADMISSION.release(project_id)
+
+@app.teardown_request
+def close_decompressed_request_body(exception=None):
+    body = request.environ.pop('allure.decompressed_body', None)
+    if body is not None:
+        body.close()
+
 @app.route("/", strict_slashes=False)
 @app.route("/allure-docker-service", strict_slashes=False)
 def index():
@@ -163,6 +689,7 @@ def latest_report():
 @app.route("/send-results", methods=['POST'], strict_slashes=False)
 @app.route("/allure-docker-service/send-results", methods=['POST'], strict_slashes=False)
 def send_results():
+    shard_path = None
     try:
         content_type = request.content_type
         if content_type is None:
@@ -171,6 +698,8 @@ def send_results():
         if content_type.startswith('application/json') is False and content_type.startswith('multipart/form-data') is False:
             raise Exception("Header 'Content-Type' should start with 'application/json' or 'multipart/form-data'")
 
+        decompress_request_body()
+
         project_id = resolve_project(request.args.get('project_id'))
         if is_existent_project(project_id) is False:
             body = {
@@ -185,8 +714,10 @@ def send_results():
         processedFiles = []
         failedFiles = []
         validatedResults = []
-        project_path = get_project_path(project_id)
-        results_project='{}/results'.format(project_path)
+        run_id = request.args.get('run_id')
+        if run_id is not None:
+            shard = request.args.get('shard')
+            shard_path = open_run_shard(project_id, run_id, shard)
 
         if content_type.startswith('application/json') is True:
             json = request.get_json()
@@ -219,63 +750,50 @@ def send_results():
 
                 if 'content_base64' not in result or not result['content_base64'].strip():
                     raise Exception("'content_base64' attribute is required for '%s' file" % (file_name))
-                else:
-                    content_base64 = result.get('content_base64')
-                    try:
-                        validated_result['content_base64'] = base64.b64decode(content_base64)
-                    except Exception:
-                        raise Exception("'content_base64' attribute content for '%s' file should be encoded to base64" % (file_name))
+                validated_result['content_base64'] = result.get('content_base64')
 
                 validatedResults.append(validated_result)
 
-            for result in validatedResults:
-                file_name = secure_filename(result.get('file_name'))
-                content_base64 = result.get('content_base64')
-                f = None
-                try:
-                    f = open("%s/%s" % (results_project, file_name), "wb")
-                    f.write(content_base64)
-                except Exception as ex:
-                    error = {}
-                    error['message'] = str(ex)
-                    error['file_name'] = file_name
-                    failedFiles.append(error)
-                else:
-                    processedFiles.append(file_name)
-                finally:
-                    if f is not None:
-                        f.close()
+            # Every file is decoded by the ingest writers before writing any of them
+            files = [(secure_filename(result.get('file_name')), get_base64_opener(result.get('file_name'), result.get('content_base64')))
+                     for result in validatedResults]
+            processedFiles, failedFiles = write_result_files(project_id, files, shard_path)
 
         if content_type.startswith('multipart/form-data') is True:
             files = request.files.getlist('files[]')
             if not files:
                 raise Exception("'files[]' array is empty")
 
-            for file in files:
-                try:
-                    file_name = secure_filename(file.filename)
-                    file.save("{}/{}".format(results_project, file_name))
-                except Exception as ex:
-                    error = {}
-                    error['message'] = str(ex)
-                    error['file_name'] = file_name
-                    failedFiles.append(error)
-                else:
-                    processedFiles.append(file_name)
+            processedFiles, failedFiles = write_result_files(project_id,
+                [(secure_filename(file.filename), get_stream_opener(file.stream)) for file in files], shard_path)
 
             validatedResults = processedFiles
 
+        if processedFiles:
+            event_data = {'processed_files_count': len(processedFiles), 'failed_files_count': len(failedFiles)}
+            if run_id is not None:
+                event_data.update({'run_id': run_id, 'shard': shard})
+            EVENT_BUS.publish('results-received', project_id, event_data)
 
         failedFilesCount = len(failedFiles)
         if failedFilesCount > 0:
             raise Exception('Problems with files: {}'.format(failedFiles))
 
         if API_RESPONSE_LESS_VERBOSE != 1:
-            files = os.listdir(results_project)
-            currentFilesCount = len(files)
+            summary = get_results_summary(project_id, shard_path)
             sentFilesCount = len(validatedResults)
             processedFilesCount = len(processedFiles)
 
+    except RunError as ex:
+        body = {
+            'meta_data': {
+                'message' : str(ex)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = ex.status_code
+    except AdmissionError as ex:
+        resp = get_admission_error_response(ex)
     except Exception as ex:
         body = {
             'meta_data': {
@@ -288,8 +806,9 @@ def send_results():
         if API_RESPONSE_LESS_VERBOSE != 1:
             body = {
                 'data': {
-                    'current_files': files,
-                    'current_files_count': currentFilesCount,
+                    'current_files': summary['file_names'],
+                    'current_files_count': summary['count'],
+                    'current_files_summary': summary['counts'],
                     'failed_files': failedFiles,
                     'failed_files_count': failedFilesCount,
                     'processed_files': processedFiles,
@@ -310,6 +829,111 @@ def send_results():
         resp = jsonify(body)
         resp.status_code = 200
 
+    finally:
+        if shard_path is not None:
+            close_run_shard(project_id, run_id)
+
+    return resp
+
+@app.route("/send-results/manifest", methods=['POST'], strict_slashes=False)
+@app.route("/allure-docker-service/send-results/manifest", methods=['POST'], strict_slashes=False)
+def send_results_manifest():
+    shard_path = None
+    try:
+        if not request.is_json:
+            raise Exception("Header 'Content-Type' is not 'application/json'")
+
+        project_id = resolve_project(request.args.get('project_id'))
+        if is_existent_project(project_id) is False:
+            body = {
+                'meta_data': {
+                'message' : "project_id '{}' not found".format(project_id)
+                }
+            }
+            resp = jsonify(body)
+            resp.status_code = 404
+            return resp
+
+        json = request.get_json()
+
+        run_id = request.args.get('run_id')
+        if run_id is not None:
+            shard_path = open_run_shard(project_id, run_id, request.args.get('shard'))
+
+        if 'files' not in json:
+            raise Exception("'files' array is required in the body")
+
+        files = json['files']
+        if isinstance(files, list) is False:
+            raise Exception("'files' should be an array")
+
+        if not files:
+            raise Exception("'files' array is empty")
+
+        for file in files:
+            if isinstance(file, dict) is False:
+                raise Exception("'files' should contain objects")
+            if isinstance(file.get('file_name'), str) is False or not file['file_name'].strip():
+                raise Exception("'file_name' attribute is required for all files")
+            if isinstance(file.get('sha256'), str) is False or SHA256_PATTERN.match(file['sha256'].lower()) is None:
+                raise Exception("'sha256' attribute for '{}' file should be a sha256 hex digest".format(file['file_name']))
+            if 'size' in file and (isinstance(file['size'], int) is False or file['size'] < 0):
+                raise Exception("'size' attribute for '{}' file should be a positive integer".format(file['file_name']))
+
+        missing_files = []
+        existent_files_count = 0
+        linked_files_count = 0
+        for file in files:
+            file_name = secure_filename(file['file_name'])
+            sha256 = file['sha256'].lower()
+            if shard_path is None and get_result_file_hash(project_id, file_name) == sha256:
+                existent_files_count = existent_files_count + 1
+            elif link_result_file(project_id, file_name, sha256, file.get('size'), shard_path) is True:
+                if shard_path is None:
+                    STORAGE.save_result(project_id, file_name)
+                linked_files_count = linked_files_count + 1
+            else:
+                missing_files.append(file)
+
+        if linked_files_count > 0 and shard_path is None:
+            EVENT_BUS.publish('results-received', project_id, {'processed_files_count': linked_files_count, 'failed_files_count': 0})
+    except RunError as ex:
+        body = {
+            'meta_data': {
+                'message' : str(ex)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = ex.status_code
+    except AdmissionError as ex:
+        resp = get_admission_error_response(ex)
+    except Exception as ex:
+        body = {
+            'meta_data': {
+                'message' : str(ex)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 400
+    else:
+        body = {
+            'data': {
+                'missing_files': missing_files,
+                'missing_files_count': len(missing_files),
+                'existent_files_count': existent_files_count,
+                'linked_files_count': linked_files_count
+            },
+            'meta_data': {
+                'message' : "Manifest successfully processed for project_id '{}'".format(project_id)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 200
+
+    finally:
+        if shard_path is not None:
+            close_run_shard(project_id, run_id)
+
     return resp
 
 @app.route("/generate-report", strict_slashes=False)
@@ -327,12 +951,9 @@ def generate_report():
             resp.status_code = 404
             return resp
 
-        files = None
-        project_path=get_project_path(project_id)
-        results_project='{}/results'.format(project_path)
-
+        summary = None
         if API_RESPONSE_LESS_VERBOSE != 1:
-            files = os.listdir(results_project)
+            summary = get_results_summary(project_id)
 
         execution_name = request.args.get('execution_name')
         if execution_name is None or not execution_name:
@@ -346,21 +967,11 @@ def generate_report():
         if execution_type is None or not execution_type:
             execution_type = ''
 
-        check_process(KEEP_HISTORY_PROCESS, project_id)
-        check_process(GENERATE_REPORT_PROCESS, project_id)
-
-        exec_store_results_process='1'
-
-        call([KEEP_HISTORY_PROCESS, project_id, ORIGIN])
-        response = subprocess.Popen([GENERATE_REPORT_PROCESS, exec_store_results_process, project_id, ORIGIN, execution_name, execution_from, execution_type], stdout=subprocess.PIPE).communicate()[0]
-        call([RENDER_EMAIL_REPORT_PROCESS, project_id, ORIGIN])
-
-        build_order = 'latest'
-        for line in response.decode("utf-8").split("\n") :
-            if line.startswith("BUILD_ORDER"):
-                build_order = line[line.index(':') + 1: len(line)]
+        job = generate_project_report(project_id, execution_name, execution_from, execution_type)
 
-        report_url = url_for('get_reports', project_id=project_id, path='{}/index.html'.format(build_order), _external=True)
+        report_url = url_for('get_reports', project_id=project_id, path='{}/index.html'.format(job.get_report_build_order()), _external=True)
+    except AdmissionError as ex:
+        resp = get_admission_error_response(ex)
     except Exception as ex:
         body = {
             'meta_data': {
@@ -370,11 +981,15 @@ def generate_report():
         resp = jsonify(body)
         resp.status_code = 400
     else:
-        if files is not None:
+        if summary is not None:
             body = {
                 'data': {
                     'report_url': report_url,
-                    'allure_results_files': files
+                    'allure_results_files': summary['file_names'],
+                    'allure_results_files_count': summary['count'],
+                    'job_id': job.id,
+                    'stages': job.stages,
+                    'hooks': job.hooks
                 },
                 'meta_data': {
                     'message' : "Report successfully generated for project_id '{}'".format(project_id)
@@ -383,7 +998,10 @@ def generate_report():
         else:
             body = {
                 'data': {
-                    'report_url': report_url
+                    'report_url': report_url,
+                    'job_id': job.id,
+                    'stages': job.stages,
+                    'hooks': job.hooks
                 },
                 'meta_data': {
                     'message' : "Report successfully generated for project_id '{}'".format(project_id)
@@ -410,9 +1028,9 @@ def clean_history():
             resp.status_code = 404
             return resp
 
-        check_process(CLEAN_HISTORY_PROCESS, project_id)
-
-        call([CLEAN_HISTORY_PROCESS, project_id, ORIGIN])
+        clean_project_history(project_id)
+    except AdmissionError as ex:
+        resp = get_admission_error_response(ex)
     except Exception as ex:
         body = {
             'meta_data': {
@@ -447,10 +1065,9 @@ def clean_results():
             resp.status_code = 404
             return resp
 
-        check_process(GENERATE_REPORT_PROCESS, project_id)
-        check_process(CLEAN_RESULTS_PROCESS, project_id)
-
-        call([CLEAN_RESULTS_PROCESS, project_id, ORIGIN])
+        clean_project_results(project_id)
+    except AdmissionError as ex:
+        resp = get_admission_error_response(ex)
     except Exception as ex:
         body = {
             'meta_data': {
@@ -470,6 +1087,116 @@ def clean_results():
 
     return resp
 
+@app.route("/bulk-operation", methods=['POST'], strict_slashes=False)
+@app.route("/allure-docker-service/bulk-operation", methods=['POST'], strict_slashes=False)
+def bulk_operation():
+    try:
+        if not request.is_json:
+            raise Exception("Header 'Content-Type' is not 'application/json'")
+
+        json = request.get_json()
+
+        if 'operation' not in json:
+            raise Exception("'operation' is required in the body")
+
+        operation = json['operation']
+        if operation not in BULK_OPERATIONS:
+            raise Exception("'operation' should be one of {}".format(BULK_OPERATIONS))
+
+        if 'project_ids' not in json and 'project_id_pattern' not in json:
+            raise Exception("'project_ids' array or 'project_id_pattern' is required in the body")
+
+        project_ids = []
+        if 'project_ids' in json:
+            if isinstance(json['project_ids'], list) is False:
+                raise Exception("'project_ids' should be an array")
+            for project_id in json['project_ids']:
+                if isinstance(project_id, str) is False:
+                    raise Exception("'project_ids' should contain strings")
+                if project_id not in project_ids:
+                    project_ids.append(project_id)
+
+        if 'project_id_pattern' in json:
+            if isinstance(json['project_id_pattern'], str) is False or not json['project_id_pattern'].strip():
+                raise Exception("'project_id_pattern' should be a non empty string")
+            for project_id in sorted(fnmatch.filter(get_project_ids(), json['project_id_pattern'])):
+                if project_id not in project_ids:
+                    project_ids.append(project_id)
+
+        if not project_ids:
+            raise Exception("No projects found for the bulk operation")
+
+        execution_name = json.get('execution_name') or 'Execution On Demand'
+        execution_from = json.get('execution_from') or ''
+        execution_type = json.get('execution_type') or ''
+
+        fail_fast = json.get('fail_fast', False)
+        if isinstance(fail_fast, bool) is False:
+            raise Exception("'fail_fast' should be a boolean")
+
+        # Projects of other nodes are processed by their owners, this node never does it
+        forwarded = CLUSTER_FORWARDED_HEADER in request.headers
+        bulk_job = create_bulk_job(operation, project_ids)
+        for project_id in project_ids:
+            BULK_OPERATION_EXECUTOR.submit(run_bulk_operation_item, bulk_job, operation, project_id, execution_name,
+                execution_from, execution_type, fail_fast, forwarded)
+    except AdmissionError as ex:
+        resp = get_admission_error_response(ex)
+    except Exception as ex:
+        body = {
+            'meta_data': {
+                'message' : str(ex)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 400
+    else:
+        status_url = url_for('get_bulk_operation', bulk_operation_id=bulk_job['id'], _external=True)
+        body = {
+            'data': {
+                'bulk_operation_id': bulk_job['id'],
+                'operation': operation,
+                'projects_count': len(project_ids),
+                'status_url': status_url
+            },
+            'meta_data': {
+                'message' : "Bulk operation '{}' queued for {} project/s".format(operation, len(project_ids))
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 202
+        resp.headers['Location'] = status_url
+
+    return resp
+
+@app.route("/bulk-operation/<bulk_operation_id>", strict_slashes=False)
+@app.route("/allure-docker-service/bulk-operation/<bulk_operation_id>", strict_slashes=False)
+def get_bulk_operation(bulk_operation_id):
+    with BULK_JOBS_LOCK:
+        bulk_job = BULK_JOBS.get(bulk_operation_id)
+        if bulk_job is not None:
+            bulk_job = copy.deepcopy(bulk_job)
+
+    if bulk_job is None:
+        body = {
+            'meta_data': {
+                'message' : "bulk_operation_id '{}' not found".format(bulk_operation_id)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 404
+        return resp
+
+    body = {
+        'data': bulk_job,
+        'meta_data': {
+            'message' : "Bulk operation successfully obtained"
+        }
+    }
+    resp = jsonify(body)
+    resp.status_code = 200
+    return resp
+
 @app.route("/emailable-report/render", strict_slashes=False)
 @app.route("/allure-docker-service/emailable-report/render", strict_slashes=False)
 def emailable_report_render():
@@ -485,38 +1212,11 @@ def emailable_report_render():
             resp.status_code = 404
             return resp
 
-        check_process(GENERATE_REPORT_PROCESS, project_id)
-
-        project_path=get_project_path(project_id)
-        tests_cases_latest_report_project='{}/reports/latest/data/test-cases/*.json'.format(project_path)
-
-        files = glob.glob(tests_cases_latest_report_project)
-        testCases = []
-        for fileName in files:
-            with open(fileName) as f:
-                jsonString = f.read()
-                app.logger.debug("----TestCase-JSON----")
-                app.logger.debug(jsonString)
-                testCase = json.loads(jsonString)
-                if testCase["hidden"] is False:
-                    testCases.append(testCase)
-
-        server_url = url_for('latest_report', project_id=project_id, _external=True)
+        check_project_lock(project_id)
 
-        if "SERVER_URL" in os.environ:
-            app.logger.info('Overriding Allure Server Url')
-            server_url = os.environ['SERVER_URL']
-
-        report = render_template(DEFAULT_TEMPLATE, css=CSS, title=TITLE, projectId=project_id, serverUrl=server_url, testCases=testCases)
-
-        emailable_report_path = '{}/reports/{}'.format(project_path, EMAILABLE_REPORT_FILE_NAME)
-        f = None
-        try:
-            f = open(emailable_report_path, "w")
-            f.write(report)
-        finally:
-            if f is not None:
-                f.close()
+        report = render_emailable_report(project_id)
+    except AdmissionError as ex:
+        return get_admission_error_response(ex)
     except Exception as ex:
         body = {
             'meta_data': {
@@ -544,12 +1244,18 @@ def emailable_report_export():
             resp.status_code = 404
             return resp
 
-        check_process(GENERATE_REPORT_PROCESS, project_id)
+        check_project_lock(project_id)
 
         project_path=get_project_path(project_id)
         emailable_report_path = '{}/reports/{}'.format(project_path, EMAILABLE_REPORT_FILE_NAME)
-
-        report = send_file(emailable_report_path, as_attachment=True)
+        if STORAGE.name != 'local':
+            emailable_report_path = STORAGE.get_report_file(project_id, EMAILABLE_REPORT_FILE_NAME)
+            if emailable_report_path is None:
+                raise Exception("Emailable report not found for project_id '{}'".format(project_id))
+
+        report = send_file(emailable_report_path, mimetype='text/html', as_attachment=True, attachment_filename=EMAILABLE_REPORT_FILE_NAME)
+    except AdmissionError as ex:
+        return get_admission_error_response(ex)
     except Exception as ex:
         message = str(ex)
 
@@ -579,7 +1285,7 @@ def report_export():
             resp.status_code = 404
             return resp
 
-        check_process(GENERATE_REPORT_PROCESS, project_id)
+        check_project_lock(project_id)
 
         project_path=get_project_path(project_id)
         reports_project='{}/reports/latest'.format(project_path)
@@ -607,6 +1313,8 @@ def report_export():
             as_attachment=True,
             attachment_filename='allure-docker-service-report.zip'
         )
+    except AdmissionError as ex:
+        return get_admission_error_response(ex)
     except Exception as ex:
         message = str(ex)
 
@@ -639,18 +1347,11 @@ def create_project():
         if not json['id'].strip():
             raise Exception("'id' should not be empty")
 
-        project_id_pattern = re.compile('^[a-z\d]([a-z\d -]*[a-z\d])?$')
-        match = project_id_pattern.match(json['id'])
-        if  match is None:
-            raise Exception("'id' should contains alphanumeric lowercase characters or hyphens. For example: 'my-project-id'")
-
         project_id = json['id']
+        check_new_project_id(project_id)
         if is_existent_project(project_id) is True:
             raise Exception("project_id '{}' is existent".format(project_id))
 
-        if project_id == 'default':
-            raise Exception("The id 'default' is not allowed. Try with another project_id")
-
         project_path=get_project_path(project_id)
         latest_report_project='{}/reports/latest'.format(project_path)
         results_project='{}/results'.format(project_path)
@@ -660,6 +1361,10 @@ def create_project():
 
         if not os.path.exists(results_project):
             os.makedirs(results_project)
+
+        STORAGE.create_project(project_id)
+        EVENT_BUS.publish('project-created', project_id)
+        DASHBOARD.update(project_id)
     except Exception as ex:
         body = {
             'meta_data': {
@@ -700,6 +1405,10 @@ def delete_project(project_id):
 
         project_path=get_project_path(project_id)
         shutil.rmtree(project_path)
+        STORAGE.delete_project(project_id)
+        forget_project(project_id)
+        EVENT_BUS.publish('project-deleted', project_id)
+        DASHBOARD.remove(project_id)
     except Exception as ex:
         body = {
             'meta_data': {
@@ -732,16 +1441,11 @@ def get_project(project_id):
             resp.status_code = 404
             return resp
 
-        project_reports_path = '{}/reports'.format(get_project_path(project_id))
         reports_entity = []
 
-        directories = os.listdir(project_reports_path)
-        for file in directories:
-            file_path = '{}/{}/index.html'.format(project_reports_path, file)
-            is_file = os.path.isfile(file_path)
-            if is_file is True:
-                report = url_for('get_reports', project_id=project_id, path='{}/index.html'.format(file), _external=True)
-                reports_entity.append([report, os.path.getmtime(file_path), file])
+        for file, mtime in STORAGE.list_reports(project_id):
+            report = url_for('get_reports', project_id=project_id, path='{}/index.html'.format(file), _external=True)
+            reports_entity.append([report, mtime, file])
 
         reports_entity.sort(key=lambda reports_entity:reports_entity[1], reverse=True)
         reports = []
@@ -780,18 +1484,324 @@ def get_project(project_id):
         resp.status_code = 400
         return resp
 
+@app.route('/projects/<project_id>/jobs', strict_slashes=False)
+@app.route("/allure-docker-service/projects/<project_id>/jobs", strict_slashes=False)
+def get_generation_jobs(project_id):
+    if is_existent_project(project_id) is False:
+        body = {
+            'meta_data': {
+            'message' : "project_id '{}' not found".format(project_id)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 404
+        return resp
+
+    with GENERATION_JOBS_LOCK:
+        jobs = list(GENERATION_JOBS.get(project_id, []))
+
+    body = {
+        'data': {
+            'jobs': [job.to_dict() for job in jobs]
+        },
+        'meta_data': {
+            'message' : "Jobs successfully obtained"
+        }
+    }
+    resp = jsonify(body)
+    resp.status_code = 200
+    return resp
+
+@app.route('/projects/<project_id>/jobs/<job_id>', strict_slashes=False)
+@app.route("/allure-docker-service/projects/<project_id>/jobs/<job_id>", strict_slashes=False)
+def get_generation_job(project_id, job_id):
+    with GENERATION_JOBS_LOCK:
+        jobs = [job for job in GENERATION_JOBS.get(project_id, []) if job.id == job_id]
+
+    if not jobs:
+        body = {
+            'meta_data': {
+            'message' : "job_id '{}' not found for project_id '{}'".format(job_id, project_id)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 404
+        return resp
+
+    body = {
+        'data': {
+            'job': jobs[0].to_dict()
+        },
+        'meta_data': {
+            'message' : "Job successfully obtained"
+        }
+    }
+    resp = jsonify(body)
+    resp.status_code = 200
+    return resp
+
+@app.route('/projects/<project_id>/results', strict_slashes=False)
+@app.route("/allure-docker-service/projects/<project_id>/results", strict_slashes=False)
+def get_project_results(project_id):
+    try:
+        if is_existent_project(project_id) is False:
+            body = {
+                'meta_data': {
+                'message' : "project_id '{}' not found".format(project_id)
+                }
+            }
+            resp = jsonify(body)
+            resp.status_code = 404
+            return resp
+
+        try:
+            page = int(request.args.get('page', 1))
+            page_size = int(request.args.get('page_size', RESULTS_PAGE_SIZE))
+        except ValueError:
+            raise Exception("'page' and 'page_size' should be integers")
+        if page < 1 or page_size < 1 or page_size > RESULTS_MAX_PAGE_SIZE:
+            raise Exception("'page' should be greater than 0 and 'page_size' between 1 and {}".format(RESULTS_MAX_PAGE_SIZE))
+
+        file_type = request.args.get('type')
+        if file_type is not None and file_type not in FILE_TYPES:
+            raise Exception("'type' should be one of {}".format(FILE_TYPES))
+
+        total, files = get_results_index(project_id).search((page - 1) * page_size, page_size, file_type, request.args.get('pattern'))
+    except Exception as ex:
+        body = {
+            'meta_data': {
+                'message' : str(ex)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 400
+    else:
+        body = {
+            'data': {
+                'files': files,
+                'page': page,
+                'page_size': page_size,
+                'total': total,
+                'pages': (total + page_size - 1) // page_size
+            },
+            'meta_data': {
+                'message' : "Results successfully obtained for project_id '{}'".format(project_id)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 200
+    return resp
+
+@app.route('/projects/<project_id>/runs', methods=['POST'], strict_slashes=False)
+@app.route("/allure-docker-service/projects/<project_id>/runs", methods=['POST'], strict_slashes=False)
+def create_run(project_id):
+    try:
+        if is_existent_project(project_id) is False:
+            body = {
+                'meta_data': {
+                'message' : "project_id '{}' not found".format(project_id)
+                }
+            }
+            resp = jsonify(body)
+            resp.status_code = 404
+            return resp
+
+        if not request.is_json:
+            raise Exception("Header 'Content-Type' is not 'application/json'")
+
+        json = request.get_json()
+        expected_shards = json.get('expected_shards')
+        if isinstance(expected_shards, int) is False or expected_shards < 1 or expected_shards > RUN_MAX_SHARDS:
+            raise Exception("'expected_shards' should be an integer between 1 and {}".format(RUN_MAX_SHARDS))
+
+        timeout_seconds = json.get('timeout_seconds', RUN_TIMEOUT_SECONDS)
+        if isinstance(timeout_seconds, int) is False or timeout_seconds < 1:
+            raise Exception("'timeout_seconds' should be a positive integer")
+
+        clean_results = json.get('clean_results', False)
+        if isinstance(clean_results, bool) is False:
+            raise Exception("'clean_results' should be a boolean")
+
+        run = RUNS.create(project_id, expected_shards, timeout_seconds, json.get('execution_name') or 'Execution On Demand',
+            json.get('execution_from') or '', json.get('execution_type') or '', clean_results)
+        EVENT_BUS.publish('run-opened', project_id, {'run_id': run['id'], 'expected_shards': expected_shards})
+    except Exception as ex:
+        body = {
+            'meta_data': {
+                'message' : str(ex)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 400
+    else:
+        body = {
+            'data': {
+                'run': run
+            },
+            'meta_data': {
+                'message' : "Run successfully created for project_id '{}'".format(project_id)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 201
+    return resp
+
+@app.route('/projects/<project_id>/runs', strict_slashes=False)
+@app.route("/allure-docker-service/projects/<project_id>/runs", strict_slashes=False)
+def get_runs(project_id):
+    if is_existent_project(project_id) is False:
+        body = {
+            'meta_data': {
+            'message' : "project_id '{}' not found".format(project_id)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 404
+        return resp
+
+    body = {
+        'data': {
+            'runs': RUNS.list(project_id)
+        },
+        'meta_data': {
+            'message' : "Runs successfully obtained"
+        }
+    }
+    resp = jsonify(body)
+    resp.status_code = 200
+    return resp
+
+@app.route('/projects/<project_id>/runs/<run_id>', strict_slashes=False)
+@app.route("/allure-docker-service/projects/<project_id>/runs/<run_id>", strict_slashes=False)
+def get_run(project_id, run_id):
+    run = None
+    if is_existent_project(project_id) is True:
+        run = RUNS.get(project_id, secure_filename(run_id))
+
+    if run is None:
+        body = {
+            'meta_data': {
+            'message' : "run_id '{}' not found for project_id '{}'".format(run_id, project_id)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 404
+        return resp
+
+    body = {
+        'data': {
+            'run': run
+        },
+        'meta_data': {
+            'message' : "Run successfully obtained"
+        }
+    }
+    resp = jsonify(body)
+    resp.status_code = 200
+    return resp
+
+@app.route('/projects/<project_id>/runs/<run_id>/shards/<shard>/complete', methods=['POST'], strict_slashes=False)
+@app.route("/allure-docker-service/projects/<project_id>/runs/<run_id>/shards/<shard>/complete", methods=['POST'], strict_slashes=False)
+def complete_run_shard(project_id, run_id, shard):
+    try:
+        if is_existent_project(project_id) is False:
+            raise RunError("project_id '{}' not found".format(project_id), 404)
+
+        run_id = secure_filename(run_id)
+        shard = secure_filename(shard)
+        if not shard:
+            raise RunError("'shard' should be a valid name")
+
+        run = RUNS.complete_shard(project_id, run_id, shard)
+        EVENT_BUS.publish('shard-completed', project_id, {'run_id': run_id, 'shard': shard,
+            'completed_shards_count': len([value for value in run['shards'].values() if value['status'] == runs.SHARD_COMPLETE]),
+            'expected_shards': run['expected_shards']})
+        if run['status'] == runs.READY:
+            run = submit_run(project_id, run_id)
+    except RunError as ex:
+        body = {
+            'meta_data': {
+                'message' : str(ex)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = ex.status_code
+    except Exception as ex:
+        body = {
+            'meta_data': {
+                'message' : str(ex)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 400
+    else:
+        body = {
+            'data': {
+                'run': run
+            },
+            'meta_data': {
+                'message' : "Shard '{}' successfully completed for run_id '{}'".format(shard, run_id)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 200
+    return resp
+
+@app.route('/projects/<project_id>/events', strict_slashes=False)
+@app.route("/allure-docker-service/projects/<project_id>/events", strict_slashes=False)
+def get_project_events(project_id):
+    if is_existent_project(project_id) is False:
+        body = {
+            'meta_data': {
+            'message' : "project_id '{}' not found".format(project_id)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 404
+        return resp
+
+    return stream_events(project_id)
+
+@app.route('/events', strict_slashes=False)
+@app.route("/allure-docker-service/events", strict_slashes=False)
+def get_events():
+    return stream_events()
+
+@app.route('/dashboard', strict_slashes=False)
+@app.route("/allure-docker-service/dashboard", strict_slashes=False)
+def get_dashboard():
+    if DASHBOARD.is_loaded() is False:
+        # Never loaded in a request thread
+        DASHBOARD.load_in_background(get_project_ids)
+        return get_admission_error_response(AdmissionError('Dashboard is being loaded. Try later!', 503, 1))
+
+    etag, body = DASHBOARD.get()
+    resp = Response(body, mimetype='application/json')
+    resp.set_etag(etag)
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp.make_conditional(request)
+
 @app.route('/projects', strict_slashes=False)
 @app.route("/allure-docker-service/projects", strict_slashes=False)
 def get_projects():
     try:
-        directories = os.listdir(PROJECTS_DIRECTORY)
         projects = {}
-        for project_name in directories:
-            is_dir = os.path.isdir('{}/{}'.format(PROJECTS_DIRECTORY, project_name))
-            if is_dir is True:
-                project = {}
-                project['uri'] = url_for('get_project', project_id=project_name, _external=True)
-                projects[project_name] = project
+        for project_name in get_project_ids():
+            project = {}
+            project['uri'] = url_for('get_project', project_id=project_name, _external=True)
+            projects[project_name] = project
+
+        if CLUSTER_RING is not None and CLUSTER_FORWARDED_HEADER not in request.headers:
+            for node in CLUSTER_RING.nodes:
+                if node == CLUSTER_NODE_URL:
+                    continue
+                try:
+                    response = CLUSTER_SESSION.get('{}/allure-docker-service/projects'.format(node),
+                        headers={CLUSTER_FORWARDED_HEADER: CLUSTER_NODE_URL}, timeout=CLUSTER_TIMEOUT_SECONDS)
+                    for project_name, project in response.json()['data']['projects'].items():
+                        projects.setdefault(project_name, project)
+                except Exception as ex:
+                    app.logger.error("Unable to get projects from node '{}': {}".format(node, str(ex)))
 
         body = {
             'data': {
@@ -814,18 +1824,455 @@ def get_projects():
         resp.status_code = 400
         return resp
 
+@app.route('/profiles', strict_slashes=False)
+@app.route("/allure-docker-service/profiles", strict_slashes=False)
+def get_profiles():
+    if is_allowed(PROFILING_ALLOWLIST, request.remote_addr) is False:
+        body = {
+            'meta_data': {
+                'message' : "Address '{}' is not allowed to access profiles".format(request.remote_addr)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 403
+        return resp
+
+    profiles = PROFILE_STORE.list()
+    for profile in profiles:
+        profile['urls'] = {}
+        for profile_format in profile['formats']:
+            profile['urls'][profile_format] = url_for('get_profile', profile_id=profile['id'], format=profile_format, _external=True)
+
+    body = {
+        'data': {
+            'profiles': profiles
+        },
+        'meta_data': {
+            'message' : "Profiles successfully obtained"
+        }
+    }
+    resp = jsonify(body)
+    resp.status_code = 200
+    return resp
+
+@app.route('/profiles/<profile_id>', strict_slashes=False)
+@app.route("/allure-docker-service/profiles/<profile_id>", strict_slashes=False)
+def get_profile(profile_id):
+    if is_allowed(PROFILING_ALLOWLIST, request.remote_addr) is False:
+        body = {
+            'meta_data': {
+                'message' : "Address '{}' is not allowed to access profiles".format(request.remote_addr)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 403
+        return resp
+
+    profile = PROFILE_STORE.get(secure_filename(profile_id))
+    profile_format = request.args.get('format')
+    if profile is not None and profile_format is None:
+        profile_format = profile['formats'][0]
+
+    if profile is None or profile_format not in profile['formats']:
+        body = {
+            'meta_data': {
+                'message' : "profile_id '{}' not found".format(profile_id)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 404
+        return resp
+
+    return send_file(PROFILE_STORE.get_path(profile['id'], profile_format), mimetype=PROFILE_FORMATS[profile_format],
+        as_attachment=True, attachment_filename='{}.{}'.format(profile['id'], profile_format))
+
+@app.route('/cluster', strict_slashes=False)
+@app.route("/allure-docker-service/cluster", strict_slashes=False)
+def get_cluster():
+    try:
+        check_cluster_mode()
+
+        body = {
+            'data': {
+                'node_url': CLUSTER_NODE_URL,
+                'nodes': CLUSTER_RING.nodes,
+                'routing': CLUSTER_ROUTING,
+                'projects': get_project_ids(),
+                'last_rebalance': CLUSTER_STATUS['last_rebalance']
+            },
+            'meta_data': {
+                'message' : "Cluster successfully obtained"
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 200
+        return resp
+    except Exception as ex:
+        body = {
+            'meta_data': {
+                'message' : str(ex)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 400
+        return resp
+
+@app.route('/cluster/nodes', methods=['POST'], strict_slashes=False)
+@app.route("/allure-docker-service/cluster/nodes", methods=['POST'], strict_slashes=False)
+def add_cluster_node():
+    if is_cluster_admin_request() is False:
+        body = {
+            'meta_data': {
+                'message' : "Address '{}' is not allowed to manage the cluster".format(request.remote_addr)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 403
+        return resp
+
+    try:
+        check_cluster_mode()
+
+        if not request.is_json:
+            raise Exception("Header 'Content-Type' is not 'application/json'")
+
+        json = request.get_json()
+
+        if 'url' not in json or isinstance(json['url'], str) is False or not json['url'].strip():
+            raise Exception("'url' is required in the body")
+
+        node = json['url'].strip().rstrip('/')
+        if re.match('^https?://', node) is None:
+            raise Exception("'url' should start with 'http://' or 'https://'")
+
+        if is_allowed_cluster_node(node) is False:
+            body = {
+                'meta_data': {
+                    'message' : "Node '{}' is not allowed. Use 'CLUSTER_ALLOWED_NODES' environment variable".format(node)
+                }
+            }
+            resp = jsonify(body)
+            resp.status_code = 403
+            return resp
+
+        previous_nodes = list(CLUSTER_RING.nodes)
+        added = CLUSTER_RING.add_node(node)
+        if added is True:
+            save_cluster_nodes()
+
+        if CLUSTER_FORWARDED_HEADER not in request.headers:
+            for cluster_node in previous_nodes:
+                if cluster_node != CLUSTER_NODE_URL:
+                    post_cluster_request(cluster_node, '/cluster/nodes', json={'url': node})
+            for cluster_node in previous_nodes:
+                post_cluster_request(node, '/cluster/nodes', json={'url': cluster_node})
+
+        if added is True:
+            Thread(target=rebalance_cluster_projects, daemon=True).start()
+    except Exception as ex:
+        body = {
+            'meta_data': {
+                'message' : str(ex)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 400
+    else:
+        body = {
+            'data': {
+                'nodes': CLUSTER_RING.nodes
+            },
+            'meta_data': {
+                'message' : "Node '{}' successfully added. Rebalancing projects".format(node) if added else "Node '{}' is existent".format(node)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 200
+    return resp
+
+@app.route('/cluster/rebalance', methods=['POST'], strict_slashes=False)
+@app.route("/allure-docker-service/cluster/rebalance", methods=['POST'], strict_slashes=False)
+def rebalance_cluster():
+    if is_cluster_admin_request() is False:
+        body = {
+            'meta_data': {
+                'message' : "Address '{}' is not allowed to manage the cluster".format(request.remote_addr)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 403
+        return resp
+
+    try:
+        check_cluster_mode()
+        Thread(target=rebalance_cluster_projects, daemon=True).start()
+    except Exception as ex:
+        body = {
+            'meta_data': {
+                'message' : str(ex)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 400
+    else:
+        body = {
+            'meta_data': {
+                'message' : "Rebalancing projects for node '{}'".format(CLUSTER_NODE_URL)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 202
+    return resp
+
+@app.route('/cluster/projects/<project_id>', methods=['POST'], strict_slashes=False)
+@app.route("/allure-docker-service/cluster/projects/<project_id>", methods=['POST'], strict_slashes=False)
+def receive_cluster_project(project_id):
+    if is_cluster_admin_request() is False:
+        body = {
+            'meta_data': {
+                'message' : "Address '{}' is not allowed to manage the cluster".format(request.remote_addr)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 403
+        return resp
+
+    try:
+        check_cluster_mode()
+
+        if is_existent_project(project_id) is True:
+            body = {
+                'meta_data': {
+                    'message' : "project_id '{}' is existent".format(project_id)
+                }
+            }
+            resp = jsonify(body)
+            resp.status_code = 409
+            return resp
+
+        import_project_archive(project_id, request.stream)
+        forget_project(project_id)
+        RUNS.load_pending(project_id)
+        EVENT_BUS.publish('project-created', project_id, {'moved_from': request.headers.get(CLUSTER_FORWARDED_HEADER)})
+        DASHBOARD.update(project_id)
+    except Exception as ex:
+        body = {
+            'meta_data': {
+                'message' : str(ex)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 400
+    else:
+        body = {
+            'meta_data': {
+                'message' : "project_id '{}' successfully received".format(project_id)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 201
+    return resp
+
+@app.route('/projects/<project_id>/diff', strict_slashes=False)
+@app.route("/allure-docker-service/projects/<project_id>/diff", strict_slashes=False)
+def get_project_diff(project_id):
+    try:
+        if is_existent_project(project_id) is False:
+            body = {
+                'meta_data': {
+                'message' : "project_id '{}' not found".format(project_id)
+                }
+            }
+            resp = jsonify(body)
+            resp.status_code = 404
+            return resp
+
+        # Build orders are listed without checking the reports, cached diffs don't need it
+        build_orders = sorted(STORAGE.list_build_orders(project_id))
+
+        head = request.args.get('head', pipeline.LATEST_REPORT)
+        base = request.args.get('base')
+        if base is None:
+            # The previous build of the head
+            head_build_order = int(head) if head.isdigit() else get_latest_build_order(project_id)
+            if head_build_order is None and build_orders:
+                # Without executor the latest report is the last stored build
+                head_build_order = build_orders[-1]
+            previous_build_orders = [build_order for build_order in build_orders
+                                     if head_build_order is None or build_order < head_build_order]
+            if not previous_build_orders:
+                raise Exception("There are no builds previous to '{}' for project_id '{}'".format(head, project_id))
+            base = str(previous_build_orders[-1])
+
+        try:
+            slower_factor = float(request.args.get('slower_factor', DIFF_SLOWER_FACTOR))
+        except ValueError:
+            raise Exception("'slower_factor' should be a number")
+        if slower_factor <= 1:
+            raise Exception("'slower_factor' should be greater than 1")
+
+        missing_builds = [build for build in [base, head]
+                          if build != pipeline.LATEST_REPORT and (build.isdigit() is False or int(build) not in build_orders)]
+        key = (project_id, base, head, slower_factor)
+        diff = None
+        if base.isdigit() and head.isdigit() and not missing_builds:
+            diff = DIFFS.get(key)
+        if diff is None and not missing_builds:
+            # Only the builds with a report are compared
+            builds = [name for name, _ in STORAGE.list_reports(project_id)]
+            missing_builds = [build for build in [base, head] if build not in builds]
+
+        if missing_builds:
+            body = {
+                'meta_data': {
+                'message' : "build '{}' not found for project_id '{}'".format(missing_builds[0], project_id)
+                }
+            }
+            resp = jsonify(body)
+            resp.status_code = 404
+            return resp
+
+        if diff is None:
+            if pipeline.LATEST_REPORT in [base, head]:
+                check_project_lock(project_id)
+            diff = diff_tests_summaries(load_tests_summary(project_id, base), load_tests_summary(project_id, head), slower_factor)
+            if base.isdigit() and head.isdigit():
+                DIFFS.put(key, diff)
+    except AdmissionError as ex:
+        resp = get_admission_error_response(ex)
+    except Exception as ex:
+        body = {
+            'meta_data': {
+                'message' : str(ex)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 400
+    else:
+        data = {'base': base, 'head': head}
+        data.update(diff)
+        body = {
+            'data': data,
+            'meta_data': {
+                'message' : "Diff successfully obtained for project_id '{}'".format(project_id)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 200
+    return resp
+
+@app.route('/projects/<project_id>/snapshot', strict_slashes=False)
+@app.route("/allure-docker-service/projects/<project_id>/snapshot", strict_slashes=False)
+def export_project_snapshot(project_id):
+    try:
+        if is_existent_project(project_id) is False:
+            body = {
+                'meta_data': {
+                'message' : "project_id '{}' not found".format(project_id)
+                }
+            }
+            resp = jsonify(body)
+            resp.status_code = 404
+            return resp
+
+        check_snapshot_storage()
+        compression = request.args.get('compression', 'none')
+        if compression not in SNAPSHOT_COMPRESSIONS:
+            raise Exception("'compression' should be one of {}".format(list(SNAPSHOT_COMPRESSIONS.keys())))
+        mode, extension, mimetype = SNAPSHOT_COMPRESSIONS[compression]
+
+        # Generations and results ingestion of the project are rejected only while it's staged,
+        # the archive is streamed from the staging directory
+        with GENERATION_ADMISSION.project(project_id):
+            with INGEST_ADMISSION.blocked(project_id, GENERATION_QUEUE_TIMEOUT_SECONDS):
+                staging_path = stage_project(project_id)
+        remove = lambda: shutil.rmtree(staging_path, ignore_errors=True)
+        try:
+            archive = ClosingIterator(stream_project_archive(project_id, mode, '{}/{}'.format(staging_path, project_id)), [remove])
+        except Exception:
+            remove()
+            raise
+    except AdmissionError as ex:
+        return get_admission_error_response(ex)
+    except Exception as ex:
+        body = {
+            'meta_data': {
+                'message' : str(ex)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 400
+        return resp
+
+    return Response(archive, mimetype=mimetype, direct_passthrough=True,
+        headers={'Content-Disposition': 'attachment; filename={}.{}'.format(project_id, extension)})
+
+@app.route('/projects/<project_id>/snapshot', methods=['POST'], strict_slashes=False)
+@app.route("/allure-docker-service/projects/<project_id>/snapshot", methods=['POST'], strict_slashes=False)
+def import_project_snapshot(project_id):
+    try:
+        check_snapshot_storage()
+        check_new_project_id(project_id)
+        if is_existent_project(project_id) is True:
+            body = {
+                'meta_data': {
+                    'message' : "project_id '{}' is existent".format(project_id)
+                }
+            }
+            resp = jsonify(body)
+            resp.status_code = 409
+            return resp
+
+        import_project_archive(project_id, request.stream)
+        RESULTS_INDEX.forget(project_id)
+        RUNS.load_pending(project_id)
+        EVENT_BUS.publish('project-created', project_id, {'snapshot': True})
+        DASHBOARD.update(project_id)
+    except Exception as ex:
+        body = {
+            'meta_data': {
+                'message' : str(ex)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 400
+    else:
+        body = {
+            'data': {
+                'id': project_id
+            },
+            'meta_data': {
+                'message' : "project_id '{}' successfully imported".format(project_id)
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 201
+    return resp
+
 @app.route('/projects/<project_id>/reports/<path:path>')
 @app.route("/allure-docker-service/projects/<project_id>/reports/<path:path>")
 def get_reports(project_id, path):
     try:
         project_path = '{}/reports/{}'.format(project_id, path)
+        if STORAGE.name != 'local':
+            return send_storage_report_file(project_id, path)
         return send_from_directory(PROJECTS_DIRECTORY, project_path)
     except Exception as ex:
         if(request.args.get('redirect') == 'false'):
+            if STORAGE.name != 'local':
+                return send_storage_report_file(project_id, path)
             return send_from_directory(PROJECTS_DIRECTORY, project_path)
         return redirect(url_for('get_project', project_id=project_id, _external=True))
 
 
+def check_new_project_id(project_id):
+    match = PROJECT_ID_PATTERN.match(project_id)
+    if  match is None:
+        raise Exception("'id' should contains alphanumeric lowercase characters or hyphens. For example: 'my-project-id'")
+
+    if project_id == 'default':
+        raise Exception("The id 'default' is not allowed. Try with another project_id")
+
 def is_existent_project(project_id):
     if not project_id.strip():
         return False
@@ -840,16 +2287,1027 @@ def resolve_project(project_id_param):
         project_id = project_id_param
     return project_id
 
-def check_process(process_file, project_id):
-    tmp = os.popen('ps -Af | grep -w {}'.format(project_id)).read()
-    proccount = tmp.count(process_file)
+def get_project_ids():
+    project_ids = []
+    for project_name in os.listdir(PROJECTS_DIRECTORY):
+        if project_name.startswith('.') is False and os.path.isdir('{}/{}'.format(PROJECTS_DIRECTORY, project_name)):
+            project_ids.append(project_name)
+    return project_ids
+
+def acquire_project_lock(project_id, wait=True, bounded=True):
+    return GENERATION_ADMISSION.generation(project_id, wait, bounded)
+
+def check_project_lock(project_id):
+    if GENERATION_ADMISSION.is_running(project_id) or project_id in WRITER_GENERATING_PROJECTS:
+        raise AdmissionError("Processing files for project_id '{}'. Try later!".format(project_id), 429,
+            GENERATION_ADMISSION.get_retry_after(project_id))
+
+def get_admission_error_response(ex):
+    body = {
+        'meta_data': {
+            'message' : str(ex)
+        }
+    }
+    resp = jsonify(body)
+    resp.status_code = ex.status_code
+    if ex.retry_after is not None:
+        resp.headers['Retry-After'] = str(ex.retry_after)
+    return resp
+
+def build_emailable_report(project_id):
+    project_path=get_project_path(project_id)
+    tests_cases_latest_report_project='{}/reports/latest/data/test-cases/*.json'.format(project_path)
+
+    files = glob.glob(tests_cases_latest_report_project)
+    testCases = []
+    for fileName in files:
+        with open(fileName) as f:
+            jsonString = f.read()
+            app.logger.debug("----TestCase-JSON----")
+            app.logger.debug(jsonString)
+            testCase = json.loads(jsonString)
+            if testCase["hidden"] is False:
+                testCases.append(testCase)
+
+    server_url = url_for('latest_report', project_id=project_id, _external=True)
+
+    if "SERVER_URL" in os.environ:
+        app.logger.info('Overriding Allure Server Url')
+        server_url = os.environ['SERVER_URL']
+
+    report = render_template(DEFAULT_TEMPLATE, css=CSS, title=TITLE, projectId=project_id, serverUrl=server_url, testCases=testCases)
+    if SERVER_MODE == 'replica':
+        # The emailable report file is written by the writer node
+        return report
+
+    emailable_report_path = '{}/reports/{}'.format(project_path, EMAILABLE_REPORT_FILE_NAME)
+    # Replaced, snapshots being sent keep the previous file
+    pipeline.replace_file(emailable_report_path, report)
+    STORAGE.save_report_file(project_id, EMAILABLE_REPORT_FILE_NAME)
+    return report
+
+def render_emailable_report(project_id):
+    if has_request_context():
+        return build_emailable_report(project_id)
+
+    # Generations out of requests (watcher, bulk operations) build the urls with the local address of the API
+    with app.test_request_context(base_url='{}://localhost:{}'.format(URL_SCHEME, PORT)):
+        return build_emailable_report(project_id)
+
+def get_report_url(project_id, build_order):
+    if has_request_context():
+        return url_for('get_reports', project_id=project_id, path='{}/index.html'.format(build_order), _external=True)
+
+    with app.test_request_context(base_url='{}://localhost:{}'.format(URL_SCHEME, PORT)):
+        return url_for('get_reports', project_id=project_id, path='{}/index.html'.format(build_order), _external=True)
+
+def create_generation_job(project_id, store_results=True, execution_name=None, execution_from=None, execution_type=None):
+    job = GenerationJob(project_id, get_project_path(project_id), store_results=store_results, execution_name=execution_name,
+        execution_from=execution_from, execution_type=execution_type)
+    with GENERATION_JOBS_LOCK:
+        GENERATION_JOBS.setdefault(project_id, deque(maxlen=GENERATION_JOBS_HISTORY)).appendleft(job)
+    EVENT_BUS.publish('generation-queued', project_id, {'job_id': job.id})
+    return job
+
+def run_generation(job):
+    # The project should be already admitted (acquire_project_lock)
+    project_id = job.project_id
+    try:
+        STORAGE.fetch_project(project_id)
+        EVENT_BUS.publish('generation-started', project_id, {'job_id': job.id})
+        signature = get_results_signature(project_id)
+        GENERATION_PIPELINE.run(job)
+        # The watcher doesn't generate again the same results
+        RESULTS_SIGNATURES[project_id] = signature
+        # Objects of the results removed outside the API
+        prune_result_objects(project_id)
+    except Exception as ex:
+        job.status = 'failed'
+        EVENT_BUS.publish('generation-finished', project_id, {'job_id': job.id, 'status': job.status, 'error': str(ex)})
+        raise
+
+    EVENT_BUS.publish('generation-finished', project_id, {
+        'job_id': job.id,
+        'status': job.status,
+        'build_order': job.get_report_build_order(),
+        'report_url': get_report_url(project_id, job.get_report_build_order())
+    })
+    return job
+
+def emailable_report_hook(job):
+    render_emailable_report(job.project_id)
+
+def dashboard_hook(job):
+    DASHBOARD.update(job.project_id)
+
+def read_report_json(project_id, build, path):
+    file_path = '{}/reports/{}/{}'.format(get_project_path(project_id), build, path)
+    if STORAGE.name != 'local':
+        file_path = STORAGE.get_report_file(project_id, '{}/{}'.format(build, path))
+    try:
+        with open(file_path) as f:
+            return json.load(f)
+    except (OSError, TypeError, ValueError):
+        return None
+
+def load_dashboard_entry(project_id):
+    if is_existent_project(project_id) is False:
+        return None
+    return parse_summary(project_id, read_report_json(project_id, pipeline.LATEST_REPORT, 'widgets/summary.json'),
+        read_report_json(project_id, pipeline.LATEST_REPORT, 'widgets/executors.json'))
+
+def tests_summary_hook(job):
+    summary = build_tests_summary('{}/data/test-cases'.format(job.latest_report_path))
+    builds = [pipeline.LATEST_REPORT]
+    if job.stored_build_order is not None:
+        builds.append(str(job.stored_build_order))
+    for build in builds:
+        pipeline.replace_file('{}/{}/{}'.format(job.reports_path, build, TESTS_SUMMARY_FILE), json.dumps(summary, separators=(',', ':')))
+        STORAGE.save_report_file(job.project_id, '{}/{}'.format(build, TESTS_SUMMARY_FILE))
+
+def forget_project(project_id):
+    # In memory state of a project removed or replaced in this node
+    clear_result_file_hashes(project_id)
+    with GENERATION_JOBS_LOCK:
+        GENERATION_JOBS.pop(project_id, None)
+    INGEST_ADMISSION.forget(project_id)
+    RESULTS_INDEX.forget(project_id)
+    RUNS.forget(project_id)
+    forget_project_diffs(project_id)
+
+def forget_project_diffs(project_id=None):
+    TESTS_SUMMARIES.forget(project_id)
+    DIFFS.forget(project_id)
+
+def load_tests_summary(project_id, build):
+    # Stored builds don't change, their summaries are cached
+    if build != pipeline.LATEST_REPORT:
+        summary = TESTS_SUMMARIES.get((project_id, build))
+        if summary is not None:
+            return summary
+
+    summary = read_report_json(project_id, build, TESTS_SUMMARY_FILE)
+    if summary is None:
+        # Reports generated before the tests summaries
+        summary = build_tests_summary('{}/reports/{}/data/test-cases'.format(get_project_path(project_id), build))
+
+    if build != pipeline.LATEST_REPORT:
+        TESTS_SUMMARIES.put((project_id, build), summary)
+    return summary
+
+def get_latest_build_order(project_id):
+    executors = read_report_json(project_id, pipeline.LATEST_REPORT, 'widgets/executors.json')
+    try:
+        return int(executors[0]['buildOrder'])
+    except (IndexError, KeyError, TypeError, ValueError):
+        return None
+
+def generate_project_report(project_id, execution_name, execution_from, execution_type, wait=True, bounded=True):
+    job = create_generation_job(project_id, True, execution_name, execution_from, execution_type)
+    try:
+        with acquire_project_lock(project_id, wait, bounded):
+            return run_generation(job)
+    except AdmissionError as ex:
+        job.status = 'rejected'
+        EVENT_BUS.publish('generation-finished', project_id, {'job_id': job.id, 'status': job.status, 'error': str(ex)})
+        raise
+
+def clean_project_history(project_id, wait=True, bounded=True):
+    with acquire_project_lock(project_id, wait, bounded):
+        app.logger.info('Cleaning history for PROJECT_ID: {}'.format(project_id))
+        STORAGE.delete_reports(project_id)
+        pipeline.clean_history(get_project_path(project_id), EXECUTOR_FILENAME)
+        # Build orders start again, the builds are not the same anymore
+        forget_project_diffs(project_id)
+        EVENT_BUS.publish('history-cleaned', project_id)
+        run_generation(create_generation_job(project_id, False))
+
+def delete_project_results(project_id):
+    app.logger.info('Cleaning results for PROJECT_ID: {}'.format(project_id))
+    STORAGE.delete_results(project_id)
+    pipeline.clean_results(get_project_path(project_id))
+    clear_result_file_hashes(project_id)
+    RESULTS_INDEX.forget(project_id)
+    prune_result_objects(project_id)
+    EVENT_BUS.publish('results-cleaned', project_id)
+
+def clean_project_results(project_id, wait=True, bounded=True):
+    with acquire_project_lock(project_id, wait, bounded):
+        delete_project_results(project_id)
+        run_generation(create_generation_job(project_id, False))
+
+def open_run_shard(project_id, run_id, shard):
+    if shard is None or not secure_filename(shard):
+        raise RunError("'shard' parameter is required to send results to run_id '{}'".format(run_id))
+    run, shard_path = RUNS.open_shard(project_id, secure_filename(run_id), secure_filename(shard))
+    return shard_path
+
+def close_run_shard(project_id, run_id):
+    RUNS.close_shard(project_id, secure_filename(run_id))
+
+def merge_run_results(project_id, run_id):
+    files_count = 0
+    for shard_path in RUNS.get_shard_paths(project_id, run_id):
+        for entry in os.scandir(shard_path):
+            if entry.name.startswith('.') or not entry.is_file():
+                continue
+            replace_result_file(project_id, entry.path, entry.name)
+            STORAGE.save_result(project_id, entry.name)
+            files_count = files_count + 1
+    RUNS.remove_shards(project_id, run_id)
+    return files_count
+
+def set_run_status(project_id, run_id, status, **values):
+    def update(run):
+        run['status'] = status
+        run.update(values)
+    return RUNS.update(project_id, run_id, update)
+
+def finish_run(project_id, run_id):
+    if RUNS.wait_uploads(project_id, run_id, GENERATION_QUEUE_TIMEOUT_SECONDS) is False:
+        # Retried by the runs watcher
+        app.logger.info('Run {} postponed for PROJECT_ID: {} - Results are still uploaded'.format(run_id, project_id))
+        set_run_status(project_id, run_id, runs.READY)
+        return
+    try:
+        with acquire_project_lock(project_id):
+            run = RUNS.get(project_id, run_id)
+            if run['clean_results'] is True:
+                delete_project_results(project_id)
+            files_count = merge_run_results(project_id, run_id)
+            EVENT_BUS.publish('results-received', project_id, {'processed_files_count': files_count, 'failed_files_count': 0, 'run_id': run_id})
+
+            job = create_generation_job(project_id, True, run['execution_name'], run['execution_from'], run['execution_type'])
+            run_generation(job)
+            run = set_run_status(project_id, run_id, runs.FINISHED, job_id=job.id,
+                report_url=get_report_url(project_id, job.get_report_build_order()))
+    except AdmissionError as ex:
+        # Retried by the runs watcher
+        app.logger.info('Run {} postponed for PROJECT_ID: {} - {}'.format(run_id, project_id, str(ex)))
+        set_run_status(project_id, run_id, runs.READY)
+        return
+    except Exception as ex:
+        app.logger.error('Run {} failed for PROJECT_ID: {} - {}'.format(run_id, project_id, str(ex)))
+        run = set_run_status(project_id, run_id, runs.FAILED, error=str(ex))
+    EVENT_BUS.publish('run-finished', project_id, {'run_id': run_id, 'status': run['status'], 'job_id': run['job_id'],
+        'report_url': run['report_url'], 'timed_out': run['timed_out']})
+
+def submit_run(project_id, run_id):
+    claimed, run = RUNS.claim(project_id, run_id)
+    if claimed is True:
+        RUNS_EXECUTOR.submit(finish_run, project_id, run_id)
+    return run
+
+def watch_runs():
+    for project_id in get_project_ids():
+        RUNS.load_pending(project_id)
+    for run in RUNS.get_pending():
+        if run['status'] == runs.GENERATING:
+            # Interrupted by a restart
+            set_run_status(run['project_id'], run['id'], runs.READY)
+
+    last_retention_check = 0
+    while True:
+        for run in RUNS.get_pending():
+            project_id = run['project_id']
+            try:
+                if run['status'] == runs.OPEN and run['deadline'] <= int(time.time() * 1000):
+                    app.logger.info('Run {} timed out for PROJECT_ID: {}'.format(run['id'], project_id))
+                    run = RUNS.expire(project_id, run['id'])
+                if run['status'] == runs.READY:
+                    submit_run(project_id, run['id'])
+            except Exception as ex:
+                app.logger.error('Unable to check run {} for PROJECT_ID: {} - {}'.format(run['id'], project_id, str(ex)))
+
+        if time.time() - last_retention_check >= 60:
+            last_retention_check = time.time()
+            for project_id in get_project_ids():
+                try:
+                    RUNS.remove_expired(project_id, RUN_RETENTION_SECONDS)
+                except Exception as ex:
+                    app.logger.error('Unable to remove expired runs for PROJECT_ID: {} - {}'.format(project_id, str(ex)))
+        time.sleep(1)
+
+def get_results_signature(project_id):
+    signature = []
+    for entry in os.scandir('{}/results'.format(get_project_path(project_id))):
+        if entry.name in ['history', EXECUTOR_FILENAME] or entry.name.startswith('.'):
+            continue
+        stat = entry.stat()
+        signature.append((entry.name, stat.st_size, stat.st_mtime_ns))
+    signature.sort()
+    return hashlib.md5(repr(signature).encode('utf-8')).hexdigest()
+
+def watch_results():
+    app.logger.info('Checking Allure Results every {} second/s'.format(CHECK_RESULTS_EVERY_SECONDS))
+    time.sleep(5)
+    while True:
+        for project_id in get_project_ids():
+            try:
+                signature = get_results_signature(project_id)
+            except OSError:
+                RESULTS_SIGNATURES.pop(project_id, None)
+                continue
+            if signature == RESULTS_SIGNATURES.get(project_id):
+                continue
+
+            app.logger.info('Detecting results changes for PROJECT_ID: {}'.format(project_id))
+            try:
+                with acquire_project_lock(project_id, False):
+                    RESULTS_SIGNATURES[project_id] = signature
+                    run_generation(create_generation_job(project_id))
+            except Exception as ex:
+                app.logger.info('Automatic Execution postponed for PROJECT_ID: {} - {}'.format(project_id, str(ex)))
+        time.sleep(CHECK_RESULTS_EVERY_SECONDS)
+
+def generate_default_report():
+    if os.path.isfile('{}/reports/latest/index.html'.format(get_project_path('default'))):
+        return
+    try:
+        with acquire_project_lock('default', False):
+            app.logger.info('Generating default report')
+            run_generation(create_generation_job('default', False))
+    except Exception as ex:
+        app.logger.error('Unable to generate default report: {}'.format(str(ex)))
+
+def create_bulk_job(operation, project_ids):
+    bulk_job = {
+        'id': uuid.uuid4().hex,
+        'operation': operation,
+        'status': 'running',
+        'created': int(time.time() * 1000),
+        'finished': None,
+        'projects': dict((project_id, None) for project_id in project_ids),
+        'projects_count': len(project_ids),
+        'finished_projects_count': 0,
+        'failed_projects_count': 0
+    }
+    with BULK_JOBS_LOCK:
+        running_count = len([job for job in BULK_JOBS.values() if job['status'] == 'running'])
+        if running_count >= BULK_OPERATION_QUEUE_SIZE:
+            raise AdmissionError('Too many bulk operations in progress. Try later!', 503, BULK_OPERATION_POLL_SECONDS)
+        BULK_JOBS[bulk_job['id']] = bulk_job
+        finished_ids = [job_id for job_id, job in BULK_JOBS.items() if job['status'] == 'finished']
+        for job_id in finished_ids[:max(0, len(BULK_JOBS) - BULK_OPERATION_HISTORY)]:
+            BULK_JOBS.pop(job_id)
+    return bulk_job
+
+def run_bulk_operation_item(bulk_job, operation, project_id, execution_name, execution_from, execution_type, fail_fast=False, forwarded=False):
+    result = execute_bulk_operation(operation, project_id, execution_name, execution_from, execution_type, fail_fast, forwarded)
+    if 'build_order' in result:
+        result['report_url'] = get_report_url(project_id, result.pop('build_order'))
+    with BULK_JOBS_LOCK:
+        bulk_job['projects'][project_id] = result
+        bulk_job['finished_projects_count'] = bulk_job['finished_projects_count'] + 1
+        if result['status_code'] != 200:
+            bulk_job['failed_projects_count'] = bulk_job['failed_projects_count'] + 1
+        if bulk_job['finished_projects_count'] == bulk_job['projects_count']:
+            bulk_job['status'] = 'finished'
+            bulk_job['finished'] = int(time.time() * 1000)
+
+def execute_remote_bulk_operation(node, operation, project_id, execution_name, execution_from, execution_type, fail_fast=False):
+    # The owner node processes the project as a bulk operation too, with the same rules of the local projects
+    headers = {CLUSTER_FORWARDED_HEADER: CLUSTER_NODE_URL}
+    response = CLUSTER_SESSION.post('{}/allure-docker-service/bulk-operation'.format(node), headers=headers,
+        json={'operation': operation, 'project_ids': [project_id], 'execution_name': execution_name,
+              'execution_from': execution_from, 'execution_type': execution_type, 'fail_fast': fail_fast},
+        timeout=CLUSTER_TIMEOUT_SECONDS)
+    if response.status_code != 202:
+        return {'status_code': response.status_code, 'message': response.json()['meta_data']['message']}
+
+    status_url = '{}/allure-docker-service/bulk-operation/{}'.format(node, response.json()['data']['bulk_operation_id'])
+    while True:
+        time.sleep(BULK_OPERATION_POLL_SECONDS)
+        response = CLUSTER_SESSION.get(status_url, headers=headers, timeout=CLUSTER_TIMEOUT_SECONDS)
+        body = response.json()
+        if response.status_code != 200:
+            return {'status_code': response.status_code, 'message': body['meta_data']['message']}
+        if body['data']['status'] == 'finished':
+            return body['data']['projects'][project_id]
+
+def execute_bulk_operation(operation, project_id, execution_name, execution_from, execution_type, fail_fast=False, forwarded=False):
+    # Bulk items wait for the generation admission without the queue limits, the bulk workers
+    # bound them already. With fail_fast they are rejected when the project or the server is busy
+    wait = fail_fast is False
+    result = {}
+    try:
+        node = get_project_node(project_id)
+        if node != CLUSTER_NODE_URL and forwarded is False:
+            return execute_remote_bulk_operation(node, operation, project_id, execution_name, execution_from, execution_type, fail_fast)
 
-    if proccount > 0:
-        raise Exception("Processing files for project_id '{}'. Try later!".format(project_id))
+        if is_existent_project(project_id) is False:
+            result['status_code'] = 404
+            result['message'] = "project_id '{}' not found".format(project_id)
+            return result
+
+        if operation == 'generate-report':
+            job = generate_project_report(project_id, execution_name, execution_from, execution_type, wait, False)
+            result['build_order'] = job.get_report_build_order()
+            result['job_id'] = job.id
+            result['stages'] = job.stages
+            result['hooks'] = job.hooks
+            result['message'] = "Report successfully generated for project_id '{}'".format(project_id)
+        elif operation == 'clean-results':
+            clean_project_results(project_id, wait, False)
+            result['message'] = "Results successfully cleaned for project_id '{}'".format(project_id)
+        elif operation == 'clean-history':
+            clean_project_history(project_id, wait, False)
+            result['message'] = "History successfully cleaned for project_id '{}'".format(project_id)
+        result['status_code'] = 200
+    except AdmissionError as ex:
+        result['status_code'] = ex.status_code
+        result['message'] = str(ex)
+        result['retry_after'] = ex.retry_after
+    except Exception as ex:
+        result['status_code'] = 400
+        result['message'] = str(ex)
+    return result
+
+def is_replica_request():
+    # Only the replicas with the shared secret (REPLICA_SECRET) of the writer
+    secret = request.headers.get(REPLICA_HEADER)
+    return REPLICA_SECRET is not None and secret is not None and hmac.compare_digest(secret, REPLICA_SECRET)
+
+def stream_events(project_id=None):
+    last_event_id = request.headers.get('Last-Event-ID', request.args.get('last_event_id'))
+    if last_event_id is not None and last_event_id.isdigit():
+        last_event_id = int(last_event_id)
+    else:
+        last_event_id = None
+
+    # Every listener holds an API thread, clients and replicas are limited separately
+    if is_replica_request() is True:
+        subscription = EVENT_BUS.subscribe(project_id, last_event_id, 'replica', EVENTS_MAX_REPLICAS)
+    else:
+        subscription = EVENT_BUS.subscribe(project_id, last_event_id, 'client', EVENTS_MAX_CLIENTS)
+    if subscription is None:
+        body = {
+            'meta_data': {
+                'message' : 'Too many clients listening events. Try later!'
+            }
+        }
+        resp = jsonify(body)
+        resp.status_code = 503
+        return resp
+
+    def generate():
+        try:
+            yield 'retry: 3000\n\n'
+            while True:
+                events, dropped_events_count = subscription.get(EVENTS_HEARTBEAT_SECONDS)
+                if dropped_events_count > 0:
+                    yield 'event: events-dropped\ndata: {}\n\n'.format(json.dumps({'dropped_events_count': dropped_events_count}))
+                for event in events:
+                    yield format_sse_event(event)
+                if not events and dropped_events_count == 0:
+                    # Comment lines keep proxies connected and detect disconnected clients
+                    yield ': keep-alive\n\n'
+        finally:
+            subscription.close()
+
+    return Response(generate(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+def invalidate_project_caches(project_id=None):
+    # project_id None invalidates the caches of every project
+    STORAGE.invalidate_project(project_id)
+    forget_project_diffs(project_id)
+    if project_id is None:
+        RESULTS_INDEX.clear()
+    else:
+        RESULTS_INDEX.forget(project_id)
+
+def apply_writer_event(event):
+    project_id = event['project_id']
+    if event['type'] == 'generation-started':
+        WRITER_GENERATING_PROJECTS.add(project_id)
+    elif event['type'] in ['generation-finished', 'project-deleted']:
+        WRITER_GENERATING_PROJECTS.discard(project_id)
+
+    if event['type'] in REPLICA_INVALIDATING_EVENTS:
+        invalidate_project_caches(project_id)
+        if event['type'] == 'project-deleted':
+            DASHBOARD.remove(project_id)
+        else:
+            DASHBOARD.update(project_id)
+    # Clients of the replica receive the events of the writer
+    EVENT_BUS.publish(event['type'], project_id, event['data'])
+
+def reset_replica_caches():
+    WRITER_GENERATING_PROJECTS.clear()
+    invalidate_project_caches()
+    if DASHBOARD.is_loaded():
+        DASHBOARD.load(get_project_ids())
+
+def start_replica():
+    global REPLICA_LISTENER
+    if REPLICA_WRITER_URL is None:
+        app.logger.error("'REPLICA_WRITER_URL' is not defined, caches are not invalidated by the writer events")
+        return
+    if REPLICA_SECRET is None:
+        app.logger.info("'REPLICA_SECRET' is not defined, the replica uses one of the event clients of the writer")
+    REPLICA_LISTENER = ReplicaListener(REPLICA_WRITER_URL, apply_writer_event, reset_replica_caches,
+        REPLICA_RECONNECT_SECONDS, EVENTS_HEARTBEAT_SECONDS * 4, app.logger, REPLICA_SECRET)
+    Thread(target=REPLICA_LISTENER.run, daemon=True).start()
+
+def get_objects_path(project_id):
+    return '{}/{}'.format(get_project_path(project_id), OBJECTS_DIRECTORY_NAME)
+
+def cache_result_file_hash(project_id, file_name, sha256):
+    try:
+        stat = os.stat('{}/results/{}'.format(get_project_path(project_id), file_name))
+    except OSError:
+        return
+    with RESULTS_HASHES_LOCK:
+        RESULTS_HASHES.setdefault(project_id, {})[file_name] = (stat.st_size, stat.st_mtime_ns, sha256)
+
+def clear_result_file_hashes(project_id):
+    with RESULTS_HASHES_LOCK:
+        RESULTS_HASHES.pop(project_id, None)
+
+def hash_file(file_path):
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_result_file_hash(project_id, file_name):
+    file_path = '{}/results/{}'.format(get_project_path(project_id), file_name)
+    try:
+        stat = os.stat(file_path)
+    except OSError:
+        return None
+
+    with RESULTS_HASHES_LOCK:
+        cached = RESULTS_HASHES.get(project_id, {}).get(file_name)
+    if cached is not None and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2]
+
+    sha256 = hash_file(file_path)
+    with RESULTS_HASHES_LOCK:
+        RESULTS_HASHES.setdefault(project_id, {})[file_name] = (stat.st_size, stat.st_mtime_ns, sha256)
+    return sha256
+
+def get_linked_object_hash(project_id, file_name, results_directory=None):
+    # Hash of the object linked by a result file, None when the file isn't linked to an object
+    results_project = results_directory or '{}/results'.format(get_project_path(project_id))
+    file_path = '{}/{}'.format(results_project, file_name)
+    try:
+        if os.stat(file_path).st_nlink < 2:
+            return None
+        if results_directory is None:
+            return get_result_file_hash(project_id, file_name)
+        return hash_file(file_path)
+    except OSError:
+        return None
+
+def remove_unused_object(project_id, sha256):
+    if sha256 is None:
+        return
+    object_path = '{}/{}'.format(get_objects_path(project_id), sha256)
+    try:
+        if os.stat(object_path).st_nlink <= 1:
+            os.remove(object_path)
+    except FileNotFoundError:
+        pass
+
+def move_file(path, destination):
+    try:
+        os.replace(path, destination)
+    except OSError as ex:
+        if ex.errno != errno.EXDEV:
+            raise
+        # Another filesystem (i.e. mounted volume), copied next to the destination to replace it
+        tmp_path = '{}/.{}.{}'.format(os.path.dirname(destination), os.path.basename(destination), uuid.uuid4().hex)
+        try:
+            shutil.copyfile(path, tmp_path)
+            os.replace(tmp_path, destination)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        os.remove(path)
+
+def replace_result_file(project_id, tmp_path, file_name, results_directory=None, sha256=None):
+    # The object of a replaced result is removed when no other result links it
+    results_project = results_directory or '{}/results'.format(get_project_path(project_id))
+    previous_sha256 = get_linked_object_hash(project_id, file_name, results_directory)
+    if results_directory is None:
+        with get_results_index(project_id).adding(file_name):
+            move_file(tmp_path, '{}/{}'.format(results_project, file_name))
+        if sha256 is not None:
+            cache_result_file_hash(project_id, file_name, sha256)
+    else:
+        move_file(tmp_path, '{}/{}'.format(results_project, file_name))
+    if previous_sha256 != sha256:
+        remove_unused_object(project_id, previous_sha256)
+
+def link_result_file(project_id, file_name, sha256, size=None, results_directory=None):
+    object_path = '{}/{}'.format(get_objects_path(project_id), sha256)
+    try:
+        object_size = os.path.getsize(object_path)
+    except OSError:
+        return False
+    if size is not None and size != object_size:
+        return False
+
+    results_project = results_directory or '{}/results'.format(get_project_path(project_id))
+    tmp_path = '{}/.{}.{}'.format(results_project, file_name, uuid.uuid4().hex)
+    try:
+        os.link(object_path, tmp_path)
+        replace_result_file(project_id, tmp_path, file_name, results_directory, sha256)
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        return False
+    return True
+
+def is_same_filesystem(path, other_path):
+    return os.stat(path).st_dev == os.stat(other_path).st_dev
+
+def fsync_directory(path):
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+def store_result_file(project_id, file_name, stream, results_directory=None, durable=False):
+    results_project = results_directory or '{}/results'.format(get_project_path(project_id))
+    objects_project = get_objects_path(project_id)
+    if not os.path.exists(objects_project):
+        os.makedirs(objects_project, exist_ok=True)
+    deduplicated = is_same_filesystem(objects_project, results_project)
+    if deduplicated is False:
+        # Results directory in another filesystem (i.e. mounted volume), objects can't be linked
+        objects_project = results_project
+
+    digest = hashlib.sha256()
+    tmp_path = '{}/.{}.{}'.format(objects_project, file_name, uuid.uuid4().hex)
+    try:
+        with open(tmp_path, 'wb') as f:
+            for chunk in iter(lambda: stream.read(64 * 1024), b''):
+                digest.update(chunk)
+                f.write(chunk)
+            if durable is True:
+                f.flush()
+                os.fsync(f.fileno())
+        sha256 = digest.hexdigest()
+        if deduplicated is True:
+            try:
+                os.link(tmp_path, '{}/{}'.format(objects_project, sha256))
+            except FileExistsError:
+                pass
+            if link_result_file(project_id, file_name, sha256, results_directory=results_directory) is True:
+                return sha256
+        # Not linked to an object (i.e. object removed meanwhile), the written file is the result
+        replace_result_file(project_id, tmp_path, file_name, results_directory, sha256)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return sha256
+
+def get_results_index(project_id):
+    return RESULTS_INDEX.get(project_id, '{}/results'.format(get_project_path(project_id)))
+
+def get_results_summary(project_id, shard_path=None):
+    # Bounded summary of the results for the API responses
+    if shard_path is None:
+        return get_results_index(project_id).get_summary(API_RESPONSE_FILES_LIMIT)
+    file_names = sorted(os.listdir(shard_path))
+    counts = dict.fromkeys(FILE_TYPES, 0)
+    for file_name in file_names:
+        counts[results_index.get_file_type(file_name)] += 1
+    if API_RESPONSE_FILES_LIMIT > 0:
+        file_names = file_names[:API_RESPONSE_FILES_LIMIT]
+    return {'count': sum(counts.values()), 'counts': counts, 'file_names': file_names}
+
+def save_result_file(project_id, file_name, stream, shard_path=None, durable=False):
+    store_result_file(project_id, file_name, stream, shard_path, durable)
+    if shard_path is None:
+        # Results of the shards are saved in the storage once the run is ready
+        STORAGE.save_result(project_id, file_name)
+
+def get_base64_opener(file_name, content_base64):
+    def open_stream():
+        try:
+            return io.BytesIO(base64.b64decode(content_base64))
+        except Exception:
+            raise Exception("'content_base64' attribute content for '%s' file should be encoded to base64" % (file_name))
+    return open_stream
+
+def get_stream_opener(stream):
+    return lambda: stream
+
+def write_result_file(project_id, file_name, stream, shard_path=None):
+    save_result_file(project_id, file_name, stream, shard_path, INGEST_DURABILITY == 'file')
+    if INGEST_DURABILITY == 'file':
+        fsync_directory(get_objects_path(project_id))
+        fsync_directory(shard_path or '{}/results'.format(get_project_path(project_id)))
+
+def write_result_files(project_id, files, shard_path=None):
+    # files are (file_name, open_stream), the streams are opened (i.e. decoded) by the ingest writers
+    # and no file is written when any of them can't be opened. The files are written concurrently,
+    # returns the processed file names and the failed files in the request order
+    opened_files = [(file_name, INGEST_WRITER_EXECUTOR.submit(open_stream)) for file_name, open_stream in files]
+    streams = [(file_name, future.result()) for file_name, future in opened_files]
+
+    futures = [(file_name, INGEST_WRITER_EXECUTOR.submit(write_result_file, project_id, file_name, stream, shard_path))
+               for file_name, stream in streams]
+    processed_files = []
+    failed_files = []
+    for file_name, future in futures:
+        try:
+            future.result()
+        except Exception as ex:
+            failed_files.append({'message': str(ex), 'file_name': file_name})
+        else:
+            processed_files.append(file_name)
+
+    if INGEST_DURABILITY == 'batch' and processed_files:
+        # Files and directory entries are flushed once per request, not by every writer
+        os.sync()
+    return processed_files, failed_files
+
+def prune_result_objects(project_id):
+    objects_project = get_objects_path(project_id)
+    if not os.path.isdir(objects_project):
+        return
+    for entry in os.scandir(objects_project):
+        try:
+            if entry.name.startswith('.') is False and entry.is_file() and entry.stat().st_nlink <= 1:
+                os.remove(entry.path)
+        except OSError as ex:
+            if ex.errno != errno.ENOENT:
+                app.logger.error('Unable to prune object {}: {}'.format(entry.path, str(ex)))
+
+def send_storage_report_file(project_id, path):
+    file_path = STORAGE.get_report_file(project_id, path)
+    if file_path is None:
+        raise NotFound()
+    mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+    return send_file(file_path, mimetype=mimetype)
+
+def check_cluster_mode():
+    if CLUSTER_RING is None:
+        raise Exception("Cluster mode is not enabled. Use 'CLUSTER_NODES' and 'CLUSTER_NODE_URL' environment variables")
+
+def get_project_node(project_id):
+    if CLUSTER_RING is None or project_id == 'default':
+        return CLUSTER_NODE_URL
+    return CLUSTER_RING.get_node(project_id)
+
+def save_cluster_nodes():
+    tmp_file = '{}.{}'.format(CLUSTER_NODES_FILE, uuid.uuid4().hex)
+    with open(tmp_file, 'w') as f:
+        json.dump(CLUSTER_RING.nodes, f)
+    os.replace(tmp_file, CLUSTER_NODES_FILE)
+
+def post_cluster_request(node, path, **kwargs):
+    headers = kwargs.pop('headers', {})
+    headers[CLUSTER_FORWARDED_HEADER] = CLUSTER_NODE_URL
+    if CLUSTER_SECRET is not None:
+        headers[CLUSTER_SECRET_HEADER] = CLUSTER_SECRET
+    response = CLUSTER_SESSION.post('{}/allure-docker-service{}'.format(node, path), headers=headers, timeout=CLUSTER_TIMEOUT_SECONDS, **kwargs)
+    if response.status_code >= 400:
+        raise Exception("Node '{}' responded {} to '{}': {}".format(node, response.status_code, path, response.text))
+    return response
+
+def forward_cluster_request(node):
+    excluded_headers = HOP_BY_HOP_HEADERS + ['host', 'content-length']
+    headers = {}
+    for key, value in request.headers.items():
+        if key.lower() not in excluded_headers:
+            headers[key] = value
+    headers[CLUSTER_FORWARDED_HEADER] = CLUSTER_NODE_URL
+
+    data = None
+    if request.method in ['POST', 'PUT', 'PATCH']:
+        if request.endpoint == 'create_project':
+            data = request.get_data()
+        else:
+            data = iter(lambda: request.stream.read(64 * 1024), b'')
+
+    upstream = CLUSTER_SESSION.request(request.method, '{}{}'.format(node, request.full_path.rstrip('?')), headers=headers,
+        data=data, stream=True, allow_redirects=False, timeout=CLUSTER_TIMEOUT_SECONDS)
+
+    response_headers = []
+    for key, value in upstream.raw.headers.items():
+        if key.lower() not in HOP_BY_HOP_HEADERS:
+            response_headers.append((key, value))
+
+    def generate():
+        try:
+            for chunk in upstream.raw.stream(64 * 1024, decode_content=False):
+                yield chunk
+        finally:
+            upstream.close()
+
+    return Response(generate(), status=upstream.status_code, headers=response_headers)
+
+def stage_project(project_id):
+    # Hardlinks (copies in another filesystem) the files of the project into a staging directory,
+    # files replaced in the project afterwards keep their staged version
+    project_path = get_project_path(project_id)
+    if SERVER_MODE == 'replica':
+        # A read-only replica doesn't write in the shared projects directory, files are copied
+        staging_path = tempfile.mkdtemp(prefix='allure-snapshot-')
+    else:
+        staging_path = '{}/.snapshot-{}'.format(PROJECTS_DIRECTORY, uuid.uuid4().hex)
+    try:
+        # The results directory can be a link (i.e. volume of the default project)
+        for dirpath, dirnames, filenames in os.walk(project_path, followlinks=True):
+            staging_directory = os.path.normpath('{}/{}/{}'.format(staging_path, project_id, os.path.relpath(dirpath, project_path)))
+            os.makedirs(staging_directory)
+            for file_name in filenames:
+                if file_name.startswith('.'):
+                    continue
+                file_path = os.path.join(dirpath, file_name)
+                if os.path.islink(file_path):
+                    continue
+                try:
+                    os.link(file_path, os.path.join(staging_directory, file_name))
+                except OSError:
+                    shutil.copy2(file_path, os.path.join(staging_directory, file_name))
+    except Exception:
+        shutil.rmtree(staging_path, ignore_errors=True)
+        raise
+    return staging_path
+
+def stream_project_archive(project_id, mode='w|', project_path=None):
+    project_path = project_path or get_project_path(project_id)
+    read_fd, write_fd = os.pipe()
+    errors = []
+
+    def write_archive():
+        try:
+            with os.fdopen(write_fd, 'wb') as f:
+                with tarfile.open(fileobj=f, mode=mode) as tar:
+                    tar.add(project_path, arcname=project_id)
+        except Exception as ex:
+            errors.append(ex)
+            app.logger.error("Unable to archive project_id '{}': {}".format(project_id, str(ex)))
+
+    writer = Thread(target=write_archive, daemon=True)
+    writer.start()
+    with os.fdopen(read_fd, 'rb') as f:
+        for chunk in iter(lambda: f.read(64 * 1024), b''):
+            yield chunk
+    writer.join()
+    if errors:
+        # The response is aborted, a truncated archive is never sent as a complete one
+        raise Exception("Unable to archive project_id '{}': {}".format(project_id, str(errors[0])))
+
+def get_archive_member_path(name):
+    parts = [part for part in name.replace('\\', '/').split('/') if part and part != '.']
+    if name.startswith('/') or '..' in parts:
+        raise Exception("Invalid path '{}' in archive".format(name))
+    # The first directory is the project directory, its name is not relevant
+    return '/'.join(parts[1:])
+
+def import_project_archive(project_id, stream):
+    project_path = get_project_path(project_id)
+    tmp_path = '{}/.import-{}'.format(PROJECTS_DIRECTORY, uuid.uuid4().hex)
+    os.makedirs(tmp_path)
+    try:
+        with tarfile.open(fileobj=stream, mode='r|*') as tar:
+            for member in tar:
+                if member.issym() or member.isdev():
+                    raise Exception("Links and devices are not allowed in archive: '{}'".format(member.name))
+                member.name = get_archive_member_path(member.name)
+                if not member.name:
+                    continue
+                if member.islnk():
+                    member.linkname = get_archive_member_path(member.linkname)
+                tar.extract(member, tmp_path)
+
+        if os.path.exists(project_path):
+            raise Exception("project_id '{}' is existent".format(project_id))
+        os.makedirs('{}/reports/latest'.format(tmp_path), exist_ok=True)
+        os.makedirs('{}/results'.format(tmp_path), exist_ok=True)
+        os.rename(tmp_path, project_path)
+    except Exception:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        raise
+    # The imported results are already in the imported reports, the watcher doesn't generate them again
+    RESULTS_SIGNATURES[project_id] = get_results_signature(project_id)
+
+def check_snapshot_storage():
+    if STORAGE.name != 'local':
+        raise Exception("Snapshots are only available with the 'local' storage backend, the '{}' storage keeps the projects".format(STORAGE.name))
+
+def transfer_project(project_id, node, project_path=None):
+    post_cluster_request(node, '/cluster/projects/{}'.format(project_id), data=stream_project_archive(project_id, project_path=project_path),
+        headers={'Content-Type': 'application/x-tar'})
+
+def rebalance_cluster_projects():
+    moved_projects = []
+    failed_projects = {}
+    for project_id in get_project_ids():
+        node = get_project_node(project_id)
+        if node == CLUSTER_NODE_URL:
+            continue
+        try:
+            # Results ingestion is rejected until the project is removed, no results are lost meanwhile
+            with acquire_project_lock(project_id, False), INGEST_ADMISSION.blocked(project_id, GENERATION_QUEUE_TIMEOUT_SECONDS):
+                app.logger.info("Moving project_id '{}' to node '{}'".format(project_id, node))
+                staging_path = stage_project(project_id)
+                try:
+                    transfer_project(project_id, node, '{}/{}'.format(staging_path, project_id))
+                finally:
+                    shutil.rmtree(staging_path, ignore_errors=True)
+                shutil.rmtree(get_project_path(project_id))
+                forget_project(project_id)
+            EVENT_BUS.publish('project-deleted', project_id, {'moved_to': node})
+            DASHBOARD.remove(project_id)
+            moved_projects.append(project_id)
+        except Exception as ex:
+            app.logger.error("Unable to move project_id '{}' to node '{}': {}".format(project_id, node, str(ex)))
+            failed_projects[project_id] = str(ex)
+
+    CLUSTER_STATUS['last_rebalance'] = {
+        'moved_projects': moved_projects,
+        'failed_projects': failed_projects
+    }
+
+def decompress_request_body():
+    content_encoding = request.headers.get('Content-Encoding')
+    if content_encoding is None or not content_encoding.strip() or content_encoding.strip().lower() == 'identity':
+        return
+
+    content_encoding = content_encoding.strip().lower()
+    if content_encoding not in CONTENT_ENCODINGS:
+        raise Exception("Header 'Content-Encoding' should be one of {}".format(sorted(CONTENT_ENCODINGS)))
+
+    compressed_stream = get_input_stream(request.environ)
+    decompressor = zlib.decompressobj(CONTENT_ENCODINGS[content_encoding])
+    # Small bodies stay in memory, bigger ones are spooled to a temporary file
+    body = tempfile.SpooledTemporaryFile(max_size=DECOMPRESSED_BODY_MEMORY_BYTES)
+    request.environ['allure.decompressed_body'] = body
+    compressed_bytes = 0
+
+    def write(data):
+        body.write(data)
+        decompressed_bytes = body.tell()
+        if decompressed_bytes > MAX_REQUEST_BODY_BYTES:
+            raise AdmissionError('Decompressed request body exceeds the maximum size of {} bytes'.format(MAX_REQUEST_BODY_BYTES), 413)
+        if decompressed_bytes > DECOMPRESSED_BODY_MEMORY_BYTES and decompressed_bytes > compressed_bytes * MAX_DECOMPRESSION_RATIO:
+            raise AdmissionError('Decompressed request body exceeds the maximum ratio of {} to the compressed body'.format(MAX_DECOMPRESSION_RATIO), 413)
+
+    try:
+        while True:
+            chunk = compressed_stream.read(64 * 1024)
+            if not chunk:
+                break
+            compressed_bytes = compressed_bytes + len(chunk)
+            # Bounded output per call, a small compressed chunk can't be expanded beyond the limit
+            while chunk:
+                write(decompressor.decompress(chunk, 64 * 1024))
+                chunk = decompressor.unconsumed_tail
+        write(decompressor.flush())
+    except zlib.error as ex:
+        raise Exception("Request body is not valid '{}' content: {}".format(content_encoding, str(ex)))
+
+    request.environ['CONTENT_LENGTH'] = str(body.tell())
+    body.seek(0)
+    request.environ['wsgi.input'] = body
+    request.environ.pop('HTTP_CONTENT_ENCODING', None)
+
+DASHBOARD = Dashboard(load_dashboard_entry)
+
+POST_GENERATION_HOOKS = HookRegistry(POST_GENERATION_HOOK_WORKERS, app.logger)
+# The emailable report reads the latest report, it's rendered while the project is still locked
+POST_GENERATION_HOOKS.register('emailable-report', emailable_report_hook)
+POST_GENERATION_HOOKS.register('dashboard', dashboard_hook)
+POST_GENERATION_HOOKS.register('tests-summary', tests_summary_hook)
+
+GENERATION_PIPELINE = GenerationPipeline([
+    KeepHistoryStage(KEEP_HISTORY),
+    ExecutorStage(EXECUTOR_FILENAME),
+    GenerateStage(),
+    StoreStage(KEEP_HISTORY),
+    RetentionStage(KEEP_HISTORY, KEEP_HISTORY_LATEST, STORAGE),
+    PublishStage(STORAGE)
+], app.logger, POST_GENERATION_HOOKS)
+
+PROFILE_STORE = ProfileStore(PROFILES_DIRECTORY, PROFILING_MAX_PROFILES)
+app.wsgi_app = ProfilingMiddleware(app.wsgi_app, PROFILE_STORE, PROFILING_ALLOWLIST, PROFILING_SLOW_REQUEST_SECONDS,
+    PROFILING_SAMPLE_INTERVAL_MS / 1000.0, PROFILING_EXCLUDED_PATHS, app.logger)
 
 if __name__ == '__main__':
+    DASHBOARD.load_in_background(get_project_ids)
+    if SERVER_MODE == 'replica':
+        app.logger.info('Starting as read-only replica')
+        start_replica()
+    else:
+        Thread(target=generate_default_report, daemon=True).start()
+        if CHECK_RESULTS_EVERY_SECONDS is None:
+            app.logger.info('Not checking results automatically')
+        else:
+            Thread(target=watch_results, daemon=True).start()
+        Thread(target=watch_runs, daemon=True).start()
+
     if DEV_MODE == 1:
         app.logger.info('Stating in DEV_MODE')
         app.run(host=HOST, port=PORT)
     else:
-        waitress.serve(app, threads=THREADS, host=HOST, port=PORT, url_scheme=URL_SCHEME)
+        waitress.serve(app, threads=THREADS, host=HOST, port=PORT, url_scheme=URL_SCHEME, max_request_body_size=MAX_REQUEST_BODY_BYTES)
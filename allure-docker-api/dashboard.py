@@ -0,0 +1,158 @@
+"""Status dashboard of all the projects.
+
+The dashboard keeps the statistics of the latest report of every project (read from the
+'widgets/summary.json' file of the report) and is updated project by project when a report is
+generated, never computed per request. The serialized response and its ETag are rebuilt on every
+update, so requests are answered in constant time whatever the number of projects.
+
+The dashboard is loaded in the background at startup. Projects updated while it's loaded keep
+their newest entry, a slow load never overwrites them with the entries it read before.
+"""
+from threading import Lock, Thread
+import hashlib, json, time
+
+STATISTIC_KEYS = ['passed', 'failed', 'broken', 'skipped', 'unknown', 'total']
+NO_REPORT = 'no-report'
+EMPTY_REPORT = 'empty'
+
+
+def get_status(statistic):
+    if statistic['total'] == 0:
+        return EMPTY_REPORT
+    if statistic['failed'] > 0:
+        return 'failed'
+    if statistic['broken'] > 0:
+        return 'broken'
+    return 'passed'
+
+
+def parse_summary(project_id, summary, executors=None):
+    # summary and executors are the content of widgets/summary.json and widgets/executors.json
+    statistic = dict.fromkeys(STATISTIC_KEYS, 0)
+    last_build = None
+    if summary is not None:
+        for key in STATISTIC_KEYS:
+            statistic[key] = int(summary.get('statistic', {}).get(key) or 0)
+        last_build = summary.get('time', {}).get('stop')
+
+    build_order = None
+    if executors:
+        build_order = executors[0].get('buildOrder')
+
+    return {
+        'project_id': project_id,
+        'status': get_status(statistic) if summary is not None else NO_REPORT,
+        'statistic': statistic,
+        'build_order': build_order,
+        'last_build': last_build
+    }
+
+
+class Dashboard(object):
+    def __init__(self, loader):
+        # loader(project_id) returns the project entry (parse_summary), None when the project is removed
+        self.loader = loader
+        self.lock = Lock()
+        self.projects = {}
+        # Version of the latest change of every project (removed projects included), a change only
+        # replaces the entry of a project when it started after the change that wrote it
+        self.versions = {}
+        self.version = 0
+        self.loaded = False
+        self.loading = False
+        self.body = None
+        self.etag = None
+
+    def next_version(self):
+        with self.lock:
+            self.version = self.version + 1
+            return self.version
+
+    def put(self, project_id, entry, version):
+        # Called with the lock acquired, entry None removes the project
+        if version <= self.versions.get(project_id, 0):
+            return False
+        self.versions[project_id] = version
+        if entry is None:
+            self.projects.pop(project_id, None)
+        else:
+            self.projects[project_id] = entry
+        return True
+
+    def load(self, project_ids):
+        start_version = self.next_version()
+        for project_id in project_ids:
+            version = self.next_version()
+            entry = self.loader(project_id)
+            with self.lock:
+                self.put(project_id, entry, version)
+        with self.lock:
+            for project_id in [project_id for project_id in self.projects if project_id not in project_ids]:
+                if self.versions.get(project_id, 0) < start_version:
+                    self.put(project_id, None, start_version)
+            self.loaded = True
+            self.loading = False
+            self.build()
+
+    def load_in_background(self, get_project_ids):
+        with self.lock:
+            if self.loading is True:
+                return
+            self.loading = True
+
+        def load():
+            try:
+                self.load(get_project_ids())
+            finally:
+                with self.lock:
+                    self.loading = False
+
+        Thread(target=load, daemon=True).start()
+
+    def is_loaded(self):
+        with self.lock:
+            return self.loaded
+
+    def update(self, project_id):
+        version = self.next_version()
+        entry = self.loader(project_id)
+        with self.lock:
+            if self.put(project_id, entry, version) and self.loaded:
+                self.build()
+
+    def remove(self, project_id):
+        version = self.next_version()
+        with self.lock:
+            if self.put(project_id, None, version) and self.loaded:
+                self.build()
+
+    def build(self):
+        # Called with the lock acquired
+        totals = dict.fromkeys(STATISTIC_KEYS, 0)
+        statuses = {}
+        for entry in self.projects.values():
+            for key in STATISTIC_KEYS:
+                totals[key] = totals[key] + entry['statistic'][key]
+            statuses[entry['status']] = statuses.get(entry['status'], 0) + 1
+
+        body = {
+            'data': {
+                'projects': [self.projects[project_id] for project_id in sorted(self.projects)],
+                'projects_count': len(self.projects),
+                'statuses': statuses,
+                'statistic': totals,
+                'updated': int(time.time() * 1000)
+            },
+            'meta_data': {
+                'message' : 'Dashboard successfully obtained'
+            }
+        }
+        # The ETag doesn't depend on the update time, nodes with the same reports share it
+        content = json.dumps(body['data']['projects'], sort_keys=True).encode('utf-8')
+        self.etag = hashlib.md5(content).hexdigest()
+        self.body = json.dumps(body).encode('utf-8')
+
+    def get(self):
+        # (None, None) until the dashboard is loaded
+        with self.lock:
+            return self.etag, self.body
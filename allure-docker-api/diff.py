@@ -0,0 +1,100 @@
+"""Build to build diffs.
+
+Every report gets a compact summary of its tests (TESTS_SUMMARY_FILE), keyed by the Allure
+historyId (same test in different builds) with the name, status and duration of every test. A
+diff compares the summaries of two builds: newly failed, fixed, added, removed and slower tests.
+
+Stored builds are immutable (until the history is cleaned), their summaries and the diffs between
+them are kept in bounded LRU caches.
+"""
+from collections import OrderedDict
+from threading import Lock
+import json, os
+
+TESTS_SUMMARY_FILE = 'tests-summary.json'
+FAILED_STATUSES = ['failed', 'broken']
+DIFF_CATEGORIES = ['newly_failed', 'fixed', 'added', 'removed', 'slower']
+SLOWER_MIN_DELTA_MS = 100
+
+
+def build_tests_summary(test_cases_path):
+    # {historyId: [name, status, duration_ms]} from the data/test-cases files of a report
+    tests = {}
+    if not os.path.isdir(test_cases_path):
+        return tests
+    for entry in os.scandir(test_cases_path):
+        if not entry.name.endswith('.json'):
+            continue
+        try:
+            with open(entry.path) as f:
+                test_case = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if test_case.get('hidden') is True or not test_case.get('historyId'):
+            continue
+        duration = (test_case.get('time') or {}).get('duration')
+        tests[test_case['historyId']] = [test_case.get('fullName') or test_case.get('name'), test_case.get('status'), duration]
+    return tests
+
+
+def get_diff_entry(history_id, base, head):
+    entry = {'history_id': history_id, 'name': (head or base)[0]}
+    if base is not None:
+        entry.update({'base_status': base[1], 'base_duration': base[2]})
+    if head is not None:
+        entry.update({'head_status': head[1], 'head_duration': head[2]})
+    return entry
+
+
+def diff_tests_summaries(base, head, slower_factor=2.0):
+    diff = dict((category, []) for category in DIFF_CATEGORIES)
+    for history_id in sorted(set(base) | set(head)):
+        base_test = base.get(history_id)
+        head_test = head.get(history_id)
+        if base_test is None:
+            diff['added'].append(get_diff_entry(history_id, None, head_test))
+            continue
+        if head_test is None:
+            diff['removed'].append(get_diff_entry(history_id, base_test, None))
+            continue
+
+        if head_test[1] in FAILED_STATUSES and base_test[1] not in FAILED_STATUSES:
+            diff['newly_failed'].append(get_diff_entry(history_id, base_test, head_test))
+        elif base_test[1] in FAILED_STATUSES and head_test[1] == 'passed':
+            diff['fixed'].append(get_diff_entry(history_id, base_test, head_test))
+
+        base_duration, head_duration = base_test[2], head_test[2]
+        if base_duration is not None and head_duration is not None and \
+                head_duration - base_duration >= SLOWER_MIN_DELTA_MS and head_duration >= base_duration * slower_factor:
+            diff['slower'].append(get_diff_entry(history_id, base_test, head_test))
+
+    diff['counts'] = dict((category, len(diff[category])) for category in DIFF_CATEGORIES)
+    diff['counts'].update({'base_tests': len(base), 'head_tests': len(head)})
+    return diff
+
+
+class LRUCache(object):
+    # Keys are tuples starting with the project_id
+    def __init__(self, max_entries=100):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def forget(self, project_id=None):
+        with self.lock:
+            for key in [key for key in self.entries if project_id is None or key[0] == project_id]:
+                del self.entries[key]
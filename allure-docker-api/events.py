@@ -0,0 +1,113 @@
+"""In-process publish/subscribe of project events.
+
+Every event has an incremental id, a type, the project_id and a data dictionary. Subscribers
+receive the events through a buffer bounded by size: when a client doesn't consume its events
+fast enough the oldest ones are discarded and the number of discarded events is notified, so
+slow consumers never grow the memory of the API.
+
+The latest events are kept in a bounded history to let clients resume a stream (Last-Event-ID).
+
+Subscriptions are limited by kind (i.e. clients and replicas), the limit is checked and the
+subscription added atomically.
+"""
+from collections import deque
+from threading import Condition, Lock
+import json, time
+
+EVENT_TYPES = [
+    'project-created', 'project-deleted', 'results-received', 'results-cleaned', 'history-cleaned',
+    'generation-queued', 'generation-started', 'generation-finished', 'run-opened', 'shard-completed', 'run-finished'
+]
+
+
+class Subscription(object):
+    def __init__(self, bus, project_id=None, buffer_size=100, kind=None):
+        self.bus = bus
+        self.project_id = project_id
+        self.kind = kind
+        self.events = deque(maxlen=buffer_size)
+        self.dropped_events_count = 0
+        self.condition = Condition()
+        self.closed = False
+
+    def matches(self, event):
+        return self.project_id is None or self.project_id == event['project_id']
+
+    def put(self, event):
+        with self.condition:
+            if len(self.events) == self.events.maxlen:
+                self.dropped_events_count = self.dropped_events_count + 1
+            self.events.append(event)
+            self.condition.notify()
+
+    def get(self, timeout):
+        # Returns the pending events (maybe none after the timeout) and the events dropped since the last call
+        with self.condition:
+            if not self.events and self.closed is False:
+                self.condition.wait(timeout)
+            events = list(self.events)
+            self.events.clear()
+            dropped_events_count = self.dropped_events_count
+            self.dropped_events_count = 0
+        return events, dropped_events_count
+
+    def close(self):
+        self.bus.unsubscribe(self)
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+
+class EventBus(object):
+    def __init__(self, buffer_size=100, history_size=100):
+        self.buffer_size = buffer_size
+        self.history = deque(maxlen=history_size)
+        self.subscriptions = []
+        self.lock = Lock()
+        self.last_event_id = 0
+
+    def publish(self, event_type, project_id, data=None):
+        with self.lock:
+            self.last_event_id = self.last_event_id + 1
+            event = {
+                'id': self.last_event_id,
+                'type': event_type,
+                'project_id': project_id,
+                'timestamp': int(time.time() * 1000),
+                'data': data or {}
+            }
+            self.history.append(event)
+            subscriptions = [subscription for subscription in self.subscriptions if subscription.matches(event)]
+        for subscription in subscriptions:
+            subscription.put(event)
+        return event
+
+    def subscribe(self, project_id=None, last_event_id=None, kind=None, max_subscriptions=None):
+        # Returns None when there are already 'max_subscriptions' subscriptions of the kind
+        subscription = Subscription(self, project_id, self.buffer_size, kind)
+        with self.lock:
+            if max_subscriptions is not None and self.count(kind) >= max_subscriptions:
+                return None
+            if last_event_id is not None:
+                for event in self.history:
+                    if event['id'] > last_event_id and subscription.matches(event):
+                        subscription.put(event)
+            self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+
+    def count(self, kind=None):
+        # Called with the lock acquired
+        return len([subscription for subscription in self.subscriptions if kind is None or subscription.kind == kind])
+
+    def get_subscriptions_count(self, kind=None):
+        with self.lock:
+            return self.count(kind)
+
+
+def format_sse_event(event):
+    return 'id: {}\nevent: {}\ndata: {}\n\n'.format(event['id'], event['type'], json.dumps(event))
@@ -0,0 +1,293 @@
+"""Report generation pipeline.
+
+A generation is executed as a sequence of stages over a GenerationJob:
+
+    keep-history > executor > generate > store > retention > publish
+
+Every stage records its duration in the job. The Allure command line is the only child process.
+
+Once the report is published, the post-generation hooks registered in a HookRegistry (emailable
+report, other artifacts built from the report) are executed. Synchronous hooks run in the
+generation thread, asynchronous hooks run in a worker pool once the generation is finished.
+Hook failures don't fail the generation, they are recorded in the job with the hook duration.
+
+Result files can be hardlinks to content addressed objects shared with other results, files in the
+results directory are always replaced (new inode) and never rewritten in place.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import json, logging, os, shutil, subprocess, time, uuid
+
+LATEST_REPORT = 'latest'
+HISTORY_DIRECTORY = 'history'
+
+
+def copy_tree(source, destination):
+    # Equivalent to 'cp --recursive --preserve=timestamps --remove-destination source/. destination'
+    os.makedirs(destination, exist_ok=True)
+    for entry in os.scandir(source):
+        target = os.path.join(destination, entry.name)
+        if entry.is_dir(follow_symlinks=False):
+            copy_tree(entry.path, target)
+        else:
+            if os.path.lexists(target) and not os.path.isdir(target):
+                os.remove(target)
+            shutil.copy2(entry.path, target)
+
+
+def replace_file(path, content):
+    tmp_path = '{}/.{}.{}'.format(os.path.dirname(path), os.path.basename(path), uuid.uuid4().hex)
+    try:
+        with open(tmp_path, 'w') as f:
+            f.write(content)
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def remove_path(path):
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path, ignore_errors=True)
+    elif os.path.lexists(path):
+        os.remove(path)
+
+
+def get_build_orders(reports_path):
+    return [int(name) for name in os.listdir(reports_path) if name.isdigit()]
+
+
+def get_expired_build_orders(build_orders, keep_history_latest):
+    # Stored builds beyond the latest 'keep_history_latest' ones, the build 0 is never removed
+    build_orders = sorted(set([build_order for build_order in build_orders if build_order != 0]), reverse=True)
+    return build_orders[keep_history_latest:]
+
+
+class GenerationJob(object):
+    def __init__(self, project_id, project_path, store_results=True, execution_name=None,
+                 execution_from=None, execution_type=None):
+        self.id = uuid.uuid4().hex
+        self.project_id = project_id
+        self.project_path = project_path
+        self.results_path = '{}/results'.format(project_path)
+        self.reports_path = '{}/reports'.format(project_path)
+        self.latest_report_path = '{}/{}'.format(self.reports_path, LATEST_REPORT)
+        self.store_results = store_results
+        self.execution_name = execution_name or 'Automatic Execution'
+        self.execution_from = execution_from or ''
+        self.execution_type = execution_type or 'another'
+        self.build_order = None
+        self.stored_build_order = None
+        self.status = 'queued'
+        self.stages = []
+        self.hooks = []
+
+    def get_report_build_order(self):
+        if self.stored_build_order is None:
+            return LATEST_REPORT
+        return str(self.stored_build_order)
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'project_id': self.project_id,
+            'status': self.status,
+            'build_order': self.get_report_build_order(),
+            'execution_name': self.execution_name,
+            'stages': list(self.stages),
+            'hooks': [dict(hook) for hook in self.hooks]
+        }
+
+
+class Stage(object):
+    name = None
+
+    def run(self, job):
+        raise NotImplementedError()
+
+
+class KeepHistoryStage(Stage):
+    name = 'keep-history'
+
+    def __init__(self, keep_history):
+        self.keep_history = keep_history
+
+    def run(self, job):
+        results_history_path = '{}/{}'.format(job.results_path, HISTORY_DIRECTORY)
+        if self.keep_history is True:
+            os.makedirs(results_history_path, exist_ok=True)
+            latest_history_path = '{}/{}'.format(job.latest_report_path, HISTORY_DIRECTORY)
+            if os.path.isdir(latest_history_path):
+                copy_tree(latest_history_path, results_history_path)
+        elif os.path.isdir(results_history_path):
+            shutil.rmtree(results_history_path, ignore_errors=True)
+
+
+class ExecutorStage(Stage):
+    name = 'executor'
+
+    def __init__(self, executor_file_name):
+        self.executor_file_name = executor_file_name
+
+    def run(self, job):
+        os.makedirs(job.results_path, exist_ok=True)
+        job.build_order = max(get_build_orders(job.reports_path) + [0]) + 1
+        executor = {
+            'reportName': job.project_id,
+            'buildName': '{} #{}'.format(job.project_id, job.build_order),
+            'buildOrder': str(job.build_order),
+            'name': job.execution_name,
+            'reportUrl': '../{}/index.html'.format(job.build_order),
+            'buildUrl': job.execution_from,
+            'type': job.execution_type
+        }
+        replace_file('{}/{}'.format(job.results_path, self.executor_file_name), json.dumps(executor))
+
+
+class GenerateStage(Stage):
+    name = 'generate'
+
+    def __init__(self, allure_command='allure'):
+        self.allure_command = allure_command
+
+    def run(self, job):
+        process = subprocess.run([self.allure_command, 'generate', '--clean', job.results_path, '-o', job.latest_report_path],
+                                 stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
+        if process.returncode != 0:
+            raise Exception('Allure generation failed for project_id {}: {}'.format(
+                job.project_id, process.stdout.decode('utf-8', 'replace').strip()))
+
+
+class StoreStage(Stage):
+    name = 'store'
+
+    def __init__(self, keep_history):
+        self.keep_history = keep_history
+
+    def run(self, job):
+        if self.keep_history is False or job.store_results is False:
+            return
+        if not os.path.isdir(job.latest_report_path) or not os.listdir(job.latest_report_path):
+            return
+        copy_tree(job.latest_report_path, '{}/{}'.format(job.reports_path, job.build_order))
+        job.stored_build_order = job.build_order
+
+
+class RetentionStage(Stage):
+    name = 'retention'
+
+    def __init__(self, keep_history, keep_history_latest, storage=None):
+        self.keep_history = keep_history
+        self.keep_history_latest = keep_history_latest
+        self.storage = storage
+
+    def run(self, job):
+        # The same retention for the working copy and the storage (builds of other working copies)
+        if self.keep_history is False:
+            return
+        build_orders = get_build_orders(job.reports_path)
+        if self.storage is not None:
+            build_orders = build_orders + self.storage.list_build_orders(job.project_id)
+        expired_build_orders = get_expired_build_orders(build_orders, self.keep_history_latest)
+        for build_order in expired_build_orders:
+            shutil.rmtree('{}/{}'.format(job.reports_path, build_order), ignore_errors=True)
+        if self.storage is not None:
+            self.storage.delete_builds(job.project_id, expired_build_orders)
+
+
+class PublishStage(Stage):
+    name = 'publish'
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def run(self, job):
+        self.storage.publish_report(job.project_id, job.stored_build_order)
+
+
+class HookRegistry(object):
+    def __init__(self, workers=2, logger=None):
+        self.hooks = []
+        self.executor = ThreadPoolExecutor(max_workers=workers)
+        self.logger = logger or logging.getLogger(__name__)
+
+    def register(self, name, function, asynchronous=False):
+        # The function receives the finished GenerationJob
+        self.hooks.append({'name': name, 'function': function, 'asynchronous': asynchronous})
+
+    def run(self, job):
+        for hook in self.hooks:
+            entry = {'hook': hook['name'], 'asynchronous': hook['asynchronous'], 'status': 'pending'}
+            job.hooks.append(entry)
+            if hook['asynchronous'] is True:
+                self.executor.submit(self.run_hook, hook, job, entry)
+            else:
+                self.run_hook(hook, job, entry)
+
+    def run_hook(self, hook, job, entry):
+        entry['status'] = 'running'
+        start = time.time()
+        try:
+            hook['function'](job)
+        except Exception as ex:
+            entry['error'] = str(ex)
+            entry['status'] = 'failed'
+            self.logger.error('Hook {} failed for PROJECT_ID: {}: {}'.format(hook['name'], job.project_id, str(ex)))
+        else:
+            entry['status'] = 'finished'
+        entry['duration_ms'] = int((time.time() - start) * 1000)
+
+
+class GenerationPipeline(object):
+    def __init__(self, stages, logger=None, hooks=None):
+        self.stages = stages
+        self.logger = logger or logging.getLogger(__name__)
+        self.hooks = hooks
+
+    def run(self, job):
+        self.logger.info('Generating report for PROJECT_ID: {}'.format(job.project_id))
+        job.status = 'running'
+        for stage in self.stages:
+            start = time.time()
+            try:
+                stage.run(job)
+            except Exception as ex:
+                job.stages.append({'stage': stage.name, 'duration_ms': int((time.time() - start) * 1000), 'error': str(ex)})
+                job.status = 'failed'
+                self.logger.error('Stage {} failed for PROJECT_ID: {}: {}'.format(stage.name, job.project_id, str(ex)))
+                raise
+            job.stages.append({'stage': stage.name, 'duration_ms': int((time.time() - start) * 1000)})
+        job.status = 'finished'
+        self.logger.info('Report generated for PROJECT_ID: {} {}'.format(job.project_id, job.stages))
+
+        if self.hooks is not None:
+            self.hooks.run(job)
+        return job
+
+
+def clean_results(project_path):
+    results_path = '{}/results'.format(project_path)
+    for entry in os.scandir(results_path):
+        if entry.name != HISTORY_DIRECTORY and entry.is_file():
+            os.remove(entry.path)
+
+
+def clean_history(project_path, executor_file_name):
+    reports_path = '{}/reports'.format(project_path)
+    latest_report_path = '{}/{}'.format(reports_path, LATEST_REPORT)
+    if os.path.isdir(latest_report_path):
+        for name in os.listdir(latest_report_path):
+            remove_path('{}/{}'.format(latest_report_path, name))
+
+    for name in os.listdir(reports_path):
+        if name not in [LATEST_REPORT, '0']:
+            remove_path('{}/{}'.format(reports_path, name))
+
+    results_history_path = '{}/results/{}'.format(project_path, HISTORY_DIRECTORY)
+    if os.path.isdir(results_history_path):
+        for name in os.listdir(results_history_path):
+            remove_path('{}/{}'.format(results_history_path, name))
+
+    executor_path = '{}/results/{}'.format(project_path, executor_file_name)
+    if os.path.exists(executor_path):
+        replace_file(executor_path, '')
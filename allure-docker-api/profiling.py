@@ -0,0 +1,254 @@
+"""Request profiling.
+
+ProfilingMiddleware wraps the WSGI application:
+
+- Opt-in profiling: a request with the 'X-Allure-Profile' header or the 'profile' query parameter,
+  coming from an address of the allowlist, is profiled with cProfile. The id of the stored profile
+  is returned in the 'X-Allure-Profile-Id' response header.
+- Slow requests capture: when a threshold is configured, the stacks of the requests in progress are
+  sampled periodically. The samples of the requests slower than the threshold are stored as
+  collapsed stacks (flame graph format).
+
+Profiles are stored in a directory bounded by number of profiles, the oldest ones are removed.
+"""
+from collections import Counter
+from threading import Lock, Thread, get_ident
+from urllib.parse import parse_qs
+import cProfile, io, ipaddress, json, marshal, os, pstats, sys, time, uuid
+
+PROFILE_HEADER = 'HTTP_X_ALLURE_PROFILE'
+PROFILE_ID_HEADER = 'X-Allure-Profile-Id'
+PROFILE_FORMATS = {
+    'prof': 'application/octet-stream',
+    'txt': 'text/plain',
+    'folded': 'text/plain'
+}
+TOP_FUNCTIONS = 50
+
+
+def parse_allowlist(value):
+    networks = []
+    for item in value.split(','):
+        if item.strip():
+            networks.append(ipaddress.ip_network(item.strip(), strict=False))
+    return networks
+
+
+def is_allowed(allowlist, address):
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in allowlist)
+
+
+class ProfileStore(object):
+    def __init__(self, directory, max_profiles=50):
+        self.directory = directory
+        self.max_profiles = max_profiles
+        self.lock = Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def get_path(self, profile_id, extension):
+        return '{}/{}.{}'.format(self.directory, profile_id, extension)
+
+    def create_profile_id(self):
+        return '{}-{}'.format(time.strftime('%Y%m%d%H%M%S'), uuid.uuid4().hex[:8])
+
+    def save(self, kind, environ, duration, files, profile_id=None):
+        profile_id = profile_id or self.create_profile_id()
+        for extension, content in files.items():
+            with open(self.get_path(profile_id, extension), 'wb') as f:
+                f.write(content)
+
+        metadata = {
+            'id': profile_id,
+            'kind': kind,
+            'method': environ.get('REQUEST_METHOD'),
+            'path': environ.get('PATH_INFO'),
+            'query_string': environ.get('QUERY_STRING', ''),
+            'duration_ms': int(duration * 1000),
+            'created': int(time.time() * 1000),
+            'formats': sorted(files.keys())
+        }
+        with open(self.get_path(profile_id, 'json'), 'w') as f:
+            json.dump(metadata, f)
+        self.prune()
+        return profile_id
+
+    def prune(self):
+        with self.lock:
+            profiles = self.list()
+            for metadata in profiles[self.max_profiles:]:
+                for extension in ['json'] + metadata['formats']:
+                    try:
+                        os.remove(self.get_path(metadata['id'], extension))
+                    except OSError:
+                        pass
+
+    def list(self):
+        profiles = []
+        for name in os.listdir(self.directory):
+            if not name.endswith('.json'):
+                continue
+            try:
+                with open('{}/{}'.format(self.directory, name)) as f:
+                    profiles.append(json.load(f))
+            except (OSError, ValueError):
+                continue
+        profiles.sort(key=lambda metadata: metadata['created'], reverse=True)
+        return profiles
+
+    def get(self, profile_id):
+        try:
+            with open(self.get_path(profile_id, 'json')) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+
+class StackSampler(object):
+    def __init__(self, interval_seconds):
+        self.interval_seconds = interval_seconds
+        self.lock = Lock()
+        self.samples = {}
+        self.thread = None
+
+    def start(self, thread_id):
+        with self.lock:
+            self.samples[thread_id] = Counter()
+            if self.thread is None:
+                self.thread = Thread(target=self.run, daemon=True)
+                self.thread.start()
+
+    def stop(self, thread_id):
+        with self.lock:
+            return self.samples.pop(thread_id, Counter())
+
+    def run(self):
+        while True:
+            time.sleep(self.interval_seconds)
+            with self.lock:
+                if not self.samples:
+                    continue
+                frames = sys._current_frames()
+                for thread_id, counter in self.samples.items():
+                    frame = frames.get(thread_id)
+                    if frame is not None:
+                        counter[get_collapsed_stack(frame)] += 1
+
+
+def get_collapsed_stack(frame):
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append('{}:{}:{}'.format(os.path.basename(code.co_filename), code.co_name, frame.f_lineno))
+        frame = frame.f_back
+    return ';'.join(reversed(stack))
+
+
+class ProfiledResponse(object):
+    # Keeps profiling while the response body is produced, until the server closes it
+    def __init__(self, app_iter, on_close):
+        self.app_iter = app_iter
+        self.on_close = on_close
+
+    def __iter__(self):
+        return iter(self.app_iter)
+
+    def close(self):
+        try:
+            if hasattr(self.app_iter, 'close'):
+                self.app_iter.close()
+        finally:
+            self.on_close()
+
+
+class ProfilingMiddleware(object):
+    def __init__(self, wsgi_app, store, allowlist, slow_request_seconds=0, sample_interval_seconds=0.02,
+                 excluded_paths=None, logger=None):
+        self.wsgi_app = wsgi_app
+        self.store = store
+        self.allowlist = allowlist
+        self.slow_request_seconds = slow_request_seconds
+        self.sampler = StackSampler(sample_interval_seconds) if slow_request_seconds > 0 else None
+        self.excluded_paths = excluded_paths or []
+        self.profiler_lock = Lock()
+        self.logger = logger
+
+    def is_profile_requested(self, environ):
+        if PROFILE_HEADER in environ:
+            return environ[PROFILE_HEADER].lower() not in ['0', 'false']
+        values = parse_qs(environ.get('QUERY_STRING', '')).get('profile')
+        return values is not None and values[0].lower() not in ['0', 'false']
+
+    def is_excluded(self, environ):
+        path = environ.get('PATH_INFO', '')
+        return any(path.endswith(excluded_path) for excluded_path in self.excluded_paths)
+
+    def __call__(self, environ, start_response):
+        if self.is_excluded(environ):
+            return self.wsgi_app(environ, start_response)
+
+        profiler = None
+        # Only one cProfile profiler can be active at the same time
+        if self.is_profile_requested(environ) and is_allowed(self.allowlist, environ.get('REMOTE_ADDR', '')):
+            if self.profiler_lock.acquire(blocking=False):
+                profiler = cProfile.Profile()
+            elif self.logger is not None:
+                self.logger.info('Profile not captured for {}, another request is being profiled'.format(environ.get('PATH_INFO')))
+
+        if profiler is None and self.sampler is None:
+            return self.wsgi_app(environ, start_response)
+
+        thread_id = None
+        if self.sampler is not None:
+            thread_id = get_ident()
+            self.sampler.start(thread_id)
+        start = time.time()
+        profile_id = None
+        if profiler is not None:
+            profile_id = self.store.create_profile_id()
+
+        def profiled_start_response(status, headers, exc_info=None):
+            if profile_id is not None:
+                headers = list(headers) + [(PROFILE_ID_HEADER, profile_id)]
+            return start_response(status, headers, exc_info)
+
+        def finish():
+            duration = time.time() - start
+            samples = self.sampler.stop(thread_id) if self.sampler is not None else None
+            try:
+                if profiler is not None:
+                    profiler.disable()
+                    self.save_profile(profile_id, profiler, environ, duration)
+                if samples and duration >= self.slow_request_seconds:
+                    self.store.save('slow-request', environ, duration, {'folded': get_folded_samples(samples)})
+            except Exception as ex:
+                if self.logger is not None:
+                    self.logger.error('Unable to store profile: {}'.format(str(ex)))
+            finally:
+                if profiler is not None:
+                    self.profiler_lock.release()
+
+        if profiler is not None:
+            profiler.enable()
+        try:
+            app_iter = self.wsgi_app(environ, profiled_start_response)
+        except Exception:
+            finish()
+            raise
+        return ProfiledResponse(app_iter, finish)
+
+    def save_profile(self, profile_id, profiler, environ, duration):
+        output = io.StringIO()
+        stats = pstats.Stats(profiler, stream=output)
+        stats.sort_stats('cumulative').print_stats(TOP_FUNCTIONS)
+        # Same content as cProfile dump_stats, it can be loaded with pstats or snakeviz
+        files = {'prof': marshal.dumps(stats.stats), 'txt': output.getvalue().encode('utf-8')}
+        self.store.save('request', environ, duration, files, profile_id)
+
+
+def get_folded_samples(samples):
+    lines = ['{} {}'.format(stack, count) for stack, count in samples.most_common()]
+    return '\n'.join(lines).encode('utf-8')
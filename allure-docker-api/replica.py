@@ -0,0 +1,86 @@
+"""Read-only replica support.
+
+A replica serves the reports of the projects directory shared with the writer node. It listens
+the events of the writer (GET /events) to invalidate its caches when a project changes and to
+relay the events to its own clients.
+
+The listener reconnects when the connection is lost. Events can be missed while disconnected or
+when the writer drops events for a slow client, in both cases every cache is invalidated.
+"""
+import json, logging, time
+
+import requests
+
+CONNECT_TIMEOUT_SECONDS = 10
+REPLICA_HEADER = 'X-Allure-Replica'
+
+
+def parse_sse(lines):
+    # Yields (event_id, event_type, data) from the lines of a text/event-stream
+    event_id = None
+    event_type = None
+    data = []
+    for line in lines:
+        if line is None:
+            continue
+        if line == '':
+            if data:
+                yield event_id, event_type, '\n'.join(data)
+            event_id = None
+            event_type = None
+            data = []
+            continue
+        if line.startswith(':'):
+            continue
+        field, _, value = line.partition(':')
+        value = value[1:] if value.startswith(' ') else value
+        if field == 'id':
+            event_id = value
+        elif field == 'event':
+            event_type = value
+        elif field == 'data':
+            data.append(value)
+
+
+class ReplicaListener(object):
+    def __init__(self, writer_url, on_event, on_reset, reconnect_seconds=5, read_timeout_seconds=60, logger=None, secret=None):
+        # on_event(event) receives every event of the writer, on_reset() is called when events could be missed
+        self.events_url = '{}/allure-docker-service/events'.format(writer_url.rstrip('/'))
+        self.on_event = on_event
+        self.on_reset = on_reset
+        self.reconnect_seconds = reconnect_seconds
+        self.read_timeout_seconds = read_timeout_seconds
+        self.logger = logger or logging.getLogger(__name__)
+        self.secret = secret
+        self.session = requests.Session()
+        self.connected = False
+        self.last_event_id = None
+
+    def run(self):
+        while True:
+            try:
+                self.listen()
+            except Exception as ex:
+                self.logger.error('Lost connection with the writer {}: {}'.format(self.events_url, str(ex)))
+            self.connected = False
+            time.sleep(self.reconnect_seconds)
+
+    def listen(self):
+        headers = {'Accept': 'text/event-stream'}
+        if self.secret is not None:
+            # Replicas with the secret of the writer don't use its event clients slots
+            headers[REPLICA_HEADER] = self.secret
+        if self.last_event_id is not None:
+            headers['Last-Event-ID'] = self.last_event_id
+        with self.session.get(self.events_url, headers=headers, stream=True,
+                              timeout=(CONNECT_TIMEOUT_SECONDS, self.read_timeout_seconds)) as response:
+            response.raise_for_status()
+            self.logger.info('Listening events of the writer {}'.format(self.events_url))
+            self.connected = True
+            self.on_reset()
+            for event_id, event_type, data in parse_sse(response.iter_lines(decode_unicode=True)):
+                if event_type == 'events-dropped':
+                    self.on_reset()
+                    continue
+                self.last_event_id = event_id
+                self.on_event(json.loads(data))
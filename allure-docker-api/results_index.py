@@ -0,0 +1,156 @@
+"""Index of the results files of every project.
+
+Listing 'results' with thousands of files on every request is expensive, the index keeps per
+project the sorted file names with their size, modification time and type, and the counts by
+type. The files sent through the API are added to the index as they are stored.
+
+Results can be copied to the results directory from outside the API (i.e. mounted volume), an
+index is valid while the modification time of the results directory doesn't change, otherwise it
+is rebuilt on the next read. A file added through the API only keeps the index valid when the
+directory was not modified by anything else before or while the file was written.
+"""
+from contextlib import contextmanager
+from threading import Lock
+import bisect, fnmatch, os
+
+RESULT = 'result'
+CONTAINER = 'container'
+ATTACHMENT = 'attachment'
+DIRECTORY = 'directory'
+OTHER = 'other'
+FILE_TYPES = [RESULT, CONTAINER, ATTACHMENT, DIRECTORY, OTHER]
+
+
+def get_file_type(file_name, is_directory=False):
+    if is_directory is True:
+        return DIRECTORY
+    if file_name.endswith('-result.json'):
+        return RESULT
+    if file_name.endswith('-container.json'):
+        return CONTAINER
+    if '-attachment' in file_name:
+        return ATTACHMENT
+    return OTHER
+
+
+class ProjectResultsIndex(object):
+    def __init__(self, results_path):
+        self.results_path = results_path
+        self.lock = Lock()
+        self.names = []
+        self.files = {}
+        self.counts = dict.fromkeys(FILE_TYPES, 0)
+        self.mtime_ns = None
+
+    def get_mtime_ns(self):
+        try:
+            return os.stat(self.results_path).st_mtime_ns
+        except OSError:
+            return None
+
+    def build(self):
+        # Called with the lock acquired
+        mtime_ns = self.get_mtime_ns()
+        self.names = []
+        self.files = {}
+        self.counts = dict.fromkeys(FILE_TYPES, 0)
+        if mtime_ns is not None:
+            for entry in os.scandir(self.results_path):
+                if entry.name.startswith('.'):
+                    continue
+                try:
+                    self.put(entry.name, entry.stat(), entry.is_dir())
+                except OSError:
+                    continue
+            self.names = sorted(self.files.keys())
+        self.mtime_ns = mtime_ns
+
+    def refresh(self):
+        # Called with the lock acquired
+        if self.mtime_ns is None or self.mtime_ns != self.get_mtime_ns():
+            self.build()
+
+    def put(self, file_name, stat, is_directory=False):
+        # Called with the lock acquired, the caller keeps 'names' sorted
+        previous = self.files.get(file_name)
+        if previous is not None:
+            self.counts[previous['type']] = self.counts[previous['type']] - 1
+        file = {
+            'file_name': file_name,
+            'type': get_file_type(file_name, is_directory),
+            'size': 0 if is_directory else stat.st_size,
+            'modified': int(stat.st_mtime * 1000)
+        }
+        self.files[file_name] = file
+        self.counts[file['type']] = self.counts[file['type']] + 1
+
+    def add(self, file_name, previous_mtime_ns, mtime_ns):
+        # previous_mtime_ns and mtime_ns are the modification times of the directory before and
+        # after writing the file, any other change invalidates the index
+        with self.lock:
+            if self.mtime_ns is None:
+                return
+            if previous_mtime_ns != self.mtime_ns:
+                self.mtime_ns = None
+                return
+            try:
+                stat = os.stat('{}/{}'.format(self.results_path, file_name))
+            except OSError:
+                self.mtime_ns = None
+                return
+            if file_name not in self.files:
+                bisect.insort(self.names, file_name)
+            self.put(file_name, stat)
+            self.mtime_ns = mtime_ns
+
+    @contextmanager
+    def adding(self, file_name):
+        # with index.adding(file_name): write the file in the results directory
+        previous_mtime_ns = self.get_mtime_ns()
+        yield
+        self.add(file_name, previous_mtime_ns, self.get_mtime_ns())
+
+    def get_count(self):
+        with self.lock:
+            self.refresh()
+            return len(self.names)
+
+    def get_summary(self, limit=0):
+        # Counts by type and the first 'limit' file names (0 returns all the names)
+        with self.lock:
+            self.refresh()
+            names = self.names[:limit] if limit > 0 else list(self.names)
+            return {'count': len(self.names), 'counts': dict(self.counts), 'file_names': names}
+
+    def search(self, offset=0, limit=100, file_type=None, pattern=None):
+        with self.lock:
+            self.refresh()
+            if file_type is None and pattern is None:
+                names = self.names
+            else:
+                names = [name for name in self.names
+                         if (file_type is None or self.files[name]['type'] == file_type)
+                         and (pattern is None or fnmatch.fnmatch(name, pattern))]
+            return len(names), [dict(self.files[name]) for name in names[offset:offset + limit]]
+
+
+class ResultsIndex(object):
+    def __init__(self):
+        self.lock = Lock()
+        self.projects = {}
+
+    def get(self, project_id, results_path):
+        with self.lock:
+            index = self.projects.get(project_id)
+            if index is None or index.results_path != results_path:
+                index = ProjectResultsIndex(results_path)
+                self.projects[project_id] = index
+            return index
+
+    def forget(self, project_id):
+        with self.lock:
+            self.projects.pop(project_id, None)
+
+    def clear(self):
+        with self.lock:
+            self.projects = {}
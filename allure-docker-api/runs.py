@@ -0,0 +1,246 @@
+"""Sharded runs.
+
+A run collects the results of N parallel shards (i.e. CI jobs) of the same execution. Every shard
+uploads its results into its own directory of the run and marks itself as complete. When all the
+expected shards are complete, or when the run times out, the run is ready: the results of all the
+shards are moved to the project results and a single report is generated.
+
+Runs are stored in '<project>/runs/<run_id>/run.json', the shards results in
+'<project>/runs/<run_id>/shards/<shard>'. Results of open runs are never seen by the results watcher.
+
+The runs not finished yet are kept in memory (pending runs) to check them without reading every
+run of every project, finished and failed runs are removed after a retention time. The uploads in
+progress of every run are counted to merge its shards only once they are finished.
+"""
+from threading import Condition
+import copy, json, os, shutil, time, uuid
+
+RUNS_DIRECTORY_NAME = 'runs'
+RUN_FILE_NAME = 'run.json'
+SHARDS_DIRECTORY_NAME = 'shards'
+
+OPEN = 'open'
+READY = 'ready'
+GENERATING = 'generating'
+FINISHED = 'finished'
+FAILED = 'failed'
+SHARD_UPLOADING = 'uploading'
+SHARD_COMPLETE = 'complete'
+PENDING_STATUSES = [OPEN, READY, GENERATING]
+
+
+class RunError(Exception):
+    def __init__(self, message, status_code=400):
+        super(RunError, self).__init__(message)
+        self.status_code = status_code
+
+
+class RunRegistry(object):
+    def __init__(self, projects_directory):
+        self.projects_directory = projects_directory
+        self.lock = Condition()
+        self.pending = {}
+        self.uploads = {}
+
+    def get_runs_path(self, project_id):
+        return '{}/{}/{}'.format(self.projects_directory, project_id, RUNS_DIRECTORY_NAME)
+
+    def get_run_path(self, project_id, run_id):
+        return '{}/{}'.format(self.get_runs_path(project_id), run_id)
+
+    def get_shard_path(self, project_id, run_id, shard):
+        return '{}/{}/{}'.format(self.get_run_path(project_id, run_id), SHARDS_DIRECTORY_NAME, shard)
+
+    def save(self, run):
+        # Called with the lock acquired
+        key = (run['project_id'], run['id'])
+        if run['status'] in PENDING_STATUSES:
+            self.pending[key] = copy.deepcopy(run)
+        else:
+            self.pending.pop(key, None)
+            if run.get('finished') is None:
+                run['finished'] = int(time.time() * 1000)
+        run_path = self.get_run_path(run['project_id'], run['id'])
+        tmp_path = '{}/.{}.{}'.format(run_path, RUN_FILE_NAME, uuid.uuid4().hex)
+        with open(tmp_path, 'w') as f:
+            json.dump(run, f)
+        os.replace(tmp_path, '{}/{}'.format(run_path, RUN_FILE_NAME))
+
+    def load(self, project_id, run_id):
+        try:
+            with open('{}/{}'.format(self.get_run_path(project_id, run_id), RUN_FILE_NAME)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def create(self, project_id, expected_shards, timeout_seconds, execution_name=None, execution_from=None,
+               execution_type=None, clean_results=False):
+        now = time.time()
+        run = {
+            'id': uuid.uuid4().hex,
+            'project_id': project_id,
+            'status': OPEN,
+            'expected_shards': expected_shards,
+            'timeout_seconds': timeout_seconds,
+            'created': int(now * 1000),
+            'deadline': int((now + timeout_seconds) * 1000),
+            'timed_out': False,
+            'execution_name': execution_name,
+            'execution_from': execution_from,
+            'execution_type': execution_type,
+            'clean_results': clean_results,
+            'shards': {},
+            'job_id': None,
+            'report_url': None,
+            'error': None,
+            'finished': None
+        }
+        os.makedirs('{}/{}'.format(self.get_run_path(project_id, run['id']), SHARDS_DIRECTORY_NAME))
+        with self.lock:
+            self.save(run)
+        return run
+
+    def get(self, project_id, run_id):
+        with self.lock:
+            return self.load(project_id, run_id)
+
+    def list(self, project_id):
+        runs_path = self.get_runs_path(project_id)
+        if not os.path.isdir(runs_path):
+            return []
+        runs = []
+        with self.lock:
+            for run_id in os.listdir(runs_path):
+                run = self.load(project_id, run_id)
+                if run is not None:
+                    runs.append(run)
+        runs.sort(key=lambda run: run['created'], reverse=True)
+        return runs
+
+    def load_pending(self, project_id):
+        # Pending runs of a project stored before (i.e. restart or imported project)
+        runs_path = self.get_runs_path(project_id)
+        if not os.path.isdir(runs_path):
+            return
+        with self.lock:
+            for run_id in os.listdir(runs_path):
+                run = self.load(project_id, run_id)
+                if run is not None and run['status'] in PENDING_STATUSES:
+                    self.pending[(project_id, run_id)] = run
+
+    def get_pending(self):
+        with self.lock:
+            return [copy.deepcopy(run) for run in self.pending.values()]
+
+    def forget(self, project_id):
+        with self.lock:
+            for key in [key for key in self.pending if key[0] == project_id]:
+                self.pending.pop(key)
+
+    def remove_expired(self, project_id, retention_seconds):
+        # Removes the finished and failed runs older than 'retention_seconds'
+        runs_path = self.get_runs_path(project_id)
+        if not os.path.isdir(runs_path):
+            return []
+        removed_runs = []
+        limit = int((time.time() - retention_seconds) * 1000)
+        with self.lock:
+            for run_id in os.listdir(runs_path):
+                run = self.load(project_id, run_id)
+                if run is None or run['status'] in PENDING_STATUSES:
+                    continue
+                if (run.get('finished') or run['created']) <= limit:
+                    shutil.rmtree(self.get_run_path(project_id, run_id), ignore_errors=True)
+                    removed_runs.append(run_id)
+        return removed_runs
+
+    def update(self, project_id, run_id, function):
+        # function(run) modifies the run, it's executed and saved atomically
+        with self.lock:
+            run = self.load(project_id, run_id)
+            if run is None:
+                raise RunError("run_id '{}' not found for project_id '{}'".format(run_id, project_id), 404)
+            function(run)
+            self.save(run)
+            return run
+
+    def add_shard(self, run, shard):
+        if run['status'] != OPEN:
+            raise RunError("run_id '{}' is not open (status '{}')".format(run['id'], run['status']), 409)
+        if shard not in run['shards']:
+            if len(run['shards']) >= run['expected_shards']:
+                raise RunError("run_id '{}' already has the {} expected shards".format(run['id'], run['expected_shards']), 409)
+            run['shards'][shard] = {'status': SHARD_UPLOADING, 'files_count': 0}
+        elif run['shards'][shard]['status'] == SHARD_COMPLETE:
+            raise RunError("shard '{}' of run_id '{}' is already complete".format(shard, run['id']), 409)
+
+    def open_shard(self, project_id, run_id, shard):
+        # The upload is counted until close_shard is called
+        def add(run):
+            self.add_shard(run, shard)
+            key = (project_id, run_id)
+            self.uploads[key] = self.uploads.get(key, 0) + 1
+
+        run = self.update(project_id, run_id, add)
+        shard_path = self.get_shard_path(project_id, run_id, shard)
+        try:
+            os.makedirs(shard_path, exist_ok=True)
+        except Exception:
+            self.close_shard(project_id, run_id)
+            raise
+        return run, shard_path
+
+    def close_shard(self, project_id, run_id):
+        key = (project_id, run_id)
+        with self.lock:
+            self.uploads[key] = self.uploads.get(key, 1) - 1
+            if self.uploads[key] <= 0:
+                self.uploads.pop(key)
+                self.lock.notify_all()
+
+    def wait_uploads(self, project_id, run_id, timeout_seconds=None):
+        # Runs are not open anymore when they are merged, no upload starts meanwhile
+        with self.lock:
+            return self.lock.wait_for(lambda: (project_id, run_id) not in self.uploads, timeout_seconds)
+
+    def complete_shard(self, project_id, run_id, shard):
+        # The run is READY once all the expected shards are complete
+        def complete(run):
+            self.add_shard(run, shard)
+            shard_path = self.get_shard_path(project_id, run_id, shard)
+            run['shards'][shard]['status'] = SHARD_COMPLETE
+            run['shards'][shard]['files_count'] = len(os.listdir(shard_path)) if os.path.isdir(shard_path) else 0
+            completed_shards = [value for value in run['shards'].values() if value['status'] == SHARD_COMPLETE]
+            if len(completed_shards) >= run['expected_shards']:
+                run['status'] = READY
+
+        return self.update(project_id, run_id, complete)
+
+    def expire(self, project_id, run_id):
+        def timeout(run):
+            if run['status'] == OPEN and run['deadline'] <= int(time.time() * 1000):
+                run['status'] = READY
+                run['timed_out'] = True
+
+        return self.update(project_id, run_id, timeout)
+
+    def claim(self, project_id, run_id):
+        # Only one caller moves a ready run to generating
+        claimed = []
+
+        def start_generation(run):
+            if run['status'] == READY:
+                run['status'] = GENERATING
+                claimed.append(run['id'])
+
+        run = self.update(project_id, run_id, start_generation)
+        return len(claimed) > 0, run
+
+    def get_shard_paths(self, project_id, run_id):
+        shards_path = '{}/{}'.format(self.get_run_path(project_id, run_id), SHARDS_DIRECTORY_NAME)
+        if not os.path.isdir(shards_path):
+            return []
+        return ['{}/{}'.format(shards_path, shard) for shard in sorted(os.listdir(shards_path))]
+
+    def remove_shards(self, project_id, run_id):
+        shutil.rmtree('{}/{}'.format(self.get_run_path(project_id, run_id), SHARDS_DIRECTORY_NAME), ignore_errors=True)
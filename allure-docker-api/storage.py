@@ -0,0 +1,371 @@
+"""Storage backends for the projects results and reports.
+
+The projects directory (STATIC_CONTENT_PROJECTS) is always the working copy used to generate
+reports. With the 'local' backend it is the storage as well. With the 's3' backend every result
+and report is stored in an S3 compatible bucket, the working copy is restored from the bucket
+when needed and the reports are served through a local read cache bounded by size.
+"""
+from collections import OrderedDict
+from threading import Lock
+import hashlib, os, shutil, uuid
+
+STORAGE_BACKENDS = ['local', 's3']
+REPORTS_DIRECTORY = 'reports'
+RESULTS_DIRECTORY = 'results'
+LATEST_REPORT = 'latest'
+PROJECT_MARKER = '.project'
+DEFAULT_CACHE_SIZE_BYTES = 1024 * 1024 * 1024
+MULTIPART_CHUNK_SIZE_BYTES = 8 * 1024 * 1024
+
+
+class ReadCache(object):
+    def __init__(self, directory, max_size_bytes):
+        self.directory = directory
+        self.max_size_bytes = max_size_bytes
+        self.entries = OrderedDict()
+        self.size_bytes = 0
+        self.lock = Lock()
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key, loader):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+                return entry[0]
+
+        file_path = '{}/{}'.format(self.directory, hashlib.sha1(key.encode('utf-8')).hexdigest())
+        tmp_path = '{}.{}'.format(file_path, uuid.uuid4().hex)
+        try:
+            if loader(tmp_path) is False:
+                return None
+            os.replace(tmp_path, file_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        size = os.path.getsize(file_path)
+        with self.lock:
+            previous = self.entries.pop(key, None)
+            if previous is not None:
+                self.size_bytes = self.size_bytes - previous[1]
+            self.entries[key] = (file_path, size)
+            self.size_bytes = self.size_bytes + size
+            while self.size_bytes > self.max_size_bytes and len(self.entries) > 1:
+                _, (evicted_path, evicted_size) = self.entries.popitem(last=False)
+                self.size_bytes = self.size_bytes - evicted_size
+                if os.path.exists(evicted_path):
+                    os.remove(evicted_path)
+        return file_path
+
+    def invalidate(self, prefix):
+        with self.lock:
+            for key in [key for key in self.entries if key.startswith(prefix)]:
+                file_path, size = self.entries.pop(key)
+                self.size_bytes = self.size_bytes - size
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+
+
+class LocalStorage(object):
+    name = 'local'
+
+    def __init__(self, projects_directory):
+        self.projects_directory = projects_directory
+
+    def get_project_path(self, project_id):
+        return '{}/{}'.format(self.projects_directory, project_id)
+
+    def list_projects(self):
+        return [name for name in os.listdir(self.projects_directory)
+                if not name.startswith('.') and os.path.isdir(self.get_project_path(name))]
+
+    def create_project(self, project_id):
+        pass
+
+    def delete_project(self, project_id):
+        pass
+
+    def save_result(self, project_id, file_name):
+        pass
+
+    def delete_results(self, project_id):
+        pass
+
+    def save_report_file(self, project_id, path):
+        pass
+
+    def fetch_project(self, project_id):
+        pass
+
+    def publish_report(self, project_id, build_order=None):
+        pass
+
+    def delete_reports(self, project_id):
+        pass
+
+    def delete_builds(self, project_id, build_orders):
+        pass
+
+    def list_build_orders(self, project_id):
+        reports_path = '{}/{}'.format(self.get_project_path(project_id), REPORTS_DIRECTORY)
+        return [int(name) for name in os.listdir(reports_path) if name.isdigit()]
+
+    def list_reports(self, project_id):
+        reports = []
+        reports_path = '{}/{}'.format(self.get_project_path(project_id), REPORTS_DIRECTORY)
+        for name in os.listdir(reports_path):
+            index_path = '{}/{}/index.html'.format(reports_path, name)
+            if os.path.isfile(index_path):
+                reports.append((name, os.path.getmtime(index_path)))
+        return reports
+
+    def get_report_file(self, project_id, path):
+        return None
+
+    def invalidate_project(self, project_id=None):
+        pass
+
+
+class S3Storage(LocalStorage):
+    name = 's3'
+
+    def __init__(self, projects_directory, bucket, prefix='', endpoint_url=None, region_name=None,
+                 cache_directory=None, cache_size_bytes=DEFAULT_CACHE_SIZE_BYTES):
+        try:
+            import boto3
+            from boto3.s3.transfer import TransferConfig
+        except ImportError:
+            raise Exception("'boto3' library is required for the 's3' storage backend")
+
+        super(S3Storage, self).__init__(projects_directory)
+        self.bucket = bucket
+        self.prefix = prefix.strip('/') + '/' if prefix.strip('/') else ''
+        self.client = boto3.client('s3', endpoint_url=endpoint_url, region_name=region_name)
+        self.transfer_config = TransferConfig(multipart_threshold=MULTIPART_CHUNK_SIZE_BYTES,
+                                              multipart_chunksize=MULTIPART_CHUNK_SIZE_BYTES)
+        if cache_directory is None:
+            cache_directory = '{}/.storage-cache'.format(projects_directory)
+        self.cache_directory = cache_directory
+        self.cache_size_bytes = cache_size_bytes
+        self.cache_lock = Lock()
+        self.read_cache = None
+        # (project_id, report) -> index.html modification time, stored builds don't change
+        self.report_times = {}
+        self.report_times_lock = Lock()
+
+    @property
+    def cache(self):
+        # Created on first use, reports are only read through the cache once they are requested
+        with self.cache_lock:
+            if self.read_cache is None:
+                self.read_cache = ReadCache(self.cache_directory, self.cache_size_bytes)
+            return self.read_cache
+
+    def invalidate_cache(self, prefix):
+        if self.read_cache is not None:
+            self.read_cache.invalidate(prefix)
+
+    def invalidate_project(self, project_id=None):
+        # Reports changed by another node (i.e. the writer of a read-only replica)
+        if project_id is None:
+            self.invalidate_cache(self.prefix)
+        else:
+            self.invalidate_cache(self.get_key(project_id))
+        self.invalidate_report_times(project_id)
+
+    def invalidate_report_times(self, project_id=None, reports=None):
+        with self.report_times_lock:
+            for key in list(self.report_times):
+                if (project_id is None or key[0] == project_id) and (reports is None or key[1] in reports):
+                    self.report_times.pop(key)
+
+    def get_report_time(self, project_id, report):
+        # Modification time of the index.html of a report, None when the report has no index.html
+        with self.report_times_lock:
+            if (project_id, report) in self.report_times:
+                return self.report_times[(project_id, report)]
+        try:
+            response = self.client.head_object(Bucket=self.bucket, Key=self.get_key(project_id, REPORTS_DIRECTORY, report, 'index.html'))
+            report_time = response['LastModified'].timestamp()
+        except self.client.exceptions.ClientError:
+            report_time = None
+        with self.report_times_lock:
+            self.report_times[(project_id, report)] = report_time
+        return report_time
+
+    def get_key(self, project_id, *parts):
+        return '{}{}/{}'.format(self.prefix, project_id, '/'.join([str(part) for part in parts]))
+
+    def list_keys(self, prefix, delimiter=None):
+        paginator = self.client.get_paginator('list_objects_v2')
+        kwargs = {'Bucket': self.bucket, 'Prefix': prefix}
+        if delimiter is not None:
+            kwargs['Delimiter'] = delimiter
+        for page in paginator.paginate(**kwargs):
+            for common_prefix in page.get('CommonPrefixes', []):
+                yield common_prefix['Prefix'], None
+            for item in page.get('Contents', []):
+                yield item['Key'], item
+
+    def delete_keys(self, keys):
+        keys = list(keys)
+        for index in range(0, len(keys), 1000):
+            objects = [{'Key': key} for key in keys[index:index + 1000]]
+            self.client.delete_objects(Bucket=self.bucket, Delete={'Objects': objects, 'Quiet': True})
+
+    def delete_prefix(self, prefix):
+        self.delete_keys([key for key, item in self.list_keys(prefix) if item is not None])
+        self.invalidate_cache(prefix)
+
+    def upload_file(self, file_path, key):
+        self.client.upload_file(file_path, self.bucket, key, Config=self.transfer_config)
+
+    def upload_directory(self, directory, key_prefix):
+        keys = set()
+        for dirpath, _, files in os.walk(directory):
+            for file_name in files:
+                file_path = os.path.join(dirpath, file_name)
+                key = '{}/{}'.format(key_prefix, os.path.relpath(file_path, directory))
+                self.upload_file(file_path, key)
+                keys.add(key)
+        return keys
+
+    def download_prefix(self, key_prefix, directory, overwrite=True):
+        for key, item in self.list_keys(key_prefix + '/'):
+            if item is None:
+                continue
+            file_path = os.path.join(directory, key[len(key_prefix) + 1:])
+            if overwrite is False and os.path.exists(file_path):
+                continue
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            self.client.download_file(self.bucket, key, file_path, Config=self.transfer_config)
+
+    def list_projects(self):
+        projects = []
+        for key, item in self.list_keys(self.prefix, delimiter='/'):
+            if item is None:
+                projects.append(key[len(self.prefix):].rstrip('/'))
+        return projects
+
+    def create_project(self, project_id):
+        self.client.put_object(Bucket=self.bucket, Key=self.get_key(project_id, PROJECT_MARKER), Body=b'')
+
+    def delete_project(self, project_id):
+        self.delete_prefix(self.get_key(project_id))
+        self.invalidate_report_times(project_id)
+
+    def save_result(self, project_id, file_name):
+        file_path = '{}/{}/{}'.format(self.get_project_path(project_id), RESULTS_DIRECTORY, file_name)
+        self.upload_file(file_path, self.get_key(project_id, RESULTS_DIRECTORY, file_name))
+
+    def delete_results(self, project_id):
+        self.delete_prefix(self.get_key(project_id, RESULTS_DIRECTORY) + '/')
+
+    def save_report_file(self, project_id, path):
+        key = self.get_key(project_id, REPORTS_DIRECTORY, path)
+        self.upload_file('{}/{}/{}'.format(self.get_project_path(project_id), REPORTS_DIRECTORY, path), key)
+        self.invalidate_cache(key)
+
+    def fetch_project(self, project_id):
+        project_path = self.get_project_path(project_id)
+        self.download_prefix(self.get_key(project_id, RESULTS_DIRECTORY),
+                             '{}/{}'.format(project_path, RESULTS_DIRECTORY), overwrite=False)
+        latest_history_path = '{}/{}/{}/history'.format(project_path, REPORTS_DIRECTORY, LATEST_REPORT)
+        if not os.path.isdir(latest_history_path):
+            self.download_prefix(self.get_key(project_id, REPORTS_DIRECTORY, LATEST_REPORT, 'history'), latest_history_path)
+
+        # The build order is calculated from the last report directory of the working copy
+        reports_path = '{}/{}'.format(project_path, REPORTS_DIRECTORY)
+        local_builds = [int(name) for name in os.listdir(reports_path) if name.isdigit()]
+        builds = self.list_build_orders(project_id)
+        if builds and max(builds) > max(local_builds + [0]):
+            os.makedirs('{}/{}'.format(reports_path, max(builds)), exist_ok=True)
+
+    def publish_report(self, project_id, build_order=None):
+        reports_path = '{}/{}'.format(self.get_project_path(project_id), REPORTS_DIRECTORY)
+        latest_prefix = self.get_key(project_id, REPORTS_DIRECTORY, LATEST_REPORT)
+        keys = self.upload_directory('{}/{}'.format(reports_path, LATEST_REPORT), latest_prefix)
+        self.delete_keys([key for key, item in self.list_keys(latest_prefix + '/') if item is not None and key not in keys])
+        self.invalidate_cache(latest_prefix + '/')
+        self.invalidate_report_times(project_id, [LATEST_REPORT, str(build_order)])
+
+        for file_name in os.listdir(reports_path):
+            file_path = '{}/{}'.format(reports_path, file_name)
+            if os.path.isfile(file_path):
+                self.upload_file(file_path, self.get_key(project_id, REPORTS_DIRECTORY, file_name))
+                self.invalidate_cache(self.get_key(project_id, REPORTS_DIRECTORY, file_name))
+
+        if build_order is None or build_order == LATEST_REPORT:
+            return
+        build_path = '{}/{}'.format(reports_path, build_order)
+        if os.path.isdir(build_path):
+            self.upload_directory(build_path, self.get_key(project_id, REPORTS_DIRECTORY, build_order))
+
+    def delete_reports(self, project_id):
+        reports_prefix = self.get_key(project_id, REPORTS_DIRECTORY) + '/'
+        for key, item in list(self.list_keys(reports_prefix, delimiter='/')):
+            if item is None and key[len(reports_prefix):].rstrip('/') not in [LATEST_REPORT, '0']:
+                self.delete_prefix(key)
+        self.invalidate_report_times(project_id)
+
+    def delete_builds(self, project_id, build_orders):
+        for build_order in build_orders:
+            self.delete_prefix(self.get_key(project_id, REPORTS_DIRECTORY, build_order) + '/')
+        self.invalidate_report_times(project_id, [str(build_order) for build_order in build_orders])
+
+    def list_build_orders(self, project_id):
+        reports_prefix = self.get_key(project_id, REPORTS_DIRECTORY) + '/'
+        names = [key[len(reports_prefix):].rstrip('/') for key, item in self.list_keys(reports_prefix, delimiter='/') if item is None]
+        return [int(name) for name in names if name.isdigit()]
+
+    def list_reports(self, project_id):
+        # Reports are the directories with an index.html, only the directories are listed and the
+        # index.html of every report is checked once (until it's published or deleted again)
+        reports = []
+        reports_prefix = self.get_key(project_id, REPORTS_DIRECTORY) + '/'
+        for key, item in self.list_keys(reports_prefix, delimiter='/'):
+            if item is not None:
+                continue
+            report = key[len(reports_prefix):].rstrip('/')
+            report_time = self.get_report_time(project_id, report)
+            if report_time is not None:
+                reports.append((report, report_time))
+        return reports
+
+    def get_report_file(self, project_id, path):
+        key = self.get_key(project_id, REPORTS_DIRECTORY, path.lstrip('/'))
+
+        def load(file_path):
+            try:
+                self.client.download_file(self.bucket, key, file_path, Config=self.transfer_config)
+            except self.client.exceptions.ClientError:
+                return False
+            return True
+
+        return self.cache.get(key, load)
+
+
+def create_storage(projects_directory):
+    backend = os.environ.get('STORAGE_BACKEND', 'local')
+    if backend not in STORAGE_BACKENDS:
+        raise Exception("'STORAGE_BACKEND' should be one of {}".format(STORAGE_BACKENDS))
+
+    if backend == 'local':
+        return LocalStorage(projects_directory)
+
+    if not os.environ.get('STORAGE_S3_BUCKET'):
+        raise Exception("'STORAGE_S3_BUCKET' is required for the 's3' storage backend")
+
+    cache_size_bytes = DEFAULT_CACHE_SIZE_BYTES
+    if 'STORAGE_CACHE_SIZE_BYTES' in os.environ:
+        cache_size_bytes = int(os.environ['STORAGE_CACHE_SIZE_BYTES'])
+
+    return S3Storage(projects_directory, os.environ['STORAGE_S3_BUCKET'],
+                     prefix=os.environ.get('STORAGE_S3_PREFIX', ''),
+                     endpoint_url=os.environ.get('STORAGE_S3_ENDPOINT_URL'),
+                     region_name=os.environ.get('STORAGE_S3_REGION'),
+                     cache_directory=os.environ.get('STORAGE_CACHE_DIRECTORY'),
+                     cache_size_bytes=cache_size_bytes)
+
@@ -1,13 +1,20 @@
 #!/bin/bash
 echo "ALLURE_VERSION:" $(cat ${ALLURE_VERSION})
-EXEC_STORE_RESULTS_PROCESS=0
-PROJECT_ID='default'
+RETRY=120
+DELAY=1
 
-if [ -e $REPORT_DIRECTORY/index.html ]; then
-	echo "Opening existing report"
-else
-	echo "Generating default report"
-	$ROOT/generateAllureReport.sh $EXEC_STORE_RESULTS_PROCESS $PROJECT_ID
-	$ROOT/renderEmailableReport.sh $PROJECT_ID
-fi
+# The API generates the default report when it starts, wait for it before opening it
+RETRY_COUNTER=1
+while [ ! -e $REPORT_DIRECTORY/index.html ]
+	do
+		if [ "$RETRY_COUNTER" == "1" ]; then
+			echo "Waiting for default report"
+		fi
+		sleep $DELAY
+		RETRY_COUNTER=$[$RETRY_COUNTER +1]
+		if [ "$RETRY_COUNTER" == "$RETRY" ]; then
+			echo "Timeout waiting for default report after $RETRY attempts"
+			break;
+		fi
+done
 allure open --port $DEPRECATED_PORT > /tmp/log_deprecated_port
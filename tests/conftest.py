@@ -0,0 +1,43 @@
+import base64, os, sys, tempfile
+
+import pytest
+
+API_DIRECTORY = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'allure-docker-api')
+sys.path.insert(0, API_DIRECTORY)
+
+# app reads its configuration from the environment when it's imported
+PROJECTS_DIRECTORY = tempfile.mkdtemp(prefix='allure-projects-')
+os.environ.update({
+    'PORT': '5050',
+    'ALLURE_VERSION': os.path.join(PROJECTS_DIRECTORY, 'version'),
+    'STATIC_CONTENT': os.path.join(API_DIRECTORY, 'static'),
+    'STATIC_CONTENT_PROJECTS': PROJECTS_DIRECTORY,
+    'EMAILABLE_REPORT_FILE_NAME': 'emailable-report-allure-docker-service.html',
+    'CHECK_RESULTS_EVERY_SECONDS': 'NONE'
+})
+
+
+@pytest.fixture(scope='session')
+def app_module():
+    import app
+    return app
+
+
+@pytest.fixture
+def client(app_module):
+    return app_module.app.test_client()
+
+
+@pytest.fixture
+def project_id(client):
+    project_id = 'project-{}'.format(os.urandom(4).hex())
+    response = client.post('/projects', json={'id': project_id})
+    assert response.status_code == 201
+    yield project_id
+    client.delete('/projects/{}'.format(project_id))
+
+
+def send_results(client, project_id, files):
+    results = [{'file_name': file_name, 'content_base64': base64.b64encode(content).decode('utf-8')}
+               for file_name, content in files.items()]
+    return client.post('/send-results?project_id={}'.format(project_id), json={'results': results})
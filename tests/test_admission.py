@@ -0,0 +1,43 @@
+from threading import Thread
+import time
+
+import pytest
+
+from admission import AdmissionError, GenerationAdmission
+
+
+def test_bounded_wait_times_out():
+    admission = GenerationAdmission(max_concurrency=1, queue_size=2, queue_timeout_seconds=0.1)
+    admission.acquire('project-a')
+
+    with pytest.raises(AdmissionError) as ex:
+        admission.acquire('project-b')
+    assert ex.value.status_code == 503
+
+
+def test_unbounded_wait_outlasts_the_queue_limits():
+    admission = GenerationAdmission(max_concurrency=1, queue_size=0, queue_timeout_seconds=0.1)
+    admission.acquire('project-a')
+    acquired = []
+
+    waiter = Thread(target=lambda: acquired.append(admission.acquire('project-b', bounded=False)))
+    waiter.start()
+    time.sleep(0.3)
+    assert acquired == []
+
+    admission.release('project-a')
+    waiter.join(1)
+    assert acquired == [None]
+    assert admission.is_running('project-b')
+
+
+def test_fail_fast_is_rejected_when_busy():
+    admission = GenerationAdmission(max_concurrency=1, queue_size=2, queue_timeout_seconds=60)
+    admission.acquire('project-a')
+
+    with pytest.raises(AdmissionError) as ex:
+        admission.acquire('project-b', wait=False, bounded=False)
+    assert ex.value.status_code == 503
+    with pytest.raises(AdmissionError) as ex:
+        admission.acquire('project-a', wait=False, bounded=False)
+    assert ex.value.status_code == 429
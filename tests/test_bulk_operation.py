@@ -0,0 +1,110 @@
+import os, time
+from urllib.parse import urlparse
+
+import pytest
+
+
+@pytest.fixture
+def generations(app_module, monkeypatch):
+    failing_projects = []
+
+    def run_generation(job):
+        if job.project_id in failing_projects:
+            raise Exception('Unable to generate report')
+        job.status = 'finished'
+        return job
+    monkeypatch.setattr(app_module, 'run_generation', run_generation)
+    return failing_projects
+
+
+@pytest.fixture
+def other_project_id(client):
+    project_id = 'project-{}'.format(os.urandom(4).hex())
+    client.post('/projects', json={'id': project_id})
+    yield project_id
+    client.delete('/projects/{}'.format(project_id))
+
+
+def wait_bulk_operation(client, response):
+    assert response.status_code == 202
+    path = urlparse(response.headers['Location']).path
+    assert path == urlparse(response.get_json()['data']['status_url']).path
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        data = client.get(path).get_json()['data']
+        if data['status'] == 'finished':
+            return data
+        time.sleep(0.05)
+    raise AssertionError('bulk operation not finished')
+
+
+def test_bulk_operation_is_queued_and_reports_every_project(client, project_id, other_project_id, generations):
+    generations.append(other_project_id)
+    response = client.post('/bulk-operation', json={'operation': 'generate-report',
+                                                    'project_ids': [project_id, other_project_id, 'missing-project']})
+
+    data = wait_bulk_operation(client, response)
+
+    assert data['operation'] == 'generate-report'
+    assert data['projects_count'] == 3
+    assert data['finished_projects_count'] == 3
+    assert data['failed_projects_count'] == 2
+    result = data['projects'][project_id]
+    assert result['status_code'] == 200
+    assert result['report_url'].endswith('/projects/{}/reports/latest/index.html'.format(project_id))
+    assert set(result) >= {'status_code', 'message', 'report_url', 'job_id', 'stages', 'hooks'}
+    assert data['projects'][other_project_id] == {'status_code': 400, 'message': 'Unable to generate report'}
+    assert data['projects']['missing-project']['status_code'] == 404
+
+
+def test_bulk_operation_reports_busy_projects_with_fail_fast(app_module, client, project_id, generations):
+    with app_module.GENERATION_ADMISSION.project(project_id):
+        response = client.post('/bulk-operation', json={'operation': 'clean-results', 'project_ids': [project_id], 'fail_fast': True})
+        data = wait_bulk_operation(client, response)
+
+    result = data['projects'][project_id]
+    assert result['status_code'] == 429
+    assert 'retry_after' in result
+
+
+def test_bulk_operations_are_bounded(app_module, client, project_id, monkeypatch):
+    monkeypatch.setattr(app_module, 'BULK_OPERATION_QUEUE_SIZE', 0)
+
+    response = client.post('/bulk-operation', json={'operation': 'clean-results', 'project_ids': [project_id]})
+
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
+
+
+def test_unknown_bulk_operation(client):
+    assert client.get('/bulk-operation/unknown').status_code == 404
+
+
+class ClientSession(object):
+    # Requests of other nodes sent to the test client
+    class Response(object):
+        def __init__(self, response):
+            self.status_code = response.status_code
+            self.body = response.get_json()
+
+        def json(self):
+            return self.body
+
+    def __init__(self, client):
+        self.client = client
+
+    def post(self, url, headers=None, json=None, timeout=None):
+        return self.Response(self.client.post(urlparse(url).path, headers=headers, json=json))
+
+    def get(self, url, headers=None, timeout=None):
+        return self.Response(self.client.get(urlparse(url).path, headers=headers))
+
+
+def test_projects_of_other_nodes_are_processed_as_bulk_operations(app_module, client, project_id, generations, monkeypatch):
+    monkeypatch.setattr(app_module, 'CLUSTER_SESSION', ClientSession(client))
+    monkeypatch.setattr(app_module, 'BULK_OPERATION_POLL_SECONDS', 0.01)
+    monkeypatch.setattr(app_module, 'get_project_node', lambda other_project_id: 'http://other-node')
+
+    result = app_module.execute_bulk_operation('clean-results', project_id, None, None, None)
+
+    assert result == {'status_code': 200, 'message': "Results successfully cleaned for project_id '{}'".format(project_id)}
@@ -0,0 +1,168 @@
+import gzip, os, sys, zlib
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'allure-docker-api-usage'))
+
+import allure_docker_client
+from allure_docker_client import AllureDockerClient, AllureDockerClientError
+
+SERVER_URL = 'http://allure-docker-service'
+
+
+class FlaskResponse(object):
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.headers = response.headers
+        self.text = response.get_data(as_text=True)
+        self.response = response
+
+    def json(self):
+        return self.response.get_json()
+
+
+class FlaskSession(object):
+    """Sends the requests of the client to the test client, failing the first ones with the given status codes"""
+    def __init__(self, client, failures=None):
+        self.client = client
+        self.failures = list(failures or [])
+        self.requests = []
+
+    def request(self, method, url, timeout=None, params=None, json=None, data=None, headers=None):
+        self.requests.append({'method': method, 'url': url, 'data': data, 'headers': headers})
+        if self.failures:
+            return FailedResponse(self.failures.pop(0))
+        response = self.client.open(url[len(SERVER_URL):], method=method, query_string=params, json=json, data=data, headers=headers)
+        return FlaskResponse(response)
+
+    def close(self):
+        pass
+
+
+class FailedResponse(object):
+    def __init__(self, status_code):
+        self.status_code = status_code
+        self.headers = {}
+        self.text = 'busy'
+
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(allure_docker_client.time, 'sleep', sleeps.append)
+    return sleeps
+
+
+def get_client(client, failures=None, **kwargs):
+    docker_client = AllureDockerClient(SERVER_URL, **kwargs)
+    docker_client.session = FlaskSession(client, failures)
+    return docker_client
+
+
+def write_results(directory, files):
+    for file_name, content in files.items():
+        with open(str(directory / file_name), 'wb') as f:
+            f.write(content)
+
+
+def test_make_batches_is_bounded_by_size_and_files():
+    results = [{'file_name': str(index), 'size': size} for index, size in enumerate([4, 4, 4, 10, 1, 1, 1])]
+    docker_client = AllureDockerClient(SERVER_URL)
+
+    batches = docker_client.make_batches(results, batch_size_bytes=8, batch_files=2)
+
+    assert [[result['file_name'] for result in batch] for batch in batches] == [['0', '1'], ['2'], ['3'], ['4', '5'], ['6']]
+
+
+@pytest.mark.parametrize('mode', ['json', 'multipart'])
+def test_send_results_in_compressed_batches(app_module, client, project_id, tmp_path, mode):
+    files = {'{}-result.json'.format(index): '{{"index": {}}}'.format(index).encode('utf-8') for index in range(5)}
+    write_results(tmp_path, dict(files, **{'empty-attachment.txt': b''}))
+    docker_client = get_client(client)
+
+    summary = docker_client.send_results(project_id, str(tmp_path), mode=mode, batch_files=2)
+
+    assert summary['batches_count'] == 3
+    assert summary['sent_files_count'] == 5
+    assert summary['empty_files'] == [str(tmp_path / 'empty-attachment.txt')]
+    uploads = [sent for sent in docker_client.session.requests if sent['url'].endswith('/send-results')]
+    assert all(sent['headers']['Content-Encoding'] == 'gzip' for sent in uploads)
+    results_directory = '{}/results'.format(app_module.get_project_path(project_id))
+    for file_name, content in files.items():
+        with open(os.path.join(results_directory, file_name), 'rb') as f:
+            assert f.read() == content
+
+
+def test_send_results_only_uploads_missing_files(client, project_id, tmp_path):
+    write_results(tmp_path, {'a-result.json': b'{"a": 1}'})
+    get_client(client).send_results(project_id, str(tmp_path))
+    write_results(tmp_path, {'b-result.json': b'{"b": 1}'})
+
+    summary = get_client(client).send_results(project_id, str(tmp_path))
+
+    assert summary['skipped_files_count'] == 1
+    assert summary['sent_files_count'] == 1
+
+
+def test_request_is_retried_with_backoff(client, project_id, sleeps):
+    docker_client = get_client(client, failures=[503, 429], backoff_seconds=1)
+
+    response = docker_client.request('GET', '/projects/{}'.format(project_id))
+
+    assert response['meta_data']['message']
+    assert len(docker_client.session.requests) == 3
+    assert sleeps == [1, 2]
+
+
+def test_request_fails_once_the_retries_are_exhausted(client, project_id, sleeps):
+    docker_client = get_client(client, failures=[503, 503, 503], retries=2)
+
+    with pytest.raises(AllureDockerClientError) as ex:
+        docker_client.request('GET', '/projects/{}'.format(project_id))
+
+    assert ex.value.status_code == 503
+    assert len(sleeps) == 2
+
+
+def test_failed_batches_are_reported(client, project_id, tmp_path, sleeps):
+    write_results(tmp_path, {'a-result.json': b'{"a": 1}', 'b-result.json': b'{"b": 1}'})
+    docker_client = get_client(client, failures=[400])
+
+    with pytest.raises(AllureDockerClientError) as ex:
+        docker_client.send_results(project_id, str(tmp_path), dedup=False, batch_files=1)
+
+    summary = ex.value.response_body
+    assert summary['sent_files_count'] == 1
+    assert len(summary['failed_batches']) == 1
+
+
+@pytest.mark.parametrize('content_encoding,compress', [
+    ('gzip', gzip.compress),
+    ('deflate', zlib.compress)
+])
+def test_server_decodes_compressed_bodies(app_module, client, project_id, content_encoding, compress):
+    body = b'{"results": [{"file_name": "a-result.json", "content_base64": "e30="}]}'
+
+    response = client.post('/send-results?project_id={}'.format(project_id), data=compress(body),
+                           headers={'Content-Type': 'application/json', 'Content-Encoding': content_encoding})
+
+    assert response.status_code == 200, response.get_json()
+    assert os.path.isfile(os.path.join('{}/results'.format(app_module.get_project_path(project_id)), 'a-result.json'))
+
+
+def test_server_rejects_invalid_compressed_bodies(client, project_id):
+    response = client.post('/send-results?project_id={}'.format(project_id), data=b'not gzip',
+                           headers={'Content-Type': 'application/json', 'Content-Encoding': 'gzip'})
+
+    assert response.status_code == 400
+
+
+def test_server_rejects_bodies_beyond_the_decompression_ratio(app_module, client, project_id, monkeypatch):
+    monkeypatch.setattr(app_module, 'DECOMPRESSED_BODY_MEMORY_BYTES', 1024)
+    body = b'{"results": [{"file_name": "a-result.json", "content_base64": "' + b'A' * 1024 * 1024 + b'"}]}'
+
+    response = client.post('/send-results?project_id={}'.format(project_id), data=gzip.compress(body),
+                           headers={'Content-Type': 'application/json', 'Content-Encoding': 'gzip'})
+
+    assert response.status_code == 413
+    assert 'ratio' in response.get_json()['meta_data']['message']
@@ -0,0 +1,129 @@
+import os, socket, subprocess, sys, time
+
+import pytest
+import requests
+
+from conftest import API_DIRECTORY, send_results
+
+SECRET = 'my-cluster-secret'
+
+
+def get_free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for(condition, timeout_seconds=20):
+    deadline = time.time() + timeout_seconds
+    while time.time() < deadline:
+        if condition():
+            return True
+        time.sleep(0.2)
+    return False
+
+
+def is_up(url):
+    try:
+        requests.get('{}/allure-docker-service/cluster'.format(url), timeout=1)
+    except requests.ConnectionError:
+        return False
+    return True
+
+
+@pytest.fixture
+def nodes(tmp_path):
+    urls = ['http://127.0.0.1:{}'.format(get_free_port()) for _ in range(2)]
+    processes = []
+    for index, url in enumerate(urls):
+        projects_directory = tmp_path / 'node{}'.format(index)
+        os.makedirs(str(projects_directory / 'default' / 'reports' / 'latest'))
+        os.makedirs(str(projects_directory / 'default' / 'results'))
+        env = dict(os.environ)
+        env.update({
+            'PORT': url.rsplit(':', 1)[1],
+            'STATIC_CONTENT_PROJECTS': str(projects_directory),
+            # The first node starts alone, the second one with the complete list of nodes
+            'CLUSTER_NODES': ','.join(urls[:index + 1]),
+            'CLUSTER_NODE_URL': url,
+            'CLUSTER_ALLOWED_NODES': 'http://127.0.0.1:*',
+            'CLUSTER_ADMIN_ALLOWLIST': '192.0.2.1',
+            'CLUSTER_SECRET': SECRET,
+            'CHECK_RESULTS_EVERY_SECONDS': 'NONE'
+        })
+        processes.append(subprocess.Popen([sys.executable, os.path.join(API_DIRECTORY, 'app.py')], env=env,
+                                          stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL))
+    try:
+        for url in urls:
+            assert wait_for(lambda: is_up(url))
+        yield urls
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait(10)
+
+
+def get_cluster(url):
+    return requests.get('{}/allure-docker-service/cluster'.format(url)).json()['data']
+
+
+def test_add_node_moves_the_projects(nodes):
+    node1, node2 = nodes
+    project_ids = ['project-{}'.format(index) for index in range(12)]
+    for project_id in project_ids:
+        response = requests.post('{}/allure-docker-service/projects'.format(node1), json={'id': project_id})
+        assert response.status_code == 201
+    add_node_url = '{}/allure-docker-service/cluster/nodes'.format(node1)
+
+    assert requests.post(add_node_url, json={'url': node2}).status_code == 403
+    response = requests.post(add_node_url, json={'url': 'http://198.51.100.1:5050'}, headers={'X-Allure-Cluster-Secret': SECRET})
+    assert response.status_code == 403
+    response = requests.post(add_node_url, json={'url': node2}, headers={'X-Allure-Cluster-Secret': SECRET})
+    assert response.status_code == 200
+
+    assert wait_for(lambda: get_cluster(node1)['last_rebalance'] is not None)
+    moved_projects = get_cluster(node1)['last_rebalance']['moved_projects']
+    assert moved_projects
+    assert sorted(get_cluster(node1)['projects'] + get_cluster(node2)['projects']) == sorted(project_ids + ['default', 'default'])
+
+    # Any node answers for the moved projects, the dashboard of the owner includes them
+    response = requests.get('{}/allure-docker-service/projects/{}'.format(node1, moved_projects[0]))
+    assert response.status_code == 200
+    dashboard = requests.get('{}/allure-docker-service/dashboard'.format(node2)).json()['data']
+    assert moved_projects[0] in [project['project_id'] for project in dashboard['projects']]
+    dashboard = requests.get('{}/allure-docker-service/dashboard'.format(node1)).json()['data']
+    assert moved_projects[0] not in [project['project_id'] for project in dashboard['projects']]
+
+
+def test_hash_ring_gets_the_same_node_for_a_key(app_module):
+    ring = app_module.HashRing(['http://node1', 'http://node2'], 10)
+    node = ring.get_node('my-project')
+    assert node in ['http://node1', 'http://node2']
+
+    ring.add_node('http://node3')
+    keys, key_nodes = ring.ring
+    assert len(keys) == len(key_nodes) == 30
+    assert ring.get_node('my-project') in [node, 'http://node3']
+
+
+def test_rebalance_rejects_results_while_the_project_is_moved(app_module, project_id, monkeypatch):
+    client = app_module.app.test_client()
+    send_results(client, project_id, {'a-result.json': b'{}'})
+    transfers = []
+
+    def transfer_project(moved_project_id, node, project_path=None):
+        with pytest.raises(app_module.AdmissionError):
+            app_module.INGEST_ADMISSION.acquire(moved_project_id)
+        transfers.append((node, sorted(os.listdir('{}/results'.format(project_path)))))
+
+    monkeypatch.setattr(app_module, 'get_project_node',
+        lambda other_project_id: 'http://other-node' if other_project_id == project_id else app_module.CLUSTER_NODE_URL)
+    monkeypatch.setattr(app_module, 'transfer_project', transfer_project)
+
+    app_module.rebalance_cluster_projects()
+
+    assert transfers == [('http://other-node', ['a-result.json'])]
+    assert app_module.CLUSTER_STATUS['last_rebalance']['moved_projects'] == [project_id]
+    assert app_module.is_existent_project(project_id) is False
+    app_module.INGEST_ADMISSION.acquire(project_id)
+    app_module.INGEST_ADMISSION.release(project_id)
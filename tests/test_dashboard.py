@@ -0,0 +1,62 @@
+from threading import Event, Thread
+import json
+
+from dashboard import Dashboard
+
+
+def get_project_ids(dashboard):
+    return [project['project_id'] for project in json.loads(dashboard.get()[1])['data']['projects']]
+
+
+def test_slow_load_doesnt_overwrite_newer_updates():
+    entries = {'project-a': {'project_id': 'project-a', 'status': 'failed', 'statistic': dict.fromkeys(['passed', 'failed', 'broken', 'skipped', 'unknown', 'total'], 0)}}
+    reading = Event()
+    resume = Event()
+
+    def loader(project_id):
+        entry = dict(entries[project_id])
+        if project_id == 'project-a' and not reading.is_set():
+            # The load reads the entry, then it's updated before the load finishes
+            reading.set()
+            resume.wait(5)
+        return entry
+
+    dashboard = Dashboard(loader)
+    load = Thread(target=dashboard.load, args=(['project-a'],))
+    load.start()
+    reading.wait(5)
+    entries['project-a'] = dict(entries['project-a'], status='passed')
+    dashboard.update('project-a')
+    resume.set()
+    load.join(5)
+
+    assert dashboard.projects['project-a']['status'] == 'passed'
+
+
+def test_load_keeps_projects_removed_or_created_meanwhile():
+    statistic = dict.fromkeys(['passed', 'failed', 'broken', 'skipped', 'unknown', 'total'], 0)
+    existent = {'project-a', 'project-b'}
+
+    def loader(project_id):
+        if project_id == 'project-a' and 'project-c' not in existent:
+            # Changes while the dashboard is loaded
+            existent.discard('project-b')
+            existent.add('project-c')
+            dashboard.remove('project-b')
+            dashboard.update('project-c')
+        if project_id not in existent:
+            return None
+        return {'project_id': project_id, 'status': 'empty', 'statistic': statistic}
+
+    dashboard = Dashboard(loader)
+    dashboard.load(['project-a', 'project-b'])
+
+    assert get_project_ids(dashboard) == ['project-a', 'project-c']
+
+
+def test_dashboard_is_not_loaded_in_the_request(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module, 'DASHBOARD', Dashboard(app_module.load_dashboard_entry))
+
+    response = client.get('/dashboard')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '1'
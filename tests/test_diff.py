@@ -0,0 +1,97 @@
+import json, os
+
+from diff import build_tests_summary, diff_tests_summaries
+
+
+def write_build(app_module, project_id, build, tests):
+    report_path = '{}/reports/{}'.format(app_module.get_project_path(project_id), build)
+    os.makedirs(report_path, exist_ok=True)
+    with open('{}/index.html'.format(report_path), 'w') as f:
+        f.write('<html></html>')
+    with open('{}/tests-summary.json'.format(report_path), 'w') as f:
+        json.dump(tests, f)
+
+
+def get_history_ids(diff, category):
+    return [entry['history_id'] for entry in diff[category]]
+
+
+def test_diff_classifies_the_tests():
+    base = {
+        'passed': ['passed', 'passed', 100],
+        'broken': ['broken', 'passed', 100],
+        'fixed': ['fixed', 'failed', 100],
+        'removed': ['removed', 'passed', 100],
+        'slower': ['slower', 'passed', 100],
+        'a bit slower': ['a bit slower', 'passed', 1000]
+    }
+    head = {
+        'passed': ['passed', 'passed', 100],
+        'broken': ['broken', 'broken', 100],
+        'fixed': ['fixed', 'passed', 100],
+        'added': ['added', 'failed', 100],
+        'slower': ['slower', 'passed', 300],
+        'a bit slower': ['a bit slower', 'passed', 1500]
+    }
+
+    diff = diff_tests_summaries(base, head, 2.0)
+
+    assert get_history_ids(diff, 'newly_failed') == ['broken']
+    assert get_history_ids(diff, 'fixed') == ['fixed']
+    assert get_history_ids(diff, 'added') == ['added']
+    assert get_history_ids(diff, 'removed') == ['removed']
+    assert get_history_ids(diff, 'slower') == ['slower']
+    assert diff['counts'] == {'newly_failed': 1, 'fixed': 1, 'added': 1, 'removed': 1, 'slower': 1,
+                              'base_tests': 6, 'head_tests': 6}
+    assert diff['newly_failed'][0] == {'history_id': 'broken', 'name': 'broken', 'base_status': 'passed',
+                                       'base_duration': 100, 'head_status': 'broken', 'head_duration': 100}
+
+
+def test_tests_summary_skips_hidden_tests(tmp_path):
+    test_cases = [
+        {'historyId': 'a', 'fullName': 'test a', 'status': 'passed', 'time': {'duration': 10}},
+        {'historyId': 'b', 'name': 'test b', 'status': 'failed', 'hidden': True},
+        {'name': 'without history', 'status': 'passed'}
+    ]
+    for index, test_case in enumerate(test_cases):
+        with open(str(tmp_path / '{}.json'.format(index)), 'w') as f:
+            json.dump(test_case, f)
+
+    assert build_tests_summary(str(tmp_path)) == {'a': ['test a', 'passed', 10]}
+
+
+def test_diff_endpoint_uses_the_cache_without_listing_the_reports(app_module, client, project_id, monkeypatch):
+    write_build(app_module, project_id, 1, {'a': ['test a', 'passed', 10]})
+    write_build(app_module, project_id, 2, {'a': ['test a', 'failed', 10], 'b': ['test b', 'passed', 10]})
+    url = '/projects/{}/diff?base=1&head=2'.format(project_id)
+
+    response = client.get(url)
+    assert response.status_code == 200
+    data = response.get_json()['data']
+    assert (data['base'], data['head']) == ('1', '2')
+    assert get_history_ids(data, 'newly_failed') == ['a']
+    assert get_history_ids(data, 'added') == ['b']
+
+    def list_reports(project_id):
+        raise AssertionError('reports listed')
+    monkeypatch.setattr(app_module.STORAGE, 'list_reports', list_reports)
+    assert client.get(url).get_json()['data'] == data
+
+
+def test_diff_endpoint_compares_with_the_previous_build(app_module, client, project_id):
+    write_build(app_module, project_id, 1, {'a': ['test a', 'failed', 10]})
+    write_build(app_module, project_id, 2, {'a': ['test a', 'passed', 10]})
+
+    data = client.get('/projects/{}/diff?head=2'.format(project_id)).get_json()['data']
+
+    assert data['base'] == '1'
+    assert get_history_ids(data, 'fixed') == ['a']
+
+
+def test_diff_endpoint_rejects_unknown_builds(app_module, client, project_id):
+    write_build(app_module, project_id, 1, {})
+    os.makedirs('{}/reports/2'.format(app_module.get_project_path(project_id)))
+
+    assert client.get('/projects/{}/diff?base=1&head=3'.format(project_id)).status_code == 404
+    # Builds without report
+    assert client.get('/projects/{}/diff?base=1&head=2'.format(project_id)).status_code == 404
@@ -0,0 +1,61 @@
+import threading
+
+from events import EventBus
+
+
+def test_subscribe_never_exceeds_max_subscriptions():
+    bus = EventBus()
+    barrier = threading.Barrier(20)
+    subscriptions = []
+
+    def subscribe():
+        barrier.wait()
+        subscriptions.append(bus.subscribe(kind='client', max_subscriptions=3))
+
+    threads = [threading.Thread(target=subscribe) for _ in range(20)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len([subscription for subscription in subscriptions if subscription is not None]) == 3
+    assert bus.get_subscriptions_count() == 3
+
+
+def test_replicas_dont_use_client_subscriptions():
+    bus = EventBus()
+    assert bus.subscribe(kind='replica', max_subscriptions=1) is not None
+    assert bus.subscribe(kind='replica', max_subscriptions=1) is None
+    client = bus.subscribe(kind='client', max_subscriptions=1)
+    assert client is not None
+    assert bus.subscribe(kind='client', max_subscriptions=1) is None
+
+    bus.unsubscribe(client)
+    assert bus.subscribe(kind='client', max_subscriptions=1) is not None
+    assert bus.get_subscriptions_count('replica') == 1
+
+
+def test_stream_events_rejects_clients_over_the_limit(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module, 'EVENTS_MAX_CLIENTS', 0)
+    assert client.get('/allure-docker-service/events').status_code == 503
+
+
+def test_default_limits_keep_most_threads_free(app_module):
+    assert app_module.EVENTS_MAX_CLIENTS + app_module.EVENTS_MAX_REPLICAS <= app_module.THREADS // 2
+
+
+def test_replicas_are_authenticated_with_the_secret(app_module, client, monkeypatch):
+    monkeypatch.setattr(app_module, 'EVENTS_MAX_CLIENTS', 0)
+    monkeypatch.setattr(app_module, 'EVENTS_MAX_REPLICAS', 1)
+    monkeypatch.setattr(app_module, 'REPLICA_SECRET', 'my-replica-secret')
+
+    assert client.get('/allure-docker-service/events', headers={'X-Allure-Replica': '1'}).status_code == 503
+
+    response = client.get('/allure-docker-service/events', headers={'X-Allure-Replica': 'my-replica-secret'}, buffered=False)
+    try:
+        assert response.status_code == 200
+        assert app_module.EVENT_BUS.get_subscriptions_count('replica') == 1
+        next(response.response)
+    finally:
+        response.close()
+    assert app_module.EVENT_BUS.get_subscriptions_count('replica') == 0
@@ -0,0 +1,160 @@
+import hashlib, os, threading
+
+import pytest
+
+import pipeline
+from conftest import send_results
+
+
+def check_objects(app_module, project_id):
+    objects_path = app_module.get_objects_path(project_id)
+    for name in os.listdir(objects_path):
+        with open('{}/{}'.format(objects_path, name), 'rb') as f:
+            assert hashlib.sha256(f.read()).hexdigest() == name
+
+
+def test_executor_does_not_rewrite_linked_results(app_module, client, project_id):
+    content = b'{"name": "client executor"}'
+    send_results(client, project_id, {'executor.json': content, 'a-attachment.json': content})
+    results_path = '{}/results'.format(app_module.get_project_path(project_id))
+
+    job = pipeline.GenerationJob(project_id, app_module.get_project_path(project_id))
+    pipeline.ExecutorStage('executor.json').run(job)
+
+    check_objects(app_module, project_id)
+    with open('{}/a-attachment.json'.format(results_path), 'rb') as f:
+        assert f.read() == content
+    with open('{}/executor.json'.format(results_path), 'rb') as f:
+        assert b'"buildOrder": "1"' in f.read()
+
+
+def test_clean_history_does_not_rewrite_linked_results(app_module, client, project_id):
+    content = b'{"name": "client executor"}'
+    send_results(client, project_id, {'executor.json': content, 'a-attachment.json': content})
+
+    pipeline.clean_history(app_module.get_project_path(project_id), 'executor.json')
+
+    check_objects(app_module, project_id)
+    results_path = '{}/results'.format(app_module.get_project_path(project_id))
+    with open('{}/a-attachment.json'.format(results_path), 'rb') as f:
+        assert f.read() == content
+    assert os.path.getsize('{}/executor.json'.format(results_path)) == 0
+
+
+def test_keep_history_does_not_rewrite_linked_results(app_module, client, project_id):
+    content = b'[]'
+    send_results(client, project_id, {'a-attachment.json': content})
+    project_path = app_module.get_project_path(project_id)
+    os.makedirs('{}/results/history'.format(project_path))
+    os.link('{}/results/a-attachment.json'.format(project_path), '{}/results/history/history-trend.json'.format(project_path))
+    os.makedirs('{}/reports/latest/history'.format(project_path))
+    with open('{}/reports/latest/history/history-trend.json'.format(project_path), 'w') as f:
+        f.write('[{"buildOrder": 1}]')
+
+    pipeline.KeepHistoryStage(True).run(pipeline.GenerationJob(project_id, project_path))
+
+    check_objects(app_module, project_id)
+    with open('{}/results/a-attachment.json'.format(project_path), 'rb') as f:
+        assert f.read() == content
+
+
+class RecordingStage(object):
+    def __init__(self, name, calls, error=None):
+        self.name = name
+        self.calls = calls
+        self.error = error
+
+    def run(self, job):
+        self.calls.append(self.name)
+        if self.error is not None:
+            raise self.error
+
+
+def test_hooks_run_in_registration_order():
+    calls = []
+    hooks = pipeline.HookRegistry()
+    hooks.register('first', lambda job: calls.append('first'))
+    hooks.register('second', lambda job: calls.append('second'))
+    job = pipeline.GenerationJob('project', '/tmp/project')
+
+    hooks.run(job)
+
+    assert calls == ['first', 'second']
+    assert [(entry['hook'], entry['status']) for entry in job.hooks] == [('first', 'finished'), ('second', 'finished')]
+    assert all('duration_ms' in entry for entry in job.hooks)
+
+
+def test_failed_hook_does_not_stop_the_next_hooks():
+    calls = []
+
+    def fail(job):
+        raise Exception('hook error')
+
+    hooks = pipeline.HookRegistry()
+    hooks.register('failing', fail)
+    hooks.register('next', lambda job: calls.append(job.project_id))
+    job = pipeline.GenerationJob('project', '/tmp/project')
+
+    hooks.run(job)
+
+    assert calls == ['project']
+    assert job.hooks[0]['status'] == 'failed'
+    assert job.hooks[0]['error'] == 'hook error'
+    assert job.hooks[1]['status'] == 'finished'
+
+
+def test_asynchronous_hooks_do_not_block_the_next_hooks():
+    released = threading.Event()
+    calls = []
+
+    def slow(job):
+        released.wait(5)
+        calls.append('slow')
+
+    hooks = pipeline.HookRegistry()
+    hooks.register('slow', slow, asynchronous=True)
+    hooks.register('fast', lambda job: calls.append('fast'))
+    job = pipeline.GenerationJob('project', '/tmp/project')
+
+    hooks.run(job)
+    assert calls == ['fast']
+    released.set()
+    hooks.executor.shutdown(wait=True)
+
+    assert calls == ['fast', 'slow']
+    assert job.hooks[0]['asynchronous'] is True
+    assert job.hooks[0]['status'] == 'finished'
+
+
+def test_hooks_run_once_every_stage_is_finished():
+    calls = []
+    hooks = pipeline.HookRegistry()
+    hooks.register('hook', lambda job: calls.append('hook:{}'.format(job.status)))
+    stages = [RecordingStage('keep-history', calls), RecordingStage('generate', calls)]
+
+    job = pipeline.GenerationPipeline(stages, hooks=hooks).run(pipeline.GenerationJob('project', '/tmp/project'))
+
+    assert calls == ['keep-history', 'generate', 'hook:finished']
+    assert [stage['stage'] for stage in job.stages] == ['keep-history', 'generate']
+
+
+def test_hooks_do_not_run_when_a_stage_fails():
+    calls = []
+    hooks = pipeline.HookRegistry()
+    hooks.register('hook', lambda job: calls.append('hook'))
+    stages = [RecordingStage('generate', calls, Exception('generate error')), RecordingStage('store', calls)]
+    job = pipeline.GenerationJob('project', '/tmp/project')
+
+    with pytest.raises(Exception):
+        pipeline.GenerationPipeline(stages, hooks=hooks).run(job)
+
+    assert calls == ['generate']
+    assert job.status == 'failed'
+    assert job.hooks == []
+    assert job.stages[0]['error'] == 'generate error'
+
+
+def test_post_generation_hooks_order(app_module):
+    # The emailable report reads the latest report, it's rendered while the project is still locked
+    assert [hook['name'] for hook in app_module.POST_GENERATION_HOOKS.hooks] == ['emailable-report', 'dashboard', 'tests-summary']
+    assert not any(hook['asynchronous'] for hook in app_module.POST_GENERATION_HOOKS.hooks)
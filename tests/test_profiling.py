@@ -0,0 +1,139 @@
+import time
+
+import pytest
+from werkzeug.test import Client
+from werkzeug.wrappers import BaseResponse
+
+from profiling import ProfileStore, ProfilingMiddleware, PROFILE_ID_HEADER, parse_allowlist
+
+BODY = [b'{"data": ', b'"created"}']
+
+
+def created_app(environ, start_response):
+    start_response('201 CREATED', [('Content-Type', 'application/json')])
+    return BODY
+
+
+def slow_app(environ, start_response):
+    time.sleep(0.2)
+    return created_app(environ, start_response)
+
+
+def failing_app(environ, start_response):
+    raise Exception('application error')
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ProfileStore(str(tmp_path / 'profiles'))
+
+
+def get_client(wsgi_app, store, slow_request_seconds=0, excluded_paths=None):
+    middleware = ProfilingMiddleware(wsgi_app, store, parse_allowlist('127.0.0.1,::1'), slow_request_seconds, 0.005, excluded_paths)
+    return Client(middleware, BaseResponse), middleware
+
+
+def test_disabled_middleware_returns_the_application_response(store):
+    middleware = ProfilingMiddleware(created_app, store, parse_allowlist('127.0.0.1'))
+
+    app_iter = middleware({'PATH_INFO': '/projects', 'REMOTE_ADDR': '127.0.0.1'}, lambda status, headers, exc_info=None: None)
+
+    assert app_iter is BODY
+    assert middleware.sampler is None
+    assert store.list() == []
+
+
+@pytest.mark.parametrize('query_string,headers', [
+    ('profile=1', {}),
+    ('', {'X-Allure-Profile': 'true'})
+])
+def test_profiled_request_keeps_the_response(store, query_string, headers):
+    client, _ = get_client(created_app, store)
+
+    response = client.get('/projects', query_string=query_string, headers=headers, environ_base={'REMOTE_ADDR': '127.0.0.1'},
+                          buffered=True)
+
+    assert response.status_code == 201
+    assert response.get_data() == b''.join(BODY)
+    assert response.headers['Content-Type'] == 'application/json'
+    profile = store.get(response.headers[PROFILE_ID_HEADER])
+    assert profile['kind'] == 'request'
+    assert profile['path'] == '/projects'
+    assert profile['formats'] == ['prof', 'txt']
+
+
+@pytest.mark.parametrize('query_string,headers,remote_addr,excluded_paths', [
+    ('', {}, '127.0.0.1', None),
+    ('profile=false', {}, '127.0.0.1', None),
+    ('', {'X-Allure-Profile': '0'}, '127.0.0.1', None),
+    ('profile=1', {}, '10.0.0.1', None),
+    ('profile=1', {}, '127.0.0.1', ['/projects'])
+])
+def test_request_is_not_profiled(store, query_string, headers, remote_addr, excluded_paths):
+    client, _ = get_client(created_app, store, excluded_paths=excluded_paths)
+
+    response = client.get('/projects', query_string=query_string, headers=headers, environ_base={'REMOTE_ADDR': remote_addr},
+                          buffered=True)
+
+    assert response.status_code == 201
+    assert response.get_data() == b''.join(BODY)
+    assert PROFILE_ID_HEADER not in response.headers
+    assert store.list() == []
+
+
+def test_failed_request_releases_the_profiler(store):
+    client, middleware = get_client(failing_app, store)
+
+    with pytest.raises(Exception, match='application error'):
+        client.get('/projects?profile=1', environ_base={'REMOTE_ADDR': '127.0.0.1'}, buffered=True)
+
+    assert middleware.profiler_lock.acquire(blocking=False) is True
+    middleware.profiler_lock.release()
+
+
+def test_slow_requests_are_sampled(store):
+    client, _ = get_client(slow_app, store, slow_request_seconds=0.1)
+
+    response = client.get('/projects', buffered=True)
+
+    assert response.status_code == 201
+    assert response.get_data() == b''.join(BODY)
+    assert PROFILE_ID_HEADER not in response.headers
+    profiles = store.list()
+    assert [profile['kind'] for profile in profiles] == ['slow-request']
+    assert profiles[0]['duration_ms'] >= 100
+    with open(store.get_path(profiles[0]['id'], 'folded')) as f:
+        assert 'test_profiling.py:slow_app:' in f.read()
+
+
+def test_fast_requests_are_not_stored(store):
+    client, middleware = get_client(created_app, store, slow_request_seconds=10)
+
+    response = client.get('/projects', buffered=True)
+
+    assert response.get_data() == b''.join(BODY)
+    assert store.list() == []
+    assert middleware.sampler.samples == {}
+
+
+def test_store_keeps_the_latest_profiles(tmp_path):
+    store = ProfileStore(str(tmp_path / 'profiles'), max_profiles=2)
+
+    profile_ids = []
+    for index in range(3):
+        profile_ids.append(store.save('request', {'PATH_INFO': '/{}'.format(index)}, 0, {'txt': b'stats'}))
+        time.sleep(0.002)
+
+    assert [profile['id'] for profile in store.list()] == [profile_ids[2], profile_ids[1]]
+    assert store.get(profile_ids[0]) is None
+
+
+def test_api_is_profiled_on_request(app_module, client, project_id):
+    response = client.get('/projects/{}'.format(project_id))
+    profiled_response = client.get('/projects/{}?profile=1'.format(project_id), buffered=True)
+
+    assert PROFILE_ID_HEADER not in response.headers
+    assert profiled_response.status_code == response.status_code == 200
+    assert profiled_response.get_json() == response.get_json()
+    profile_id = profiled_response.headers[PROFILE_ID_HEADER]
+    assert profile_id in [profile['id'] for profile in client.get('/profiles').get_json()['data']['profiles']]
@@ -0,0 +1,144 @@
+import os
+
+import pytest
+import requests
+
+import replica
+from replica import ReplicaListener, parse_sse
+
+
+class StopListening(Exception):
+    pass
+
+
+class FakeResponse(object):
+    def __init__(self, lines):
+        self.lines = lines
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_lines(self, decode_unicode=False):
+        return iter(self.lines)
+
+
+class FakeSession(object):
+    """Answers every GET with the next response, exceptions are raised"""
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, stream=False, timeout=None):
+        self.requests.append(dict(headers))
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+
+def get_listener(responses, **kwargs):
+    events = []
+    resets = []
+    listener = ReplicaListener('http://writer:5050/', events.append, lambda: resets.append(True), **kwargs)
+    listener.session = FakeSession(responses)
+    return listener, events, resets
+
+
+def test_parse_sse():
+    lines = [
+        ': keep-alive', '',
+        'id: 1', 'event: report-generated', 'data: {"a":', 'data: 1}', '',
+        'id:2', 'data:{}', '',
+        'event: events-dropped', 'data: {"count": 3}', '',
+        'data: incomplete'
+    ]
+
+    events = list(parse_sse(lines))
+
+    assert events == [
+        ('1', 'report-generated', '{"a":\n1}'),
+        ('2', None, '{}'),
+        (None, 'events-dropped', '{"count": 3}')
+    ]
+
+
+def test_listener_resets_when_events_are_dropped():
+    lines = [
+        'id: 1', 'event: project-created', 'data: {"project_id": "a"}', '',
+        'event: events-dropped', 'data: {"count": 1}', '',
+        'id: 3', 'event: project-deleted', 'data: {"project_id": "b"}', ''
+    ]
+    listener, events, resets = get_listener([FakeResponse(lines)])
+
+    listener.listen()
+
+    assert events == [{'project_id': 'a'}, {'project_id': 'b'}]
+    # Once when connected and once when events were dropped
+    assert len(resets) == 2
+    assert listener.last_event_id == '3'
+    assert listener.session.requests[0]['Accept'] == 'text/event-stream'
+    assert replica.REPLICA_HEADER not in listener.session.requests[0]
+
+
+def test_listener_reconnects_with_the_last_event_id(monkeypatch):
+    sleeps = []
+
+    def sleep(seconds):
+        sleeps.append(seconds)
+        if len(sleeps) == 3:
+            raise StopListening()
+
+    monkeypatch.setattr(replica.time, 'sleep', sleep)
+    listener, events, resets = get_listener([
+        FakeResponse(['id: 7', 'data: {"project_id": "a"}', '']),
+        requests.exceptions.ConnectionError('connection refused'),
+        FakeResponse([])
+    ], reconnect_seconds=2, secret='my-replica-secret')
+
+    with pytest.raises(StopListening):
+        listener.run()
+
+    assert sleeps == [2, 2, 2]
+    assert events == [{'project_id': 'a'}]
+    # Every connection invalidates the caches, events could be missed while disconnected
+    assert len(resets) == 2
+    assert listener.connected is False
+    assert 'Last-Event-ID' not in listener.session.requests[0]
+    assert [headers['Last-Event-ID'] for headers in listener.session.requests[1:]] == ['7', '7']
+    assert all(headers[replica.REPLICA_HEADER] == 'my-replica-secret' for headers in listener.session.requests)
+
+
+def test_replica_rejects_write_requests(app_module, client, project_id, monkeypatch):
+    monkeypatch.setattr(app_module, 'SERVER_MODE', 'replica')
+
+    response = client.post('/send-results?project_id={}'.format(project_id), json={'results': []})
+    assert response.status_code == 403
+    assert 'read-only replica' in response.get_json()['meta_data']['message']
+    assert client.delete('/projects/{}'.format(project_id)).status_code == 403
+
+    assert client.get('/projects/{}'.format(project_id)).status_code == 200
+
+
+def test_replica_stages_snapshots_out_of_the_projects_directory(app_module, client, project_id, monkeypatch):
+    with open('{}/results/a-result.json'.format(app_module.get_project_path(project_id)), 'w') as f:
+        f.write('{}')
+    monkeypatch.setattr(app_module, 'SERVER_MODE', 'replica')
+
+    staging_path = app_module.stage_project(project_id)
+    try:
+        assert os.path.dirname(staging_path) != app_module.PROJECTS_DIRECTORY
+        assert os.path.isfile('{}/{}/results/a-result.json'.format(staging_path, project_id))
+        assert not [name for name in os.listdir(app_module.PROJECTS_DIRECTORY) if name.startswith('.snapshot-')]
+    finally:
+        app_module.shutil.rmtree(staging_path, ignore_errors=True)
+
+    response = client.get('/projects/{}/snapshot'.format(project_id))
+    assert response.status_code == 200
+    response.get_data()
+    assert not [name for name in os.listdir(app_module.PROJECTS_DIRECTORY) if name.startswith('.snapshot-')]
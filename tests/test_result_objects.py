@@ -0,0 +1,66 @@
+import hashlib, os
+
+from conftest import send_results
+
+
+def send_manifest(client, project_id, files):
+    manifest = [{'file_name': file_name, 'sha256': hashlib.sha256(content).hexdigest(), 'size': len(content)}
+                for file_name, content in files.items()]
+    return client.post('/send-results/manifest?project_id={}'.format(project_id), json={'files': manifest})
+
+
+def get_objects(app_module, project_id):
+    objects_path = app_module.get_objects_path(project_id)
+    return sorted(name for name in os.listdir(objects_path) if not name.startswith('.'))
+
+
+def test_manifest_misses_unknown_files_and_links_stored_ones(app_module, client, project_id):
+    response = send_manifest(client, project_id, {'a-result.json': b'{"a": 1}'})
+    assert response.get_json()['data']['missing_files_count'] == 1
+
+    assert send_results(client, project_id, {'a-result.json': b'{"a": 1}'}).status_code == 200
+    data = send_manifest(client, project_id, {'a-result.json': b'{"a": 1}', 'b-result.json': b'{"a": 1}'}).get_json()['data']
+
+    assert data['missing_files_count'] == 0
+    assert data['existent_files_count'] == 1
+    assert data['linked_files_count'] == 1
+    results_path = '{}/results'.format(app_module.get_project_path(project_id))
+    assert os.stat('{}/a-result.json'.format(results_path)).st_ino == os.stat('{}/b-result.json'.format(results_path)).st_ino
+    assert get_objects(app_module, project_id) == [hashlib.sha256(b'{"a": 1}').hexdigest()]
+
+
+def test_replaced_result_removes_its_object(app_module, client, project_id):
+    send_results(client, project_id, {'a-result.json': b'{"a": 1}'})
+    send_results(client, project_id, {'a-result.json': b'{"a": 2}'})
+
+    assert get_objects(app_module, project_id) == [hashlib.sha256(b'{"a": 2}').hexdigest()]
+
+
+def test_replaced_result_keeps_object_linked_by_other_results(app_module, client, project_id):
+    send_results(client, project_id, {'a-result.json': b'{"a": 1}', 'b-result.json': b'{"a": 1}'})
+    send_results(client, project_id, {'a-result.json': b'{"a": 2}'})
+
+    assert get_objects(app_module, project_id) == sorted([hashlib.sha256(b'{"a": 1}').hexdigest(),
+                                                          hashlib.sha256(b'{"a": 2}').hexdigest()])
+
+
+def test_prune_removes_objects_of_results_removed_outside_the_api(app_module, client, project_id):
+    send_results(client, project_id, {'a-result.json': b'{"a": 1}', 'b-result.json': b'{"b": 1}'})
+    os.remove('{}/results/a-result.json'.format(app_module.get_project_path(project_id)))
+
+    app_module.prune_result_objects(project_id)
+
+    assert get_objects(app_module, project_id) == [hashlib.sha256(b'{"b": 1}').hexdigest()]
+
+
+def test_results_in_another_filesystem_are_not_stored_as_objects(app_module, client, project_id, monkeypatch):
+    monkeypatch.setattr(app_module, 'is_same_filesystem', lambda path, other_path: False)
+
+    assert send_results(client, project_id, {'a-result.json': b'{"a": 1}'}).status_code == 200
+
+    results_path = '{}/results'.format(app_module.get_project_path(project_id))
+    with open('{}/a-result.json'.format(results_path), 'rb') as f:
+        assert f.read() == b'{"a": 1}'
+    assert os.stat('{}/a-result.json'.format(results_path)).st_nlink == 1
+    assert get_objects(app_module, project_id) == []
+    assert sorted(os.listdir(results_path)) == ['a-result.json']
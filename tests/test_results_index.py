@@ -0,0 +1,48 @@
+import os
+
+from conftest import send_results
+
+
+def list_results(client, project_id):
+    response = client.get('/projects/{}/results?page_size=1000'.format(project_id))
+    assert response.status_code == 200
+    return [file['file_name'] for file in response.get_json()['data']['files']]
+
+
+def test_clean_send_list(app_module, client, project_id):
+    response = send_results(client, project_id, {'a-result.json': b'{}', 'b-result.json': b'{}', 'c-result.json': b'{}'})
+    assert response.get_json()['data']['current_files_count'] == 3
+
+    app_module.delete_project_results(project_id)
+    response = send_results(client, project_id, {'d-result.json': b'{}'})
+
+    data = response.get_json()['data']
+    assert data['current_files'] == ['d-result.json']
+    assert data['current_files_count'] == 1
+    assert list_results(client, project_id) == ['d-result.json']
+
+
+def test_files_written_outside_the_api_are_listed(app_module, client, project_id):
+    send_results(client, project_id, {'a-result.json': b'{}'})
+    results_path = '{}/results'.format(app_module.get_project_path(project_id))
+    with open('{}/executor.json'.format(results_path), 'w') as f:
+        f.write('{}')
+    os.makedirs('{}/history'.format(results_path))
+    send_results(client, project_id, {'b-result.json': b'{}'})
+
+    assert list_results(client, project_id) == ['a-result.json', 'b-result.json', 'executor.json', 'history']
+
+
+def test_index_is_invalidated_by_other_changes(tmp_path):
+    from results_index import ProjectResultsIndex
+
+    (tmp_path / 'a-result.json').write_text('{}')
+    index = ProjectResultsIndex(str(tmp_path))
+    assert index.get_summary()['file_names'] == ['a-result.json']
+
+    os.remove(str(tmp_path / 'a-result.json'))
+    os.utime(str(tmp_path), ns=(0, 0))
+    with index.adding('b-result.json'):
+        (tmp_path / 'b-result.json').write_text('{}')
+
+    assert index.get_summary()['file_names'] == ['b-result.json']
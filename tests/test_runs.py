@@ -0,0 +1,128 @@
+import os, time
+
+import pytest
+
+import runs
+from runs import RunRegistry, RunError
+from conftest import send_results
+
+
+def wait_run_status(app_module, project_id, run_id, status):
+    deadline = time.time() + 5
+    while time.time() < deadline:
+        run = app_module.RUNS.get(project_id, run_id)
+        if run['status'] == status:
+            return run
+        time.sleep(0.05)
+    raise AssertionError('run {} is {}'.format(run_id, run['status']))
+
+
+@pytest.fixture
+def registry(tmp_path):
+    return RunRegistry(str(tmp_path))
+
+
+@pytest.fixture
+def generations(app_module, monkeypatch):
+    jobs = []
+
+    def run_generation(job):
+        jobs.append(job)
+        return job
+    monkeypatch.setattr(app_module, 'run_generation', run_generation)
+    return jobs
+
+
+def test_open_runs_are_pending_until_finished(registry):
+    run = registry.create('project', 1, 60)
+    assert [pending['id'] for pending in registry.get_pending()] == [run['id']]
+
+    registry.complete_shard('project', run['id'], 'shard-1')
+    assert registry.get_pending()[0]['status'] == runs.READY
+
+    registry.update('project', run['id'], lambda run: run.update({'status': runs.FINISHED}))
+    assert registry.get_pending() == []
+    assert registry.get('project', run['id'])['finished'] is not None
+
+
+def test_pending_runs_are_loaded_from_disk(registry, tmp_path):
+    run = registry.create('project', 1, 60)
+    other = RunRegistry(str(tmp_path))
+    other.load_pending('project')
+    assert [pending['id'] for pending in other.get_pending()] == [run['id']]
+
+    other.forget('project')
+    assert other.get_pending() == []
+
+
+def test_shards_are_rejected_once_the_run_is_complete(registry):
+    run = registry.create('project', 2, 60)
+    registry.complete_shard('project', run['id'], 'shard-1')
+    with pytest.raises(RunError):
+        registry.open_shard('project', run['id'], 'shard-1')
+
+    registry.complete_shard('project', run['id'], 'shard-2')
+    with pytest.raises(RunError) as error:
+        registry.open_shard('project', run['id'], 'shard-3')
+    assert error.value.status_code == 409
+
+
+def test_timed_out_run_is_ready(registry):
+    run = registry.create('project', 2, 60)
+    registry.update('project', run['id'], lambda run: run.update({'deadline': 0}))
+
+    run = registry.expire('project', run['id'])
+
+    assert run['status'] == runs.READY
+    assert run['timed_out'] is True
+
+
+def test_uploads_in_progress_are_waited(registry):
+    run = registry.create('project', 1, 60)
+    registry.open_shard('project', run['id'], 'shard-1')
+    assert registry.wait_uploads('project', run['id'], 0.1) is False
+
+    registry.close_shard('project', run['id'])
+    assert registry.wait_uploads('project', run['id'], 0.1) is True
+
+
+def test_expired_runs_are_removed(registry):
+    finished = registry.create('project', 1, 60)
+    registry.update('project', finished['id'], lambda run: run.update({'status': runs.FAILED}))
+    pending = registry.create('project', 1, 60)
+
+    assert registry.remove_expired('project', 3600) == []
+    assert registry.remove_expired('project', 0) == [finished['id']]
+    assert [run['id'] for run in registry.list('project')] == [pending['id']]
+
+
+def test_run_merges_the_results_of_its_shards(app_module, client, project_id, generations):
+    run = client.post('/projects/{}/runs'.format(project_id), json={'expected_shards': 2}).get_json()['data']['run']
+    for shard in ['shard-1', 'shard-2']:
+        response = send_results(client, '{}&run_id={}&shard={}'.format(project_id, run['id'], shard),
+                                {'{}-result.json'.format(shard): b'{}'})
+        assert response.status_code == 200
+    results_path = '{}/results'.format(app_module.get_project_path(project_id))
+    assert os.listdir(results_path) == []
+
+    client.post('/projects/{}/runs/{}/shards/shard-1/complete'.format(project_id, run['id']))
+    client.post('/projects/{}/runs/{}/shards/shard-2/complete'.format(project_id, run['id']))
+    run = wait_run_status(app_module, project_id, run['id'], runs.FINISHED)
+
+    assert sorted(os.listdir(results_path)) == ['shard-1-result.json', 'shard-2-result.json']
+    assert app_module.RUNS.get_shard_paths(project_id, run['id']) == []
+    assert len(generations) == 1
+    assert run['id'] not in [pending['id'] for pending in app_module.RUNS.get_pending()]
+
+
+def test_run_isnt_merged_while_shards_are_uploaded(app_module, client, project_id, generations, monkeypatch):
+    monkeypatch.setattr(app_module, 'GENERATION_QUEUE_TIMEOUT_SECONDS', 0.1)
+    run = client.post('/projects/{}/runs'.format(project_id), json={'expected_shards': 1}).get_json()['data']['run']
+    app_module.RUNS.open_shard(project_id, run['id'], 'shard-2')
+    app_module.RUNS.update(project_id, run['id'], lambda run: run.update({'status': runs.GENERATING}))
+
+    app_module.finish_run(project_id, run['id'])
+
+    assert app_module.RUNS.get(project_id, run['id'])['status'] == runs.READY
+    assert generations == []
+    app_module.RUNS.close_shard(project_id, run['id'])
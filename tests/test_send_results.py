@@ -0,0 +1,53 @@
+import os, threading
+
+from conftest import send_results
+
+
+def test_invalid_base64_doesnt_write_any_file(app_module, client, project_id):
+    results = [
+        {'file_name': 'a-result.json', 'content_base64': 'e30='},
+        {'file_name': 'b-result.json', 'content_base64': 'not base64!'}
+    ]
+    response = client.post('/send-results?project_id={}'.format(project_id), json={'results': results})
+
+    assert response.status_code == 400
+    assert "'b-result.json'" in response.get_json()['meta_data']['message']
+    assert os.listdir('{}/results'.format(app_module.get_project_path(project_id))) == []
+
+
+def test_batch_durability_syncs_once_per_request(app_module, client, project_id, monkeypatch):
+    calls = []
+    monkeypatch.setattr(app_module, 'INGEST_DURABILITY', 'batch')
+    monkeypatch.setattr(os, 'fsync', lambda fd: calls.append('fsync'))
+    monkeypatch.setattr(os, 'sync', lambda: calls.append('sync'))
+
+    response = send_results(client, project_id, {'a-result.json': b'{}', 'b-result.json': b'{}', 'c-result.json': b'{}'})
+
+    assert response.status_code == 200
+    assert calls == ['sync']
+
+
+def test_file_durability_syncs_every_file(app_module, client, project_id, monkeypatch):
+    calls = []
+    monkeypatch.setattr(app_module, 'INGEST_DURABILITY', 'file')
+    monkeypatch.setattr(os, 'fsync', lambda fd: calls.append('fsync'))
+    monkeypatch.setattr(os, 'sync', lambda: calls.append('sync'))
+
+    send_results(client, project_id, {'a-result.json': b'{}', 'b-result.json': b'{}'})
+
+    # The file and its two directories (objects and results)
+    assert calls == ['fsync'] * 6
+
+
+def test_files_are_decoded_by_the_writers(app_module, client, project_id, monkeypatch):
+    threads = []
+    b64decode = app_module.base64.b64decode
+
+    def decode(content):
+        threads.append(threading.current_thread().name)
+        return b64decode(content)
+    monkeypatch.setattr(app_module.base64, 'b64decode', decode)
+
+    assert send_results(client, project_id, {'a-result.json': b'{}', 'b-result.json': b'{}'}).status_code == 200
+    assert len(threads) == 2
+    assert threading.current_thread().name not in threads
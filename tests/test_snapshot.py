@@ -0,0 +1,76 @@
+import io, os, tarfile
+
+import pytest
+
+from conftest import send_results
+
+
+def test_snapshot_is_staged_and_streamed_without_a_generation_slot(app_module, client, project_id):
+    send_results(client, project_id, {'a-result.json': b'{"a": 1}'})
+
+    response = client.get('/projects/{}/snapshot'.format(project_id), buffered=False)
+    assert response.status_code == 200
+    # The project is not locked while the archive is downloaded
+    assert app_module.GENERATION_ADMISSION.is_running(project_id) is False
+    assert len(app_module.GENERATION_ADMISSION.locked_projects) == 0
+    send_results(client, project_id, {'b-result.json': b'{"b": 1}'})
+
+    archive = b''.join(response.response)
+    response.close()
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        names = tar.getnames()
+    assert '{}/results/a-result.json'.format(project_id) in names
+    assert '{}/results/b-result.json'.format(project_id) not in names
+
+
+def test_snapshot_is_rejected_while_results_are_sent(app_module, client, project_id):
+    app_module.INGEST_ADMISSION.acquire(project_id)
+    try:
+        with pytest.raises(app_module.AdmissionError) as ex:
+            with app_module.INGEST_ADMISSION.blocked(project_id, 0.1):
+                pass
+        assert ex.value.status_code == 429
+    finally:
+        app_module.INGEST_ADMISSION.release(project_id)
+
+
+def test_snapshot_is_aborted_when_the_archive_fails(app_module, tmp_path):
+    chunks = app_module.stream_project_archive('missing', 'w|', str(tmp_path / 'missing'))
+    with pytest.raises(Exception):
+        b''.join(chunks)
+
+
+def test_snapshot_import_round_trip(app_module, client, project_id):
+    send_results(client, project_id, {'a-result.json': b'{"a": 1}'})
+    project_path = app_module.get_project_path(project_id)
+    os.makedirs('{}/reports/1'.format(project_path))
+    with open('{}/reports/1/index.html'.format(project_path), 'w') as f:
+        f.write('<html></html>')
+    archive = client.get('/projects/{}/snapshot'.format(project_id)).get_data()
+    imported_project_id = '{}-copy'.format(project_id)
+
+    response = client.post('/projects/{}/snapshot'.format(imported_project_id), data=archive,
+                           headers={'Content-Type': 'application/x-tar'})
+    try:
+        assert response.status_code == 201
+        imported_path = app_module.get_project_path(imported_project_id)
+        with open('{}/results/a-result.json'.format(imported_path), 'rb') as f:
+            assert f.read() == b'{"a": 1}'
+        assert os.path.isfile('{}/reports/1/index.html'.format(imported_path))
+        # The results watcher doesn't see the imported results as new results
+        assert app_module.RESULTS_SIGNATURES[imported_project_id] == app_module.get_results_signature(imported_project_id)
+    finally:
+        client.delete('/projects/{}'.format(imported_project_id))
+
+
+def test_snapshot_follows_the_results_link(app_module, client, project_id, tmp_path):
+    results_path = '{}/results'.format(app_module.get_project_path(project_id))
+    os.rmdir(results_path)
+    with open(str(tmp_path / 'a-result.json'), 'w') as f:
+        f.write('{}')
+    os.symlink(str(tmp_path), results_path)
+
+    archive = client.get('/projects/{}/snapshot'.format(project_id)).get_data()
+
+    with tarfile.open(fileobj=io.BytesIO(archive)) as tar:
+        assert '{}/results/a-result.json'.format(project_id) in tar.getnames()
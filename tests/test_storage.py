@@ -0,0 +1,168 @@
+import os, subprocess, sys
+
+import pytest
+
+import pipeline
+from conftest import API_DIRECTORY
+
+moto = pytest.importorskip('moto')
+boto3 = pytest.importorskip('boto3')
+
+BUCKET = 'allure-reports'
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    with moto.mock_aws():
+        client = boto3.client('s3', region_name='us-east-1')
+        client.create_bucket(Bucket=BUCKET)
+        yield client
+
+
+def create_storage(tmp_path, **kwargs):
+    from storage import S3Storage
+    return S3Storage(str(tmp_path / 'projects'), BUCKET, region_name='us-east-1',
+                     cache_directory=str(tmp_path / 'cache'), **kwargs)
+
+
+def write_report(project_path, build):
+    report_path = '{}/reports/{}'.format(project_path, build)
+    os.makedirs('{}/data'.format(report_path), exist_ok=True)
+    with open('{}/index.html'.format(report_path), 'w') as f:
+        f.write('<html>{}</html>'.format(build))
+    with open('{}/data/suites.json'.format(report_path), 'w') as f:
+        f.write('{}')
+
+
+def list_keys(s3, prefix=''):
+    return sorted(item['Key'] for item in s3.list_objects_v2(Bucket=BUCKET, Prefix=prefix).get('Contents', []))
+
+
+def test_publish_stage_uploads_the_stored_build(s3, tmp_path):
+    storage = create_storage(tmp_path)
+    project_path = storage.get_project_path('my-project')
+    write_report(project_path, 'latest')
+    write_report(project_path, 3)
+
+    job = pipeline.GenerationJob('my-project', project_path)
+    job.stored_build_order = 3
+    pipeline.PublishStage(storage).run(job)
+
+    assert list_keys(s3) == [
+        'my-project/reports/3/data/suites.json', 'my-project/reports/3/index.html',
+        'my-project/reports/latest/data/suites.json', 'my-project/reports/latest/index.html'
+    ]
+
+
+def put(s3, key, body=b'{}'):
+    s3.put_object(Bucket=BUCKET, Key=key, Body=body)
+
+
+def test_publish_replaces_the_latest_report(s3, tmp_path):
+    storage = create_storage(tmp_path)
+    project_path = storage.get_project_path('my-project')
+    put(s3, 'my-project/reports/latest/data/stale.json')
+    write_report(project_path, 'latest')
+
+    storage.publish_report('my-project')
+
+    assert list_keys(s3, 'my-project/reports/latest/') == [
+        'my-project/reports/latest/data/suites.json', 'my-project/reports/latest/index.html'
+    ]
+
+
+def test_retention_removes_the_expired_builds_of_the_bucket(s3, tmp_path):
+    storage = create_storage(tmp_path)
+    project_path = storage.get_project_path('my-project')
+    for build in [0, 1, 2, 3]:
+        put(s3, 'my-project/reports/{}/index.html'.format(build))
+    write_report(project_path, 'latest')
+    write_report(project_path, 4)
+
+    job = pipeline.GenerationJob('my-project', project_path)
+    job.stored_build_order = 4
+    pipeline.RetentionStage(True, 2, storage).run(job)
+    pipeline.PublishStage(storage).run(job)
+
+    assert sorted(name for name, _ in storage.list_reports('my-project')) == ['0', '3', '4', 'latest']
+
+
+def test_retention_is_disabled_without_keep_history(s3, tmp_path):
+    storage = create_storage(tmp_path)
+    project_path = storage.get_project_path('my-project')
+    for build in [1, 2, 3]:
+        put(s3, 'my-project/reports/{}/index.html'.format(build))
+    write_report(project_path, 'latest')
+
+    pipeline.RetentionStage(False, 1, storage).run(pipeline.GenerationJob('my-project', project_path))
+
+    assert sorted(name for name, _ in storage.list_reports('my-project')) == ['1', '2', '3']
+
+
+def test_list_reports_only_returns_reports_with_index(s3, tmp_path):
+    storage = create_storage(tmp_path)
+    put(s3, 'my-project/reports/1/index.html')
+    put(s3, 'my-project/reports/1/data/suites.json')
+    put(s3, 'my-project/reports/2/data/suites.json')
+    put(s3, 'my-project/reports/latest/index.html')
+    put(s3, 'my-project/reports/emailable-report.html')
+    put(s3, 'other-project/reports/3/index.html')
+
+    assert sorted(name for name, _ in storage.list_reports('my-project')) == ['1', 'latest']
+    assert sorted(storage.list_build_orders('my-project')) == [1, 2]
+
+
+def test_fetch_restores_the_working_copy(s3, tmp_path):
+    storage = create_storage(tmp_path)
+    project_path = storage.get_project_path('my-project')
+    os.makedirs('{}/reports/latest'.format(project_path))
+    os.makedirs('{}/results'.format(project_path))
+    with open('{}/results/a-result.json'.format(project_path), 'w') as f:
+        f.write('local')
+    put(s3, 'my-project/results/a-result.json', b'remote')
+    put(s3, 'my-project/results/b-result.json', b'remote')
+    put(s3, 'my-project/reports/latest/history/history-trend.json', b'[]')
+    put(s3, 'my-project/reports/7/index.html')
+
+    storage.fetch_project('my-project')
+
+    with open('{}/results/a-result.json'.format(project_path)) as f:
+        assert f.read() == 'local'
+    with open('{}/results/b-result.json'.format(project_path)) as f:
+        assert f.read() == 'remote'
+    assert os.path.isfile('{}/reports/latest/history/history-trend.json'.format(project_path))
+    assert pipeline.get_build_orders('{}/reports'.format(project_path)) == [7]
+
+
+def test_unusable_s3_storage_fails_startup(tmp_path):
+    env = dict(os.environ, STORAGE_BACKEND='s3', STATIC_CONTENT_PROJECTS=str(tmp_path))
+    env.pop('STORAGE_S3_BUCKET', None)
+    process = subprocess.run([sys.executable, '-c', 'import app'], cwd=API_DIRECTORY, env=env,
+                             stdout=subprocess.PIPE, stderr=subprocess.STDOUT, timeout=60)
+
+    assert process.returncode != 0
+    assert b"'STORAGE_S3_BUCKET' is required" in process.stdout
+
+
+def test_list_reports_lists_report_directories_and_checks_every_index_once(s3, tmp_path):
+    storage = create_storage(tmp_path)
+    for build in [1, 2]:
+        put(s3, 'my-project/reports/{}/index.html'.format(build))
+        put(s3, 'my-project/reports/{}/data/suites.json'.format(build))
+    calls = []
+    storage.client.meta.events.register('before-parameter-build.s3.*',
+        lambda model, params, **kwargs: calls.append((model.name, params.get('Delimiter'))))
+
+    assert sorted(name for name, _ in storage.list_reports('my-project')) == ['1', '2']
+    assert sorted(calls) == [('HeadObject', None), ('HeadObject', None), ('ListObjectsV2', '/')]
+
+    del calls[:]
+    put(s3, 'my-project/reports/3/index.html')
+    assert sorted(name for name, _ in storage.list_reports('my-project')) == ['1', '2', '3']
+    assert sorted(calls) == [('HeadObject', None), ('ListObjectsV2', '/')]
+
+    storage.delete_builds('my-project', [1])
+    assert sorted(name for name, _ in storage.list_reports('my-project')) == ['2', '3']